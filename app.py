@@ -1,24 +1,269 @@
 import streamlit as st
-from PIL import Image
-import plotly.express as px
-import plotly.graph_objects as go
-import pandas as pd
-from src.image_analysis import ImageAnalyzer
-from src.interpretation_engine import ArtworkInterpreter
-from src.report_generator import ReportGenerator
-from src.pdf_generator import generate_pdf_report
-import io
+import hashlib
+import importlib
+import re
+import secrets
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from src.cache import ResultCache, llm_settings, make_cache_key
+from src.history import FEATURE_COLUMNS, get_history_store
+from src.job_queue import JobRejected, get_job_queue
+from src.structured_output import EMOTIONS, insights_from
+from src.tracing import current_trace, span, start_metrics_server, traced
+from config import (
+    CACHE_MAX_ENTRIES, CACHE_DIR, CACHE_MAX_DISK_MB, HISTORY_MAX_POINTS, JOB_POLL_INTERVAL,
+    LLM_STREAMING, PDF_BACKGROUND_RENDER, SERVING_MODE, SHOW_TIMING_PANEL, SIMILARITY_REUSE
+)
 
-def create_emotion_radar_chart(interpretation):
-    # Extract emotional scores (this is a simplified example - you'll need to 
-    # modify based on your actual interpretation structure)
-    emotions = {
-        'Joy': 0.7,
-        'Calm': 0.5,
-        'Energy': 0.8,
-        'Tension': 0.3,
-        'Expression': 0.6
-    }
+# Imported where an upload first needs them, so a new replica serves its
+# first page without loading OpenCV, the LLM clients, fpdf or plotly;
+# warm_up() then loads them in the background before the first upload
+UPLOAD_MODULES = (
+    "src.orchestrator", "src.ingest", "src.similarity", "src.pdf_generator",
+    "plotly.graph_objects", "plotly.io"
+)
+
+@st.cache_resource
+def warm_up():
+    """Import UPLOAD_MODULES and load the token encoding on a background thread, once per process"""
+    def run():
+        for name in UPLOAD_MODULES:
+            importlib.import_module(name)
+        # tiktoken fetches its encoding on first use; do that here, not mid-request
+        importlib.import_module("src.token_budget").load_encoding()
+    thread = threading.Thread(target=run, name="warm-up", daemon=True)
+    thread.start()
+    return thread
+
+@st.cache_resource
+def get_result_cache():
+    # One cache per server process, shared by all sessions and reruns
+    return ResultCache(
+        max_entries=CACHE_MAX_ENTRIES,
+        cache_dir=CACHE_DIR,
+        max_disk_bytes=CACHE_MAX_DISK_MB * 1024 * 1024
+    )
+
+def generate_text(stream, generate, spinner_text):
+    """Show LLM output as it streams in, or behind a spinner when streaming is off"""
+    if LLM_STREAMING:
+        return st.write_stream(stream())
+    with st.spinner(spinner_text):
+        text = generate()
+    st.write(text)
+    return text
+
+# A history key is token_urlsafe(16): 128 random bits, so keys cannot be guessed
+HISTORY_KEY_PATTERN = re.compile(r"[A-Za-z0-9_-]{22,}")
+
+def auth_configured():
+    """Whether the deployment set up st.login in its secrets"""
+    try:
+        return "auth" in st.secrets
+    except FileNotFoundError:
+        return False
+
+def history_user_id():
+    """Opaque id the history is stored under, or None while history is off.
+
+    Signed-in users keep one history across devices. Everyone else can opt in
+    to a random history key for this session and paste it back later to pick
+    the history up again. Only a hash of either identity reaches the database.
+    """
+    if st.user.get("is_logged_in"):
+        st.sidebar.caption(f"Signed in as {st.user.get('email') or st.user.get('name')}")
+        st.sidebar.button("Log out", on_click=st.logout)
+        identity = f"login:{st.user.get('sub') or st.user.get('email')}"
+        return hashlib.sha256(identity.encode()).hexdigest()
+    if auth_configured():
+        st.sidebar.button("Log in to keep a history", on_click=st.login)
+    if not st.sidebar.toggle("Keep a history", help="Saves your analyses so trends show up over time"):
+        return None
+    
+    key = st.session_state.setdefault("history_key", secrets.token_urlsafe(16))
+    with st.sidebar.expander("History key"):
+        st.caption("Copy this key to see your history in a later session. Anyone with it can read your history.")
+        st.code(key, language=None)
+        entered = st.text_input("Resume with a history key", type="password").strip()
+        if entered and entered != key:
+            if HISTORY_KEY_PATTERN.fullmatch(entered):
+                key = st.session_state["history_key"] = entered
+            else:
+                st.error("That is not a history key.")
+    return hashlib.sha256(f"key:{key}".encode()).hexdigest()
+
+def job_owner(user_id):
+    """Who a queued job counts against: the user id, or this browser session"""
+    if user_id:
+        return f"user:{user_id}"
+    return f"session:{st.session_state.setdefault('session_key', uuid.uuid4().hex)}"
+
+def wait_for_job(jobs, name, submit):
+    """Result of this session's job ``name``, submitting it first if needed.
+
+    While the job is queued or running this shows its progress and reruns
+    the script after JOB_POLL_INTERVAL, so nothing below it runs until the
+    result is in. The job id stays in session state until ``finish_jobs``.
+    """
+    job_ids = st.session_state.setdefault("job_ids", {})
+    status = jobs.status(job_ids[name]) if name in job_ids else None
+    if status is None:
+        try:
+            job_ids[name] = submit()
+        except JobRejected as e:
+            st.warning(f"{e} Retrying automatically...")
+            time.sleep(JOB_POLL_INTERVAL * 4)
+            st.rerun()
+        status = jobs.status(job_ids[name])
+    
+    if status["state"] == "failed":
+        job_ids.pop(name)
+        st.error(f"Could not process this image: {status['error']}")
+        st.stop()
+    if status["state"] != "done":
+        if status["state"] == "queued":
+            st.info(f"Waiting in the queue (position {status['position']})...")
+        else:
+            st.info(f"Working... ({time.time() - status['started']:.0f} s)")
+        time.sleep(JOB_POLL_INTERVAL)
+        st.rerun()
+    return status["result"]
+
+def finish_jobs(jobs, cache_key):
+    """Drop this upload's finished jobs from the queue and session state"""
+    job_ids = st.session_state.get("job_ids", {})
+    for name in [name for name in job_ids if name[1] == cache_key]:
+        jobs.discard(job_ids.pop(name))
+
+def render_timing_panel():
+    """Per-stage timings of the current run, shown when SHOW_TIMING_PANEL is set"""
+    request_trace = current_trace()
+    if request_trace is None:
+        return
+    with st.expander("⏱️ Timings"):
+        rows = [
+            {
+                "stage": s["name"],
+                "start (ms)": round(s["offset_ms"], 1),
+                "duration (ms)": round(s["duration_ms"], 1),
+                **s["attributes"]
+            }
+            for s in sorted(request_trace.to_dict()["spans"], key=lambda s: s["offset_ms"])
+        ]
+        st.table(rows)
+
+def find_similar_result(index, cache, vector, cache_key):
+    """Finished result and distance of the nearest earlier upload, or (None, None)"""
+    with span("similarity.lookup") as lookup_span:
+        match = index.nearest(vector, exclude=cache_key)
+        # The match only helps while its result is still cached
+        previous = cache.get(match[0]) if match else None
+        # Its interpretation must also come from the current model and prompts
+        if previous is None or "report" not in previous or previous.get("llm_settings") != llm_settings():
+            lookup_span.set(match=False)
+            return None, None
+        lookup_span.set(match=True, distance=match[1])
+        return previous, match[1]
+
+def should_reuse(cache_key, distance):
+    """Reuse a near-duplicate's results automatically, or ask once per upload"""
+    if SIMILARITY_REUSE == "auto":
+        return True
+    choice_key = f"reuse:{cache_key}"
+    if choice_key not in st.session_state:
+        st.info(
+            f"This artwork closely matches one analyzed before (distance {distance:.2f}). "
+            "Reuse its interpretation and report, or analyze it fresh?"
+        )
+        col1, col2 = st.columns(2)
+        col1.button("Reuse previous results", on_click=st.session_state.__setitem__, args=(choice_key, True))
+        col2.button("Analyze fresh", on_click=st.session_state.__setitem__, args=(choice_key, False))
+        st.stop()
+    return st.session_state[choice_key]
+
+@st.cache_data(max_entries=64)
+def load_trend(user_id, columns, revision):
+    """Chart data for a user's history; ``revision`` changes when new analyses land"""
+    store = get_history_store()
+    if revision[0] <= HISTORY_MAX_POINTS:
+        trend = store.trajectory(user_id, columns)
+        trend["x"] = [datetime.fromtimestamp(ts, timezone.utc) for ts in trend.pop("created_at")]
+    else:
+        trend = store.daily_trend(user_id, columns)
+        trend["x"] = trend.pop("day")
+    return trend
+
+def create_trend_chart(trend, columns, title):
+    import plotly.graph_objects as go
+    fig = go.Figure()
+    for column in columns:
+        fig.add_trace(go.Scatter(
+            x=trend["x"], y=trend[column], mode="lines+markers",
+            name=column.replace("_", " ").title()
+        ))
+    # Daily rollups are UTC days, so the per-analysis view uses UTC too
+    fig.update_layout(title=title, xaxis_title="Date (UTC)", hovermode="x unified")
+    return fig
+
+def render_history(user_id):
+    """Feature trajectories and recent analyses for one user"""
+    store = get_history_store()
+    revision = store.revision(user_id)
+    if revision[0] == 0:
+        st.info("No analyses saved in this history yet.")
+        return
+    
+    st.write(f"Saved analyses: {revision[0]}"
+             + (" (charts show daily averages)" if revision[0] > HISTORY_MAX_POINTS else ""))
+    with span("history.trend"):
+        color_columns = ("r_mean", "g_mean", "b_mean")
+        st.plotly_chart(
+            create_trend_chart(load_trend(user_id, color_columns, revision), color_columns, "Color Trends"),
+            use_container_width=True
+        )
+        columns = tuple(st.multiselect(
+            "Features to plot", list(FEATURE_COLUMNS),
+            default=["homogeneity", "energy", "edge_density"]
+        ))
+        if columns:
+            st.plotly_chart(
+                create_trend_chart(load_trend(user_id, columns, revision), columns, "Feature Trends"),
+                use_container_width=True
+            )
+    
+    st.subheader("Recent Analyses")
+    for entry in store.recent(user_id, limit=5):
+        created = datetime.fromtimestamp(entry["created_at"], timezone.utc).strftime("%Y-%m-%d %H:%M UTC")
+        with st.expander(created):
+            st.write(entry["interpretation"] or "No interpretation saved.")
+
+def generate_interpretation(pipeline, features):
+    """Show the interpretation prose as it streams, then return the parsed reply.
+
+    In combined mode the parsed reply also carries its 'report', as text or,
+    when streaming, as a generator of the report chunks still to come.
+    """
+    combined = pipeline.mode == "combined"
+    if LLM_STREAMING:
+        if combined:
+            stream = pipeline.stream_combined(features)
+            st.write_stream(stream.section("interpretation"))
+            return {**stream.interpretation_result(), "report": stream.section("report")}
+        stream = pipeline.stream_interpretation(features)
+        st.write_stream(stream)
+        return stream.result()
+    with st.spinner("Interpreting artwork..."):
+        generate = pipeline.combined if combined else pipeline.interpret
+        parsed = pipeline.submit(generate(features)).result()
+    st.write(parsed["interpretation"])
+    return parsed
+
+def create_emotion_radar_chart(emotions):
+    import plotly.graph_objects as go
+    # Scores in [0, 1] parsed from the interpretation's JSON reply
+    emotions = {name.title(): emotions[name] for name in EMOTIONS}
     
     fig = go.Figure(data=go.Scatterpolar(
         r=list(emotions.values()),
@@ -34,6 +279,7 @@ def create_emotion_radar_chart(interpretation):
     return fig
 
 def create_color_distribution_chart(color_stats):
+    import plotly.graph_objects as go
     colors = ['Red', 'Green', 'Blue']
     means = [color_stats['r']['mean'], color_stats['g']['mean'], color_stats['b']['mean']]
     
@@ -49,217 +295,380 @@ def create_color_distribution_chart(color_stats):
     )
     return fig
 
-def extract_key_points(interpretation):
-    # This is a placeholder - you'll need to modify based on your actual interpretation
+def create_palette_chart(palette):
+    """One horizontal bar split into the dominant colors by their share of the canvas"""
+    import plotly.graph_objects as go
+    fig = go.Figure(data=[
+        go.Bar(name=color['hex'], x=[color['proportion'] * 100], y=['Palette'], orientation='h',
+               marker_color=color['hex'], hovertemplate=f"{color['hex']}: %{{x:.1f}}%<extra></extra>")
+        for color in palette['colors']
+    ])
+    
+    fig.update_layout(
+        title="Dominant Palette",
+        barmode='stack',
+        xaxis_title="Share of canvas (%)",
+        yaxis_visible=False,
+        showlegend=False,
+        height=220
+    )
+    return fig
+
+KEY_POINT_TITLES = {
+    "emotional_state": "💭 Emotional State",
+    "cognitive_patterns": "🧠 Cognitive Patterns",
+    "behavioral_insights": "🔄 Behavioral Insights"
+}
+
+def extract_key_points(insights):
+    key_points = insights.get("key_points") or {}
     return {
-        "Emotional State": [
-            "Predominantly positive emotional expression",
-            "Signs of creative energy and vitality",
-            "Balanced emotional regulation"
-        ],
-        "Cognitive Patterns": [
-            "Structured thinking approach",
-            "Good problem-solving indicators",
-            "Creative flexibility present"
-        ],
-        "Behavioral Insights": [
-            "Active engagement with the process",
-            "Balanced energy levels",
-            "Positive social indicators"
-        ]
+        title: key_points.get(section) or ["No points available"]
+        for section, title in KEY_POINT_TITLES.items()
     }
 
+def score_level(score):
+    if score < 1 / 3:
+        return "Low"
+    return "Moderate" if score < 2 / 3 else "High"
+
+def emotion_metrics(emotions):
+    """(label, level, score) for the summary metrics, derived from the emotion scores"""
+    if not emotions:
+        return [(label, "—", None) for label in ("Expression Level", "Emotional Balance", "Creative Energy")]
+    scores = {
+        "Expression Level": emotions["expression"],
+        "Emotional Balance": (emotions["calm"] + 1 - emotions["tension"]) / 2,
+        "Creative Energy": emotions["energy"]
+    }
+    return [(label, score_level(score), score) for label, score in scores.items()]
+
+@traced("request")
 def main():
+    start_metrics_server()
     st.title("Art Therapy Analysis Tool")
     st.write("Upload your artwork for analysis and interpretation")
     
+    # History is opt-in and tied to a login or a secret per-session key
+    user_id = history_user_id()
+    
     uploaded_file = st.file_uploader("Choose an image...", type=["jpg", "jpeg", "png"])
     
+    if uploaded_file is None and user_id:
+        st.subheader("Your History")
+        render_history(user_id)
+    
     if uploaded_file is not None:
         # Create tabs
-        upload_tab, analysis_tab, interpretation_tab, report_tab = st.tabs([
+        upload_tab, analysis_tab, interpretation_tab, report_tab, history_tab = st.tabs([
             "Uploaded Image", 
             "Technical Analysis", 
             "Interpretation", 
-            "Final Report"
+            "Final Report",
+            "History"
         ])
         
         # Tab 1: Uploaded Image
+        # The browser renders the upload bytes as-is; only a cache miss
+        # decodes them, straight into a downscaled working array
+        from src.ingest import load_image
+        from src.orchestrator import get_pipeline
+        from src.similarity import feature_vector, get_similarity_index
+        
+        image_bytes = uploaded_file.getvalue()
         with upload_tab:
             st.subheader("Your Artwork")
-            image = Image.open(uploaded_file)
-            st.image(image, caption="Uploaded Artwork", use_column_width=True)
+            st.image(image_bytes, caption="Uploaded Artwork", use_column_width=True)
         
-        with st.spinner("Analyzing artwork..."):
-            # Perform analysis
-            analyzer = ImageAnalyzer(image)
-            color_stats = analyzer.analyze_colors()
-            texture_stats = analyzer.analyze_texture()
-            composition_stats = analyzer.analyze_composition()
-            
-            # Generate interpretation
-            interpreter = ArtworkInterpreter()
-            interpretation = interpreter.interpret_features(
-                color_stats, texture_stats, composition_stats
+        # Reuse everything computed for an identical upload; otherwise fill
+        # in the stages below as each one finishes
+        pipeline = get_pipeline()
+        cache = get_result_cache()
+        similarity_index = get_similarity_index()
+        cache_key = make_cache_key(image_bytes)
+        with span("cache.lookup") as lookup_span:
+            result = cache.get(cache_key)
+            lookup_span.set(cache="miss" if result is None else "hit")
+        is_new = result is None
+        
+        queued = SERVING_MODE == "queue"
+        jobs = get_job_queue() if queued else None
+        
+        if is_new and queued:
+            # Decoding and analysis run in a worker process; this session polls
+            analyzed = wait_for_job(
+                jobs, ("analyze", cache_key),
+                lambda: jobs.submit("analyze", image_bytes, owner=job_owner(user_id))
             )
+            result, vector = dict(analyzed["features"]), analyzed["vector"]
+        elif is_new:
+            try:
+                with span("decode") as decode_span:
+                    image = load_image(image_bytes)
+                    decode_span.set(height=image.shape[0], width=image.shape[1])
+            except ValueError as e:
+                st.error(f"Could not process this image: {e}")
+                return
+            with st.spinner("Analyzing artwork..."):
+                result = pipeline.submit(pipeline.analyze(image)).result()
+            vector = feature_vector(result, image)
+            # Free the working array before the LLM stages run
+            del image
+        
+        # A resubmission or slight crop of an earlier artwork can take over
+        # its interpretation and report instead of new LLM calls
+        if is_new and SIMILARITY_REUSE != "off":
+            previous, distance = find_similar_result(similarity_index, cache, vector, cache_key)
+            if previous is not None and should_reuse(cache_key, distance):
+                result["interpretation"] = previous["interpretation"]
+                result["insights"] = previous.get("insights")
+                result["report"] = previous["report"]
+                result["llm_settings"] = previous["llm_settings"]
+                cache.set(cache_key, result)
+                similarity_index.add(vector, cache_key)
+                if queued:
+                    finish_jobs(jobs, cache_key)
+        color_stats = result["color_stats"]
+        texture_stats = result["texture_stats"]
+        composition_stats = result["composition_stats"]
+        interpretation = result.get("interpretation")
+        # Set by a combined-mode reply, whose report arrives with the interpretation
+        pending_report = None
+        
+        # Tab 2: Technical Analysis
+        with analysis_tab:
+            st.subheader("Technical Analysis Results")
             
-            # Generate final report
-            report_gen = ReportGenerator()
-            report = report_gen.generate_report(interpretation)
-            
-            # Tab 2: Technical Analysis
-            with analysis_tab:
-                st.subheader("Technical Analysis Results")
-                
-                # Color Analysis
-                st.write("🎨 Color Analysis")
+            # Color Analysis
+            st.write("🎨 Color Analysis")
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Red Channel Mean", f"{color_stats['r']['mean']:.2f}")
+            with col2:
+                st.metric("Green Channel Mean", f"{color_stats['g']['mean']:.2f}")
+            with col3:
+                st.metric("Blue Channel Mean", f"{color_stats['b']['mean']:.2f}")
+            # Results cached before the palette engine lack it
+            palette = color_stats.get("palette")
+            if palette:
                 col1, col2, col3 = st.columns(3)
                 with col1:
-                    st.metric("Red Channel Mean", f"{color_stats['r']['mean']:.2f}")
+                    st.metric("Color Warmth", f"{palette['warmth']:+.2f}",
+                              help="-1 is all cool hues, 1 all warm; neutrals are left out")
                 with col2:
-                    st.metric("Green Channel Mean", f"{color_stats['g']['mean']:.2f}")
+                    st.metric("Mean Saturation", f"{palette['saturation_mean']:.2f}")
                 with col3:
-                    st.metric("Blue Channel Mean", f"{color_stats['b']['mean']:.2f}")
-                
-                # Texture Analysis
-                st.write("🔍 Texture Analysis")
-                col1, col2, col3 = st.columns(3)
+                    st.metric("Mean Lightness", f"{palette['lightness_mean']:.2f}")
+                if palette["colors"]:
+                    st.plotly_chart(create_palette_chart(palette), use_container_width=True)
+            
+            # Texture Analysis
+            st.write("🔍 Texture Analysis")
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Contrast", f"{texture_stats['contrast']:.2f}")
+            with col2:
+                st.metric("Homogeneity", f"{texture_stats['homogeneity']:.2f}")
+            with col3:
+                st.metric("Energy", f"{texture_stats['energy']:.2f}")
+            
+            # Composition Analysis
+            st.write("📐 Composition Analysis")
+            col1, col2 = st.columns(2)
+            with col1:
+                st.metric("Edge Density", f"{composition_stats['edge_density']:.2f}")
+            with col2:
+                st.metric("Symmetry Score", f"{composition_stats['symmetry_score']:.2f}")
+            # Results cached before the multi-axis features lack these keys
+            if "thirds_weight" in composition_stats:
+                col1, col2, col3, col4 = st.columns(4)
                 with col1:
-                    st.metric("Contrast", f"{texture_stats['contrast']:.2f}")
+                    st.metric("Top-Bottom Symmetry", f"{composition_stats['symmetry_top_bottom']:.2f}")
                 with col2:
-                    st.metric("Homogeneity", f"{texture_stats['homogeneity']:.2f}")
+                    st.metric("Diagonal Symmetry", f"{composition_stats['symmetry_diagonal']:.2f}")
                 with col3:
-                    st.metric("Energy", f"{texture_stats['energy']:.2f}")
-                
-                # Composition Analysis
-                st.write("📐 Composition Analysis")
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.metric("Edge Density", f"{composition_stats['edge_density']:.2f}")
-                with col2:
-                    st.metric("Symmetry Score", f"{composition_stats['symmetry_score']:.2f}")
-                
-                with st.expander("View Raw Data"):
-                    st.json({
-                        "color_analysis": color_stats,
-                        "texture_analysis": texture_stats,
-                        "composition_analysis": composition_stats
-                    })
+                    st.metric("Anti-Diagonal Symmetry", f"{composition_stats['symmetry_anti_diagonal']:.2f}")
+                with col4:
+                    st.metric("Rule-of-Thirds Weight", f"{composition_stats['thirds_weight']:.2f}",
+                              help="Edge emphasis at the thirds intersections; 1.0 is none")
             
-            # Tab 3: Interpretation
-            with interpretation_tab:
-                st.subheader("Artwork Interpretation")
-                
-                # Create two columns for the charts
-                col1, col2 = st.columns(2)
+            with st.expander("View Raw Data"):
+                st.json({
+                    "color_analysis": color_stats,
+                    "texture_analysis": texture_stats,
+                    "composition_analysis": composition_stats
+                })
+        
+        # Tab 3: Interpretation
+        with interpretation_tab:
+            st.subheader("Artwork Interpretation")
+            
+            if queued and interpretation is None:
+                # The LLM stages run in a worker too; the technical analysis
+                # tab is already filled in while they do
+                result.update(wait_for_job(
+                    jobs, ("generate", cache_key),
+                    lambda: jobs.submit("generate", result, owner=job_owner(user_id))
+                ))
+                interpretation = result["interpretation"]
+                result["llm_settings"] = llm_settings()
+                cache.set(cache_key, result)
+                similarity_index.add(vector, cache_key)
+                finish_jobs(jobs, cache_key)
+            
+            # Create two columns for the charts
+            col1, col2 = st.columns(2)
+            
+            # Emotion scores, key points and metrics come from the same
+            # completion as the interpretation below, so their slots are
+            # filled in once it has finished
+            radar_slot = col1.empty()
+            
+            with col2, span("chart.color_distribution"):
+                # Color Distribution Chart
+                color_chart = create_color_distribution_chart(color_stats)
+                st.plotly_chart(color_chart, use_container_width=True)
+            
+            # Key Points Section
+            st.subheader("🎯 Key Insights")
+            key_points_slot = st.container()
+            
+            # Progress Indicators
+            st.subheader("📊 Analysis Metrics")
+            metrics_slot = st.container()
+            
+            # Detailed interpretation in expander
+            with st.expander("📝 See Detailed Interpretation", expanded=is_new):
+                if interpretation is None:
+                    parsed = generate_interpretation(pipeline, result)
+                    interpretation = result["interpretation"] = parsed["interpretation"]
+                    result["insights"] = insights_from(parsed)
+                    pending_report = parsed.get("report")
+                else:
+                    st.write(interpretation)
                 
-                with col1:
-                    # Emotion Radar Chart
-                    emotion_chart = create_emotion_radar_chart(interpretation)
+                st.info("""
+                This detailed interpretation provides in-depth analysis of your artwork. 
+                Remember that art interpretation is subjective and should be used as a 
+                tool for self-reflection and discussion with mental health professionals.
+                """)
+            
+            insights = result.get("insights") or {}
+            # The same figures are rendered into the PDF report, keyed by what
+            # they are drawn from: the upload's features, or the emotion scores
+            report_charts = [("colors", cache_key, color_chart)]
+            with radar_slot.container(), span("chart.emotion_radar"):
+                # Emotion Radar Chart
+                if insights.get("emotions"):
+                    emotion_chart = create_emotion_radar_chart(insights["emotions"])
                     st.plotly_chart(emotion_chart, use_container_width=True)
-                
-                with col2:
-                    # Color Distribution Chart
-                    color_chart = create_color_distribution_chart(color_stats)
-                    st.plotly_chart(color_chart, use_container_width=True)
-                
-                # Key Points Section
-                st.subheader("🎯 Key Insights")
-                key_points = extract_key_points(interpretation)
-                
+                    report_charts.insert(0, ("emotions", insights["emotions"], emotion_chart))
+                else:
+                    st.info("Emotion scores are not available for this interpretation.")
+            
+            with key_points_slot:
                 # Display key points in columns
-                col1, col2, col3 = st.columns(3)
-                
-                with col1:
-                    st.write("💭 Emotional State")
-                    for point in key_points["Emotional State"]:
-                        st.write(f"• {point}")
-                        
-                with col2:
-                    st.write("🧠 Cognitive Patterns")
-                    for point in key_points["Cognitive Patterns"]:
-                        st.write(f"• {point}")
-                        
-                with col3:
-                    st.write("🔄 Behavioral Insights")
-                    for point in key_points["Behavioral Insights"]:
-                        st.write(f"• {point}")
-                
-                # Progress Indicators
-                st.subheader("📊 Analysis Metrics")
-                metrics_col1, metrics_col2, metrics_col3 = st.columns(3)
-                
-                with metrics_col1:
-                    st.metric(
-                        label="Expression Level",
-                        value="High",
-                        delta="Positive"
-                    )
-                
-                with metrics_col2:
-                    st.metric(
-                        label="Emotional Balance",
-                        value="Moderate",
-                        delta="Stable"
-                    )
+                key_points = extract_key_points(insights)
+                for col, (title, points) in zip(st.columns(3), key_points.items()):
+                    with col:
+                        st.write(title)
+                        for point in points:
+                            st.write(f"• {point}")
+            
+            with metrics_slot:
+                for col, (label, value, score) in zip(st.columns(3), emotion_metrics(insights.get("emotions"))):
+                    with col:
+                        st.metric(
+                            label=label,
+                            value=value,
+                            help=None if score is None else f"Score {score:.2f} of 1"
+                        )
+            
+            # Additional context and resources
+            with st.expander("🔍 Understanding Your Results"):
+                st.write("""
+                ### How to Use These Insights
+                - Use these insights as starting points for self-reflection
+                - Consider discussing patterns with a mental health professional
+                - Remember that art interpretation is subjective
+                - Focus on patterns rather than individual elements
                 
-                with metrics_col3:
-                    st.metric(
-                        label="Creative Energy",
-                        value="High",
-                        delta="↗️"
+                ### Key Terms
+                - **Expression Level**: Overall emotional communication in the artwork
+                - **Emotional Balance**: Distribution of emotional elements
+                - **Creative Energy**: Level of engagement and vitality in creation
+                """)
+        
+        # Tab 4: Final Report
+        with report_tab:
+            st.subheader("Comprehensive Report")
+            st.write("📊 Detailed Analysis Report")
+            if "report" not in result:
+                report = None
+                if isinstance(pending_report, str):
+                    report = pending_report
+                    st.write(report)
+                elif pending_report is not None:
+                    report = st.write_stream(pending_report)
+                if not report:
+                    # Two-call mode, or a combined reply cut off before its report
+                    report = generate_text(
+                        lambda: pipeline.stream_report(interpretation),
+                        lambda: pipeline.submit(pipeline.report(interpretation)).result(),
+                        "Writing report..."
                     )
-                
-                # Detailed interpretation in expander
-                with st.expander("📝 See Detailed Interpretation"):
-                    st.write(interpretation)
-                    
-                    st.info("""
-                    This detailed interpretation provides in-depth analysis of your artwork. 
-                    Remember that art interpretation is subjective and should be used as a 
-                    tool for self-reflection and discussion with mental health professionals.
-                    """)
-                
-                # Additional context and resources
-                with st.expander("🔍 Understanding Your Results"):
-                    st.write("""
-                    ### How to Use These Insights
-                    - Use these insights as starting points for self-reflection
-                    - Consider discussing patterns with a mental health professional
-                    - Remember that art interpretation is subjective
-                    - Focus on patterns rather than individual elements
-                    
-                    ### Key Terms
-                    - **Expression Level**: Overall emotional communication in the artwork
-                    - **Emotional Balance**: Distribution of emotional elements
-                    - **Creative Energy**: Level of engagement and vitality in creation
-                    """)
+                result["report"] = report
+                result["llm_settings"] = llm_settings()
+                # Cache the finished analysis so reruns skip every stage
+                cache.set(cache_key, result)
+                similarity_index.add(vector, cache_key)
+            else:
+                st.write(result["report"])
+            report = result["report"]
             
-            # Tab 4: Final Report
-            with report_tab:
-                st.subheader("Comprehensive Report")
-                st.write("📊 Detailed Analysis Report")
-                st.write(report)
-                
-                # Generate and offer PDF download
-                pdf = generate_pdf_report(interpretation, report)
-                pdf_output = io.BytesIO()
-                pdf.output(pdf_output)
-                pdf_bytes = pdf_output.getvalue()
-                
-                st.download_button(
-                    label="📥 Download Detailed Report (PDF)",
-                    data=pdf_bytes,
-                    file_name="art_therapy_analysis.pdf",
-                    mime="application/pdf",
-                    help="Download a comprehensive PDF report of your artwork analysis"
-                )
-                
-                st.warning(
-                    "⚠️ Note: This analysis is meant for self-reflection and should not be "
-                    "considered as professional psychological advice. Please consult with "
-                    "a qualified art therapist for professional interpretation."
-                )
+            # The PDF is only built when the download is clicked (or ahead of
+            # time on a background thread) and is memoized by its content
+            from src.pdf_generator import get_pdf_renderer
+            pdf_renderer = get_pdf_renderer()
+            if PDF_BACKGROUND_RENDER:
+                pdf_renderer.prefetch(interpretation, report, image_bytes, report_charts, artwork_key=cache_key)
+            
+            st.download_button(
+                label="📥 Download Detailed Report (PDF)",
+                data=lambda: pdf_renderer.render(
+                    interpretation, report, image_bytes, report_charts, artwork_key=cache_key
+                ),
+                file_name="art_therapy_analysis.pdf",
+                mime="application/pdf",
+                help="Download a comprehensive PDF report of your artwork analysis"
+            )
+            
+            st.warning(
+                "⚠️ Note: This analysis is meant for self-reflection and should not be "
+                "considered as professional psychological advice. Please consult with "
+                "a qualified art therapist for professional interpretation."
+            )
+        
+        # Tab 5: History
+        with history_tab:
+            if user_id:
+                # Save each upload once per user and session, cache hits included
+                recorded = st.session_state.setdefault("recorded_analyses", set())
+                if (user_id, cache_key) not in recorded:
+                    with span("history.record"):
+                        features = {k: result[k] for k in ("color_stats", "texture_stats", "composition_stats")}
+                        get_history_store().record(
+                            user_id, features, interpretation, report, cache_key=cache_key
+                        )
+                    recorded.add((user_id, cache_key))
+                render_history(user_id)
+            else:
+                st.info("Turn on \"Keep a history\" in the sidebar to save analyses and see trends over time.")
+        
+        if SHOW_TIMING_PANEL:
+            render_timing_panel()
+    
+    warm_up()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
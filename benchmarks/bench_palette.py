@@ -0,0 +1,108 @@
+"""Palette engine latency from 1 to 50 MP and its error against clustering every pixel.
+
+Usage:
+    python -m benchmarks.bench_palette
+    python -m benchmarks.bench_palette artwork.jpg --sizes 1 4 12 --reference-max-mp 12
+
+Each size is the same picture (a synthetic artwork or IMAGE) resized, so
+only the pixel count changes. Latency is that of ``PaletteAnalyzer.analyze``;
+the error is ``palette_distance`` (share-weighted mean delta E) from the
+palette of all pixels. Exits non-zero when an error exceeds --tolerance.
+"""
+import argparse
+import json
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from benchmarks.corpus import synthetic_artwork
+from config import PALETTE_TOLERANCE
+from src.palette import PaletteAnalyzer, palette_distance
+
+DEFAULT_SIZES = (1, 4, 12, 24, 50)
+ASPECT = 4 / 3
+
+
+def resized(image, megapixels):
+    height = int(round(np.sqrt(megapixels * 1e6 / ASPECT)))
+    width = int(round(height * ASPECT))
+    return cv2.resize(image, (width, height), interpolation=cv2.INTER_LINEAR)
+
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def benchmark(base, sizes=DEFAULT_SIZES, reference_max_mp=50, repeat=5):
+    """One row per size: latency, full-pixel clustering time and palette error"""
+    analyzer = PaletteAnalyzer()
+    rows = []
+    for megapixels in sizes:
+        image = resized(base, megapixels)
+        elapsed, palette = best_of(lambda: analyzer.analyze(image), repeat)
+        row = {
+            'megapixels': image.shape[0] * image.shape[1] / 1e6,
+            'seconds': elapsed,
+            'reference_seconds': None,
+            'delta_e': None,
+            'warmth_error': None
+        }
+        if megapixels <= reference_max_mp:
+            start = time.perf_counter()
+            reference = analyzer.analyze_pixels(image.reshape(-1, 3))
+            row['reference_seconds'] = time.perf_counter() - start
+            row['delta_e'] = palette_distance(reference['colors'], palette['colors'])
+            row['warmth_error'] = abs(palette['warmth'] - reference['warmth'])
+        rows.append(row)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('image', nargs='?', help='Image to resize (default: a synthetic artwork)')
+    parser.add_argument('--sizes', nargs='+', type=float, default=list(DEFAULT_SIZES),
+                        help='Image sizes in megapixels')
+    parser.add_argument('--reference-max-mp', type=float, default=50,
+                        help='Largest size to also cluster at full pixel count (slow and memory hungry)')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--tolerance', type=float, default=PALETTE_TOLERANCE,
+                        help='Largest acceptable delta E against the full-pixel palette')
+    parser.add_argument('-o', '--output', help='Also write the results as JSON')
+    args = parser.parse_args()
+
+    if args.image:
+        base = cv2.imread(args.image, cv2.IMREAD_COLOR)
+        if base is None:
+            parser.error(f"could not read {args.image}")
+    else:
+        base = synthetic_artwork(1600, 1200)
+
+    rows = benchmark(base, args.sizes, args.reference_max_mp, args.repeat)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'tolerance': args.tolerance, 'results': rows}, f, indent=2)
+
+    print(f"{'MP':>6}  {'palette ms':>10}  {'all pixels ms':>13}  {'delta E':>7}  {'warmth err':>10}")
+    failed = False
+    for row in rows:
+        if row['delta_e'] is None:
+            reference = f"{'-':>13}  {'-':>7}  {'-':>10}"
+        else:
+            failed |= row['delta_e'] > args.tolerance
+            reference = (f"{row['reference_seconds'] * 1000:13.0f}  {row['delta_e']:7.2f}  "
+                         f"{row['warmth_error']:10.3f}")
+        print(f"{row['megapixels']:6.1f}  {row['seconds'] * 1000:10.1f}  {reference}")
+    if failed:
+        print(f"palette error above the tolerance of {args.tolerance} delta E", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
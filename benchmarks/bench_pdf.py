@@ -0,0 +1,102 @@
+"""PDF report build time and size: text only, naive images and cached images.
+
+Usage:
+    python -m benchmarks.bench_pdf
+    python -m benchmarks.bench_pdf artwork.jpg --repeat 10 -o pdf.json
+
+Every variant renders the same canned interpretation and report. The
+variants are:
+
+- text only: the report before images were added
+- full-size upload: embeds the upload as-is and exports both charts on every build
+- first build: a fresh ``PDFRenderer`` that encodes the thumbnail and charts
+- cached images: new report text, with the encoded images reused
+- cached PDF: the same report again, returned from the PDF cache
+
+The artwork is IMAGE, or a synthetic 12 MP artwork saved as a JPEG. Its
+digest is computed once up front, as the app does at upload. Charts need
+kaleido (and Chrome); without them every variant leaves the charts out.
+"""
+import argparse
+import json
+import sys
+import time
+
+import cv2
+
+from app import create_color_distribution_chart, create_emotion_radar_chart
+from benchmarks.corpus import synthetic_artwork
+from src.pdf_generator import PDFRenderer, generate_pdf_report
+from src.report_images import chart_png, upload_digest
+from src.structured_output import EMOTIONS
+from src.stub_completions import CANNED_COMPLETION, SAMPLE_INTERPRETATION
+
+COLOR_STATS = {'r': {'mean': 182.4}, 'g': {'mean': 141.9}, 'b': {'mean': 97.3}}
+
+
+def best_of(fn, repeat):
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        result = fn(i)
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def benchmark(artwork, repeat=5):
+    """(variant, build seconds, PDF bytes) rows"""
+    interpretation, report = SAMPLE_INTERPRETATION, CANNED_COMPLETION
+    emotions = {name: 0.3 + 0.5 * i / len(EMOTIONS) for i, name in enumerate(EMOTIONS)}
+    charts = [
+        ('emotions', emotions, create_emotion_radar_chart(emotions)),
+        ('colors', COLOR_STATS, create_color_distribution_chart(COLOR_STATS)),
+    ]
+    artwork_key = upload_digest(artwork)
+    renderer = PDFRenderer()
+
+    variants = (
+        ('text only', lambda i: bytes(generate_pdf_report(interpretation, report).output())),
+        ('full-size upload', lambda i: bytes(generate_pdf_report(
+            interpretation, report, thumbnail=artwork,
+            charts=[png for png in (chart_png(fig) for _, _, fig in charts) if png is not None]
+        ).output())),
+        ('first build', lambda i: PDFRenderer().render(interpretation, report, artwork, charts, artwork_key)),
+        # A different report each run, so only the images come from the cache
+        ('cached images', lambda i: renderer.render(f"{interpretation}\n{i}", report, artwork, charts, artwork_key)),
+        ('cached PDF', lambda i: renderer.render(interpretation, report, artwork, charts, artwork_key)),
+    )
+    rows = []
+    for name, build in variants:
+        elapsed, pdf_bytes = best_of(build, repeat)
+        rows.append({'variant': name, 'seconds': elapsed, 'bytes': len(pdf_bytes)})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('image', nargs='?', help='Artwork to embed (default: a synthetic 12 MP JPEG)')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('-o', '--output', help='Also write the results as JSON')
+    args = parser.parse_args()
+
+    if args.image:
+        with open(args.image, 'rb') as f:
+            artwork = f.read()
+    else:
+        _, encoded = cv2.imencode('.jpg', synthetic_artwork(4000, 3000), [cv2.IMWRITE_JPEG_QUALITY, 92])
+        artwork = encoded.tobytes()
+
+    rows = benchmark(artwork, args.repeat)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'artwork_bytes': len(artwork), 'results': rows}, f, indent=2)
+
+    print(f"artwork upload: {len(artwork) / 1024:.0f} KiB")
+    print(f"{'variant':<18}  {'build ms':>8}  {'size KiB':>8}")
+    for row in rows:
+        print(f"{row['variant']:<18}  {row['seconds'] * 1000:8.1f}  {row['bytes'] / 1024:8.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
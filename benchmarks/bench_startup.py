@@ -0,0 +1,129 @@
+"""Cold-start import time of the Streamlit app, from ``python -X importtime``.
+
+Usage:
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --budget-ms 200 --repeat 9 -o startup.json
+
+Each run imports ``app`` in a fresh interpreter, as a new replica does when
+its first session starts. The app's own cost is its import time minus that
+of streamlit, which it cannot avoid. The check fails when the best run's own
+cost is over the budget, or when a module that should only load with an
+upload (DEFERRED_MODULES) is imported at startup.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Heavy modules the landing page does not need; app.py imports them lazily
+DEFERRED_MODULES = (
+    'cv2', 'fpdf', 'groq', 'pandas', 'plotly.express', 'skimage',
+    'src.orchestrator', 'src.pdf_generator', 'src.image_analysis'
+)
+BUDGET_MS = 200
+
+
+def parse_importtime(stderr):
+    """[(name, depth, self_us, cumulative_us)] from an -X importtime report"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    return rows
+
+
+def measure_once(module='app'):
+    """``parse_importtime`` rows of one cold import of ``module``"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, capture_output=True, text=True, check=False
+    )
+    rows = parse_importtime(result.stderr)
+    if result.returncode != 0 or not rows:
+        raise RuntimeError(f"importing {module} failed:\n{result.stderr[-2000:]}")
+    return rows
+
+
+def children(rows, module):
+    """Rows imported directly by ``module``; the report lists them just before it"""
+    pending = []
+    for name, depth, self_us, cumulative_us in rows:
+        if depth == 0:
+            if name == module:
+                return pending
+            pending = []
+        elif depth == 1:
+            pending.append((name, cumulative_us))
+    return []
+
+
+def summarize(rows, module='app'):
+    cumulative = {name: cum for name, _, _, cum in rows}
+    total = cumulative[module]
+    direct = dict(children(rows, module))
+    streamlit = direct.get('streamlit', 0)
+    top_level = sorted(((cum, name) for name, cum in direct.items()), reverse=True)
+    return {
+        'total_ms': total / 1000,
+        'streamlit_ms': streamlit / 1000,
+        'own_ms': (total - streamlit) / 1000,
+        'top_level': [(name, cum / 1000) for cum, name in top_level[:10]],
+        'deferred_imported': [name for name in DEFERRED_MODULES if name in cumulative]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--module', default='app', help='Module to import (default: app)')
+    parser.add_argument('--repeat', type=int, default=5, help='Fresh interpreters to time')
+    parser.add_argument('--budget-ms', type=float, default=BUDGET_MS,
+                        help='Largest acceptable import time on top of streamlit')
+    parser.add_argument('-o', '--output', help='Also write the results as JSON')
+    args = parser.parse_args()
+
+    runs = [summarize(measure_once(args.module), args.module) for _ in range(args.repeat)]
+    best = min(runs, key=lambda run: run['own_ms'])
+    results = {
+        'module': args.module,
+        'budget_ms': args.budget_ms,
+        'repeat': args.repeat,
+        'total_ms': {'min': min(r['total_ms'] for r in runs),
+                     'median': statistics.median(r['total_ms'] for r in runs)},
+        'own_ms': {'min': best['own_ms'],
+                   'median': statistics.median(r['own_ms'] for r in runs)},
+        'streamlit_ms': best['streamlit_ms'],
+        'top_level': best['top_level'],
+        'deferred_imported': best['deferred_imported']
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    print(f"import {args.module}: {results['total_ms']['min']:.0f} ms best, "
+          f"{results['total_ms']['median']:.0f} ms median over {args.repeat} runs")
+    print(f"  streamlit {best['streamlit_ms']:.0f} ms, app's own {best['own_ms']:.0f} ms "
+          f"(budget {args.budget_ms:.0f} ms)")
+    print("slowest top-level imports (best run):")
+    for name, ms in best['top_level']:
+        print(f"  {ms:8.1f} ms  {name}")
+
+    failed = False
+    if best['own_ms'] > args.budget_ms:
+        print(f"cold start over budget: {best['own_ms']:.0f} ms > {args.budget_ms:.0f} ms",
+              file=sys.stderr)
+        failed = True
+    if best['deferred_imported']:
+        print(f"imported at startup but should load lazily: {', '.join(best['deferred_imported'])}",
+              file=sys.stderr)
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""Compare two benchmark result files and flag regressions.
+
+Usage:
+    python -m benchmarks.compare baseline.json current.json --threshold 0.15
+
+Exits with status 1 when any benchmark's median time (or peak memory) grew by
+more than the threshold relative to the baseline.
+"""
+import argparse
+import json
+import sys
+
+
+def compare(baseline, current, threshold=0.15, memory_threshold=0.25, min_seconds=0.001):
+    """Rows of (name, metric, baseline, current, ratio, regressed) for shared benchmarks.
+
+    Timings shorter than ``min_seconds`` in the baseline are reported but never
+    flagged, since they are dominated by noise.
+    """
+    rows = []
+    for name, base in baseline['results'].items():
+        if name not in current['results']:
+            continue
+        cur = current['results'][name]
+
+        ratio = cur['median_s'] / base['median_s'] if base['median_s'] else float('inf')
+        regressed = base['median_s'] >= min_seconds and ratio > 1 + threshold
+        rows.append((name, 'time', base['median_s'], cur['median_s'], ratio, regressed))
+
+        if base['peak_bytes']:
+            ratio = cur['peak_bytes'] / base['peak_bytes']
+            rows.append((name, 'memory', base['peak_bytes'], cur['peak_bytes'], ratio,
+                         ratio > 1 + memory_threshold))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    parser.add_argument('--threshold', type=float, default=0.15,
+                        help='Allowed relative slowdown of the median time')
+    parser.add_argument('--memory-threshold', type=float, default=0.25,
+                        help='Allowed relative growth of peak memory')
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    rows = compare(baseline, current, args.threshold, args.memory_threshold)
+    width = max((len(row[0]) for row in rows), default=10)
+    for name, metric, base, cur, ratio, regressed in rows:
+        if metric == 'time':
+            values = f"{base * 1000:9.2f} ms -> {cur * 1000:9.2f} ms"
+        else:
+            values = f"{base / 2 ** 20:9.1f} MiB -> {cur / 2 ** 20:8.1f} MiB"
+        flag = '  REGRESSION' if regressed else ''
+        print(f"{name:<{width}}  {metric:<6}  {values}  {ratio:6.2f}x{flag}")
+
+    missing = sorted(set(baseline['results']) - set(current['results']))
+    if missing:
+        print(f"Not in current results: {', '.join(missing)}")
+
+    regressions = [row for row in rows if row[5]]
+    if regressions:
+        print(f"{len(regressions)} regression(s) past the threshold")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+import cv2
+import numpy as np
+
+# (label, width, height) covering thumbnails up to 24 MP phone photos in
+# landscape, portrait, square and panoramic aspect ratios
+SIZES = (
+    ('0.3mp_4x3', 640, 480),
+    ('2mp_16x9', 1920, 1080),
+    ('4mp_1x1', 2048, 2048),
+    ('12mp_4x3', 4000, 3000),
+    ('12mp_3x4', 3000, 4000),
+    ('24mp_3x2', 6000, 4000),
+)
+
+QUICK_SIZES = SIZES[:3]
+
+
+def synthetic_artwork(width, height, seed=0):
+    """Deterministic painting-like RGB image: flat washes, strokes and grain"""
+    rng = np.random.default_rng(seed)
+    image = np.empty((height, width, 3), dtype=np.uint8)
+    image[:] = rng.integers(180, 256, 3, dtype=np.uint8)
+
+    scale = max(width, height)
+    for _ in range(40):
+        color = tuple(int(c) for c in rng.integers(0, 256, 3))
+        center = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+        radius = int(rng.integers(scale // 40, scale // 6))
+        thickness = int(rng.choice([-1, max(1, scale // 200)]))
+        cv2.circle(image, center, radius, color, thickness)
+        start = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+        end = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+        cv2.line(image, start, end, color, max(1, scale // int(rng.integers(100, 400))))
+
+    grain = rng.integers(-12, 13, (height, width, 1), dtype=np.int16)
+    return np.clip(image + grain, 0, 255).astype(np.uint8)
+
+
+def build_corpus(quick=False):
+    """{label: RGB array} for every benchmark size"""
+    return {
+        label: synthetic_artwork(width, height, seed=i)
+        for i, (label, width, height) in enumerate(QUICK_SIZES if quick else SIZES)
+    }
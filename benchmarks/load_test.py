@@ -0,0 +1,143 @@
+"""Load-test the full analysis pipeline with many concurrent sessions.
+
+Each session thread decodes an uploaded JPEG and runs ``AnalysisPipeline.run``
+(analysis, interpretation and report) the way a Streamlit session would,
+sharing one pipeline and its LLM concurrency limit. The default backend is
+the in-process stub, so no outside services are needed:
+
+    python -m benchmarks.load_test --sessions 32 --requests 4
+    LLM_STUB_LATENCY=0.5 LLM_STUB_TOKENS_PER_SECOND=100 python -m benchmarks.load_test
+    python -m benchmarks.load_test --backend openai   # LLM_BASE_URL, e.g. llama.cpp
+"""
+import argparse
+import json
+import statistics
+import sys
+import threading
+import time
+
+import cv2
+
+from benchmarks.corpus import synthetic_artwork
+from config import (
+    LLM_BACKEND,
+    LLM_BASE_URL,
+    LLM_MAX_CONCURRENCY,
+    LLM_PIPELINE_MODE,
+    LLM_STUB_LATENCY,
+    LLM_STUB_TOKENS_PER_SECOND
+)
+from src.ingest import load_image
+from src.llm_backends import BACKENDS
+from src.orchestrator import AnalysisPipeline
+from src.tracing import trace
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+def summarize(values):
+    return {
+        'p50_s': percentile(values, 50),
+        'p95_s': percentile(values, 95),
+        'max_s': max(values),
+        'mean_s': statistics.fmean(values)
+    }
+
+
+def run_load(pipeline, data, sessions, requests):
+    """Latencies, per-stage span durations and errors of ``sessions`` x ``requests`` runs"""
+    latencies = []
+    stages = {}
+    errors = []
+    lock = threading.Lock()
+
+    def session():
+        for _ in range(requests):
+            start = time.perf_counter()
+            try:
+                with trace('load_test.request') as request_trace:
+                    pipeline.run(load_image(data))
+            except Exception as e:
+                with lock:
+                    errors.append(repr(e))
+                continue
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                for s in request_trace.to_dict()['spans']:
+                    stages.setdefault(s['name'], []).append(s['duration_ms'] / 1000)
+
+    threads = [threading.Thread(target=session) for _ in range(sessions)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, stages, errors, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=16, help='Concurrent sessions')
+    parser.add_argument('--requests', type=int, default=2, help='Analyses per session')
+    parser.add_argument('--backend', choices=BACKENDS, default='stub' if LLM_BACKEND == 'groq' else LLM_BACKEND,
+                        help='LLM backend (default: stub, or LLM_BACKEND when it is not groq)')
+    parser.add_argument('--mode', choices=('two_call', 'combined'), default=LLM_PIPELINE_MODE)
+    parser.add_argument('--llm-concurrency', type=int, default=LLM_MAX_CONCURRENCY)
+    parser.add_argument('--image', help='Image file to upload (default: a synthetic 2 MP artwork)')
+    parser.add_argument('-o', '--output', help='Also write the results as JSON')
+    args = parser.parse_args()
+
+    if args.image:
+        with open(args.image, 'rb') as f:
+            data = f.read()
+    else:
+        data = cv2.imencode('.jpg', synthetic_artwork(1920, 1080))[1].tobytes()
+
+    pipeline = AnalysisPipeline(max_concurrency=args.llm_concurrency, mode=args.mode,
+                                backend=args.backend)
+    latencies, stages, errors, wall = run_load(pipeline, data, args.sessions, args.requests)
+
+    settings = {
+        'backend': args.backend,
+        'mode': args.mode,
+        'sessions': args.sessions,
+        'requests': args.requests,
+        'llm_concurrency': args.llm_concurrency
+    }
+    if args.backend == 'stub':
+        settings.update(stub_latency=LLM_STUB_LATENCY, stub_tokens_per_second=LLM_STUB_TOKENS_PER_SECOND)
+    elif args.backend == 'openai':
+        settings['base_url'] = LLM_BASE_URL
+    results = {
+        'settings': settings,
+        'wall_s': wall,
+        'completed': len(latencies),
+        'errors': errors,
+        'throughput_per_min': len(latencies) / wall * 60,
+        'latency': summarize(latencies) if latencies else None,
+        'stages': {name: summarize(values) for name, values in sorted(stages.items())}
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    print(', '.join(f"{key}={value}" for key, value in settings.items()))
+    print(f"{len(latencies)} completed, {len(errors)} failed in {wall:.1f} s "
+          f"({results['throughput_per_min']:.1f} analyses/min)")
+    if latencies:
+        width = max(len(name) for name in ['request', *stages])
+        print(f"{'stage':<{width}}  {'p50 ms':>9}  {'p95 ms':>9}  {'max ms':>9}")
+        for name, summary in [('request', results['latency']), *results['stages'].items()]:
+            print(f"{name:<{width}}  {summary['p50_s'] * 1000:9.1f}  {summary['p95_s'] * 1000:9.1f}  "
+                  f"{summary['max_s'] * 1000:9.1f}")
+    for error in errors[:5]:
+        print(f"error: {error}", file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,199 @@
+"""Time the analysis and reporting pipeline and save the results as a JSON baseline.
+
+Usage:
+    python -m benchmarks.run -o baseline.json
+    python -m benchmarks.run --quick -o current.json
+    python -m benchmarks.compare baseline.json current.json
+
+LLM calls go to a local stub server that replays canned completions, so no
+network access or API key is needed.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from groq import Groq
+
+from benchmarks.corpus import build_corpus
+from benchmarks.stub_server import StubGroqServer
+from src.image_analysis import ImageAnalyzer
+from src.interpretation_engine import ArtworkInterpreter
+from src.pdf_generator import generate_pdf_report
+from src.report_generator import ReportGenerator
+from src.stub_completions import CANNED_COMPLETION, SAMPLE_INTERPRETATION
+from src.token_budget import count_message_tokens
+from src.tracing import trace
+
+ANALYZER_METHODS = ('analyze_colors', 'analyze_texture', 'analyze_composition', 'analyze_all')
+
+
+def measure(fn, setup=None, repeat=5):
+    """Wall time over ``repeat`` runs plus tracemalloc peak of one extra run.
+
+    ``setup`` builds the argument for each run outside the timed region.
+    """
+    times = []
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        fn(arg) if setup else fn()
+        times.append(time.perf_counter() - start)
+
+    # Memory is measured separately so tracing overhead does not skew timings
+    arg = setup() if setup else None
+    tracemalloc.start()
+    try:
+        fn(arg) if setup else fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'min_s': min(times),
+        'median_s': statistics.median(times),
+        'peak_bytes': peak,
+        'repeat': repeat
+    }
+
+
+def bench_image_analysis(corpus, repeat):
+    results = {}
+    for label, image in corpus.items():
+        results[f'ImageAnalyzer.__init__[{label}]'] = measure(lambda: ImageAnalyzer(image), repeat=repeat)
+        for method in ANALYZER_METHODS:
+            # Fresh analyzer per run so cached pyramid levels do not carry over
+            results[f'ImageAnalyzer.{method}[{label}]'] = measure(
+                lambda analyzer: getattr(analyzer, method)(),
+                setup=lambda: ImageAnalyzer(image),
+                repeat=repeat
+            )
+    return results
+
+
+def bench_pdf(repeat):
+    interpretation = CANNED_COMPLETION * 3
+    report = CANNED_COMPLETION
+    return {
+        'generate_pdf_report': measure(lambda: generate_pdf_report(interpretation, report), repeat=repeat),
+        'pdf.output': measure(
+            lambda pdf: pdf.output(),
+            setup=lambda: generate_pdf_report(interpretation, report),
+            repeat=repeat
+        )
+    }
+
+
+def llm_usage(fn):
+    """Calls and summed prompt / completion tokens of one run of ``fn``, from its trace spans"""
+    with trace('benchmark') as run:
+        fn()
+    spans = [s for s in run.to_dict()['spans'] if 'completion_tokens' in s['attributes']]
+    return {
+        'calls': len(spans),
+        'prompt_tokens': sum(s['attributes']['prompt_tokens'] or 0 for s in spans),
+        'completion_tokens': sum(s['attributes']['completion_tokens'] or 0 for s in spans)
+    }
+
+
+def bench_llm(features, repeat, latency, tokens_per_second, prefill_tokens_per_second=None):
+    results = {}
+    with StubGroqServer(latency=latency, tokens_per_second=tokens_per_second,
+                        prefill_tokens_per_second=prefill_tokens_per_second) as server:
+        client = Groq(api_key='stub', base_url=server.base_url)
+        interpreter = ArtworkInterpreter(client=client)
+        report_gen = ReportGenerator(client=client)
+
+        results['ArtworkInterpreter.interpret_features'] = measure(
+            lambda: interpreter.interpret_features(**features), repeat=repeat
+        )
+        results['ReportGenerator.generate_report'] = measure(
+            lambda: report_gen.generate_report(CANNED_COMPLETION), repeat=repeat
+        )
+
+        # Prompt size and latency of the report stage with and without the
+        # compacted interpretation and prompts
+        for label, compact in (('full', False), ('compact', True)):
+            generator = ReportGenerator(client=client, compact=compact)
+            request = generator.build_request(SAMPLE_INTERPRETATION)
+            result = measure(lambda: generator.generate_report(SAMPLE_INTERPRETATION), repeat=repeat)
+            result['prompt_tokens'] = count_message_tokens(request['messages'])
+            result['max_tokens'] = request['max_tokens']
+            results[f'ReportGenerator.generate_report[{label}]'] = result
+
+        # A full interpretation and report as two completions versus one
+        def two_call():
+            parsed = interpreter.interpret_features(**features)
+            report_gen.generate_report(parsed['interpretation'])
+
+        for label, fn in (('two_call', two_call),
+                          ('combined', lambda: interpreter.interpret_and_report(**features))):
+            result = measure(fn, repeat=repeat)
+            result.update(llm_usage(fn))
+            results[f'interpretation+report[{label}]'] = result
+
+        def first_token():
+            stream = interpreter.stream_features(**features)
+            next(stream)
+            stream.close()
+
+        results['ArtworkInterpreter.stream_features.first_token'] = measure(first_token, repeat=repeat)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-o', '--output', required=True, help='Where to write the JSON results')
+    parser.add_argument('--quick', action='store_true', help='Only the smaller corpus images')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--skip', nargs='*', default=[], choices=('analysis', 'pdf', 'llm'))
+    parser.add_argument('--llm-latency', type=float, default=0.05,
+                        help='Stub server delay before the first token (seconds)')
+    parser.add_argument('--llm-tokens-per-second', type=float, default=2000.0)
+    parser.add_argument('--llm-prefill-tokens-per-second', type=float, default=5000.0,
+                        help='Stub prompt processing rate, so prompt size shows in latency')
+    args = parser.parse_args()
+
+    corpus = build_corpus(quick=args.quick)
+    results = {}
+    if 'analysis' not in args.skip:
+        results.update(bench_image_analysis(corpus, args.repeat))
+    if 'pdf' not in args.skip:
+        results.update(bench_pdf(args.repeat))
+    if 'llm' not in args.skip:
+        features = ImageAnalyzer(next(iter(corpus.values()))).analyze_all()
+        results.update(bench_llm(features, args.repeat, args.llm_latency, args.llm_tokens_per_second,
+                                 args.llm_prefill_tokens_per_second))
+
+    output = {
+        'meta': {
+            'created': datetime.now(timezone.utc).isoformat(),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'quick': args.quick,
+            'llm_latency': args.llm_latency,
+            'llm_tokens_per_second': args.llm_tokens_per_second,
+            'llm_prefill_tokens_per_second': args.llm_prefill_tokens_per_second
+        },
+        'results': results
+    }
+    with open(args.output, 'w') as f:
+        json.dump(output, f, indent=2)
+
+    width = max(len(name) for name in results)
+    for name, result in results.items():
+        tokens = f"  {result['prompt_tokens']:6d} prompt tokens" if 'prompt_tokens' in result else ''
+        if 'completion_tokens' in result:
+            tokens += f" + {result['completion_tokens']:5d} completion in {result['calls']} call(s)"
+        print(f"{name:<{width}}  {result['median_s'] * 1000:9.2f} ms  "
+              f"{result['peak_bytes'] / 2 ** 20:8.1f} MiB{tokens}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""Local stand-in for the Groq chat completions API.
+
+Replays canned completions with a configurable delay before the first token
+and a fixed token rate, in both regular and streaming (SSE) form. Requests
+for the JSON interpretation format get a canned JSON object, and combined
+interpretation + report requests a canned marked-up reply. Point the
+app at it with GROQ_BASE_URL, or as an OpenAI-compatible server:
+
+    python -m benchmarks.stub_server --port 8800 --latency 0.3 --tokens-per-second 250
+    GROQ_BASE_URL=http://127.0.0.1:8800 GROQ_API_KEY=stub streamlit run app.py
+    LLM_BACKEND=openai LLM_BASE_URL=http://127.0.0.1:8800/v1 streamlit run app.py
+"""
+import argparse
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.stub_completions import (
+    CANNED_COMBINED,
+    CANNED_COMPLETION,
+    CANNED_INTERPRETATION,
+    approximate_tokens,
+    prompt_text,
+    wants_combined,
+    wants_json
+)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self.send_error(404)
+            return
+        length = int(self.headers.get('Content-Length', 0))
+        request = json.loads(self.rfile.read(length) or b'{}')
+        prompt = prompt_text(request)
+        self.server.record_request(request)
+
+        config = self.server
+        if wants_combined(request):
+            completion = config.combined_completion
+        elif wants_json(request):
+            completion = config.json_completion
+        else:
+            completion = config.completion
+        words = completion.split(' ')
+        words = words[:max(1, request.get('max_tokens') or len(words))]
+        base = {
+            'id': f'chatcmpl-{uuid.uuid4().hex[:12]}',
+            'created': int(time.time()),
+            'model': request.get('model', 'stub')
+        }
+        usage = {
+            'prompt_tokens': approximate_tokens(prompt),
+            'completion_tokens': len(words),
+            'total_tokens': approximate_tokens(prompt) + len(words)
+        }
+
+        time.sleep(config.latency)
+        if config.prefill_tokens_per_second:
+            time.sleep(usage['prompt_tokens'] / config.prefill_tokens_per_second)
+        if request.get('stream'):
+            self._stream(base, words, usage)
+        else:
+            time.sleep(len(words) / config.tokens_per_second)
+            body = json.dumps({
+                **base,
+                'object': 'chat.completion',
+                'choices': [{
+                    'index': 0,
+                    'message': {'role': 'assistant', 'content': ' '.join(words)},
+                    'finish_reason': 'stop'
+                }],
+                'usage': usage
+            }).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    def _stream(self, base, words, usage):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        interval = 1 / self.server.tokens_per_second
+        for i, word in enumerate(words):
+            chunk = {
+                **base,
+                'object': 'chat.completion.chunk',
+                'choices': [{
+                    'index': 0,
+                    'delta': {'content': word if i == 0 else ' ' + word},
+                    'finish_reason': None
+                }]
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+            time.sleep(interval)
+        final = {
+            **base,
+            'object': 'chat.completion.chunk',
+            'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}],
+            'usage': usage,
+            'x_groq': {'usage': usage}
+        }
+        self.wfile.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode())
+        self.wfile.flush()
+        self.close_connection = True
+
+
+class StubGroqServer(ThreadingHTTPServer):
+    """Threaded stub server; use as a context manager to run it in the background"""
+
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.2, tokens_per_second=250.0,
+                 completion=CANNED_COMPLETION, json_completion=CANNED_INTERPRETATION,
+                 prefill_tokens_per_second=None, combined_completion=CANNED_COMBINED):
+        super().__init__((host, port), _Handler)
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        # Optional extra delay proportional to the prompt length
+        self.prefill_tokens_per_second = prefill_tokens_per_second
+        self.completion = completion
+        self.json_completion = json_completion
+        self.combined_completion = combined_completion
+        self.requests = []
+        self._requests_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def record_request(self, request):
+        with self._requests_lock:
+            self.requests.append(request)
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8800)
+    parser.add_argument('--latency', type=float, default=0.2, help='Seconds before the first token')
+    parser.add_argument('--tokens-per-second', type=float, default=250.0)
+    parser.add_argument('--prefill-tokens-per-second', type=float, default=None,
+                        help='Prompt tokens processed per second before the first token')
+    args = parser.parse_args()
+
+    server = StubGroqServer(args.host, args.port, args.latency, args.tokens_per_second,
+                            prefill_tokens_per_second=args.prefill_tokens_per_second)
+    print(f"Stub Groq API listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,4 +4,150 @@ from dotenv import load_dotenv
 load_dotenv()
 
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-MODEL_NAME = "llama-3.2-11b-vision-preview" 
\ No newline at end of file
+MODEL_NAME = os.getenv("LLM_MODEL", "llama-3.2-11b-vision-preview")
+
+# LLM backend: "groq" (the Groq API), "openai" (an OpenAI-compatible server
+# such as llama.cpp or vLLM at LLM_BASE_URL) or "stub" (canned in-process
+# replies after LLM_STUB_LATENCY seconds, at LLM_STUB_TOKENS_PER_SECOND)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "groq")
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "http://127.0.0.1:8080/v1")
+LLM_API_KEY = os.getenv("LLM_API_KEY")
+LLM_STUB_LATENCY = float(os.getenv("LLM_STUB_LATENCY", "0.2"))
+LLM_STUB_TOKENS_PER_SECOND = float(os.getenv("LLM_STUB_TOKENS_PER_SECOND", "250"))
+
+# Result cache: in-memory LRU plus an optional on-disk tier (disabled when unset)
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "128"))
+CACHE_DIR = os.getenv("CACHE_DIR")
+CACHE_MAX_DISK_MB = int(os.getenv("CACHE_MAX_DISK_MB", "512"))
+
+# Uploads larger than this many pixels are rejected before decoding. Larger
+# JPEGs are decoded at 1/2, 1/4 or 1/8 scale when that still leaves
+# INGEST_DECODE_MARGIN times ANALYSIS_MAX_SIDE for the final resize; 1.0 uses
+# the smallest decode but moves texture features by up to ~15%
+INGEST_MAX_PIXELS = int(os.getenv("INGEST_MAX_PIXELS", str(100_000_000)))
+INGEST_DECODE_MARGIN = 2.0
+
+# Image analysis working sizes (longest side in pixels, None keeps full size).
+# Uploads are first capped at ANALYSIS_MAX_SIDE; each feature family then runs
+# on its own level of a cached pyramid. Use `python -m src.resolution_drift`
+# to check how far the features move before lowering these.
+ANALYSIS_MAX_SIDE = 2048
+ANALYSIS_RESOLUTIONS = {
+    "color": 1024,
+    "texture": None,
+    "composition": None
+}
+
+# Tiled analysis (src/tiled_analysis.py) for scans analyzed at full size:
+# tile side in pixels, halo read around each tile for edge detection, and
+# threads (0 uses every core)
+ANALYSIS_TILE_SIZE = 1024
+ANALYSIS_TILE_OVERLAP = 64
+ANALYSIS_TILE_WORKERS = int(os.getenv("ANALYSIS_TILE_WORKERS", "0")) or None
+
+# LLM orchestration: shared async client pool, per-call timeout (seconds),
+# concurrent in-flight completions and jittered retries on rate limits
+LLM_MAX_CONNECTIONS = 20
+LLM_MAX_CONCURRENCY = 8
+LLM_TIMEOUT = 60
+LLM_MAX_RETRIES = 4
+LLM_BACKOFF_BASE = 1.0
+LLM_BACKOFF_MAX = 20.0
+
+# Token budgets: prompts are measured locally (tiktoken when installed) and
+# each call's max_tokens is capped per stage and by what the context window
+# has left. With compact prompts the report stage gets the interpretation
+# cut down to its section headings and key sentences.
+LLM_CONTEXT_TOKENS = 8192
+LLM_MIN_COMPLETION_TOKENS = 256
+LLM_INTERPRETATION_MAX_TOKENS = 1280
+LLM_REPORT_MAX_TOKENS = 1024
+LLM_COMPACT_PROMPTS = True
+REPORT_INTERPRETATION_TOKENS = 600
+
+# "two_call" asks for the interpretation and then the report; "combined"
+# gets both, plus the chart scores, from one completion split at marker lines
+LLM_PIPELINE_MODE = os.getenv("LLM_PIPELINE_MODE", "two_call")
+LLM_COMBINED_MAX_TOKENS = 2304
+
+# Serving mode: "inline" runs analysis and LLM calls in the Streamlit script
+# thread; "queue" hands them to a pool of JOB_WORKERS processes and polls
+# for the result. New jobs are turned away while JOB_QUEUE_MAX are pending
+# or the user already has JOB_USER_LIMIT running; finished results are kept
+# for JOB_RESULT_TTL seconds
+SERVING_MODE = os.getenv("SERVING_MODE", "inline")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_QUEUE_MAX = int(os.getenv("JOB_QUEUE_MAX", "32"))
+JOB_USER_LIMIT = 2
+JOB_POLL_INTERVAL = 0.5
+JOB_RESULT_TTL = 600
+
+# Stream interpretation and report tokens into the UI as they are generated
+LLM_STREAMING = True
+
+# Ask for the interpretation as a JSON object (prose, emotion scores and key
+# points in one completion) via response_format on non-streamed calls
+LLM_JSON_MODE = True
+
+# GLCM texture engine: gray-level quantization and pixel-pair offsets
+# (distances in pixels, angles in radians). 256 levels at distance 1,
+# angle 0 matches skimage's graycomatrix on the full gray range.
+TEXTURE_LEVELS = 256
+TEXTURE_DISTANCES = (1,)
+TEXTURE_ANGLES = (0.0,)
+
+# Composition engine: Canny thresholds, the rows x cols grid for tiled edge
+# density, and the spread of the rule-of-thirds weights (fraction of the
+# shorter side)
+COMPOSITION_CANNY_THRESHOLDS = (100, 200)
+COMPOSITION_GRID = (3, 3)
+COMPOSITION_THIRDS_SIGMA = 1 / 12
+
+# Palette engine: dominant colors from k-means in CIELAB over a stratified
+# sample of PALETTE_SAMPLES pixels, so the cost does not grow with image size.
+# Colors with Lab chroma under PALETTE_NEUTRAL_CHROMA count as neutral for
+# the warmth statistics; the benchmark fails above PALETTE_TOLERANCE (mean
+# delta E against clustering every pixel)
+PALETTE_COLORS = 5
+PALETTE_SAMPLES = 16384
+PALETTE_NEUTRAL_CHROMA = 10.0
+PALETTE_TOLERANCE = 5.0
+# The dominant colors need a k-means run per image, which costs more than
+# every other feature together; unless ANALYSIS_PALETTE is set, analyses keep
+# only the tone statistics and an empty list of colors
+ANALYSIS_PALETTE = os.getenv("ANALYSIS_PALETTE", "").lower() in ("1", "true", "yes")
+
+# Near-duplicate reuse: uploads whose feature vector is within
+# SIMILARITY_THRESHOLD of an earlier one can reuse its interpretation and
+# report. SIMILARITY_REUSE is "offer" (ask the user), "auto" or "off"; the
+# index is kept in memory unless SIMILARITY_INDEX_DIR is set, and
+# SIMILARITY_BACKEND "hnsw" needs hnswlib
+SIMILARITY_REUSE = os.getenv("SIMILARITY_REUSE", "offer")
+SIMILARITY_THRESHOLD = 0.25
+SIMILARITY_INDEX_DIR = os.getenv("SIMILARITY_INDEX_DIR")
+SIMILARITY_BACKEND = os.getenv("SIMILARITY_BACKEND", "flat")
+
+# Per-user analysis history (SQLite). Trend charts plot every analysis up to
+# HISTORY_MAX_POINTS and switch to daily means for longer histories
+HISTORY_DB_PATH = os.getenv("HISTORY_DB_PATH", "history.sqlite3")
+HISTORY_MAX_POINTS = 500
+
+# Tracing: JSON-lines trace log, Prometheus /metrics port and the in-app
+# timing panel are all off unless configured
+TRACE_LOG_PATH = os.getenv("TRACE_LOG_PATH")
+TRACE_METRICS_PORT = int(os.getenv("TRACE_METRICS_PORT")) if os.getenv("TRACE_METRICS_PORT") else None
+SHOW_TIMING_PANEL = os.getenv("SHOW_TIMING_PANEL", "").lower() in ("1", "true", "yes")
+
+# PDF reports are built when the user clicks download and memoized by
+# report text; enable background rendering to build them ahead of the click
+PDF_CACHE_ENTRIES = 32
+PDF_BACKGROUND_RENDER = False
+
+# Report PDFs embed a downscaled JPEG of the artwork and PNG renderings of
+# the emotion and color charts, each encoded once per analysis; body text
+# uses PDF_LINE_HEIGHT (mm) lines
+PDF_THUMBNAIL_SIDE = 600
+PDF_THUMBNAIL_QUALITY = 75
+PDF_CHART_SIZE = (640, 440)
+PDF_IMAGE_CACHE_ENTRIES = 128
+PDF_LINE_HEIGHT = 6
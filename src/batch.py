@@ -0,0 +1,211 @@
+"""Analyze a directory or manifest of artwork without the Streamlit UI.
+
+Usage:
+    python -m src.batch ARCHIVE_DIR -o results.jsonl
+    python -m src.batch manifest.txt -o results.jsonl --offline
+    python -m src.batch ARCHIVE_DIR -o results.jsonl --parquet results.parquet
+    python -m src.batch SCANS_DIR -o results.jsonl --full-resolution
+
+Feature extraction runs in a process pool sized to the machine. Interpretation
+and report generation go through a bounded async queue on the shared
+AnalysisPipeline. Each finished image is appended to the JSONL output
+straight away, and a restarted run skips images that are already done.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+def find_images(source):
+    """Image paths under a directory, or listed one per line in a manifest file"""
+    if os.path.isdir(source):
+        paths = []
+        for root, _, files in os.walk(source):
+            for name in files:
+                if name.lower().endswith(IMAGE_EXTENSIONS):
+                    paths.append(os.path.join(root, name))
+        return sorted(paths)
+
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source) as f:
+        lines = [line.strip() for line in f]
+    return [line if os.path.isabs(line) else os.path.join(base, line)
+            for line in lines if line and not line.startswith('#')]
+
+
+def load_records(output):
+    """Latest record per image path from an existing JSONL output"""
+    records = {}
+    if not os.path.exists(output):
+        return records
+    with open(output) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A run killed mid-write can leave a truncated last line
+                continue
+            records[record['path']] = record
+    return records
+
+
+def is_done(record, offline):
+    if record is None or 'error' in record:
+        return False
+    return offline or 'report' in record
+
+
+def _init_worker():
+    import cv2
+    # One OpenCV thread per process; the pool already uses every core
+    cv2.setNumThreads(1)
+
+
+def extract_record(path, full_resolution=False):
+    """Feature extraction for one image, run inside a pool worker.
+
+    With ``full_resolution`` the image is analyzed at its own size by
+    TiledAnalyzer, whose tiles run on threads within the worker.
+    """
+    from src.image_analysis import ImageAnalyzer, to_builtin
+    from src.ingest import load_image
+    from src.tiled_analysis import TiledAnalyzer
+
+    start = time.perf_counter()
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        if full_resolution:
+            image = load_image(data, max_side=None)
+            features = TiledAnalyzer.from_bgr(image, max_side=None, resolutions={}).analyze_all()
+        else:
+            features = ImageAnalyzer.from_bgr(load_image(data)).analyze_all()
+    except Exception as e:
+        return {'path': path, 'error': repr(e)}
+    return {
+        'path': path,
+        'features': to_builtin(features),
+        'timings': {'features_s': time.perf_counter() - start}
+    }
+
+
+async def run_batch(paths, output, pipeline=None, workers=None, llm_concurrency=4,
+                    full_resolution=False):
+    """Process ``paths`` and append one JSON record per image to ``output``.
+
+    With ``pipeline=None`` the LLM stages are skipped (offline mode).
+    Full-resolution runs default to one worker process, since each image
+    already spreads its tiles over the cores.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=llm_concurrency * 2)
+    completed = 0
+
+    with open(output, 'a') as out, ProcessPoolExecutor(
+        max_workers=workers or (1 if full_resolution else os.cpu_count()),
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_worker
+    ) as pool:
+
+        def write(record):
+            nonlocal completed
+            out.write(json.dumps(record) + '\n')
+            out.flush()
+            completed += 1
+            status = 'error' if 'error' in record else 'ok'
+            print(f"[{completed}/{len(paths)}] {status} {record['path']}", file=sys.stderr)
+
+        async def llm_worker():
+            while True:
+                record = await queue.get()
+                if record is None:
+                    return
+                start = time.perf_counter()
+                try:
+                    record.update(await pipeline.generate(record['features']))
+                except Exception as e:
+                    record['error'] = repr(e)
+                record['timings']['llm_s'] = time.perf_counter() - start
+                write(record)
+
+        consumers = []
+        if pipeline is not None:
+            consumers = [asyncio.create_task(llm_worker()) for _ in range(llm_concurrency)]
+
+        futures = [loop.run_in_executor(pool, extract_record, path, full_resolution)
+                   for path in paths]
+        for future in asyncio.as_completed(futures):
+            record = await future
+            if pipeline is None or 'error' in record:
+                write(record)
+            else:
+                # Blocks when the LLM stage falls behind
+                await queue.put(record)
+
+        for _ in consumers:
+            await queue.put(None)
+        await asyncio.gather(*consumers)
+
+
+def export_parquet(output, parquet_path):
+    """Write the latest record per image as a flat Parquet table"""
+    import pandas as pd
+    from src.image_analysis import flatten_features
+
+    rows = []
+    for record in load_records(output).values():
+        row = {'path': record['path']}
+        row.update(flatten_features(record.get('features', {})))
+        row.update(flatten_features(record.get('timings', {}), 'timings.'))
+        row.update(flatten_features(record.get('insights') or {}, 'insights.'))
+        for key in ('interpretation', 'report', 'error'):
+            row[key] = record.get(key)
+        rows.append(row)
+    pd.DataFrame(rows).to_parquet(parquet_path, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('source', help='Directory of images or a manifest file with one path per line')
+    parser.add_argument('-o', '--output', required=True, help='JSONL file to append results to')
+    parser.add_argument('--offline', action='store_true',
+                        help='Only extract features; skip interpretation and report generation')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Feature extraction processes (default: number of cores, '
+                             'or 1 with --full-resolution)')
+    parser.add_argument('--full-resolution', action='store_true',
+                        help='Analyze each image at full size in tiles instead of downscaling it')
+    parser.add_argument('--llm-concurrency', type=int, default=4,
+                        help='Images in the LLM stages at once')
+    parser.add_argument('--parquet', help='Also export the results to this Parquet file')
+    args = parser.parse_args()
+
+    done = load_records(args.output)
+    paths = [path for path in find_images(args.source)
+             if not is_done(done.get(path), args.offline)]
+    print(f"{len(paths)} images to process, {len(done)} already in {args.output}", file=sys.stderr)
+
+    if args.offline:
+        asyncio.run(run_batch(paths, args.output, workers=args.workers,
+                              full_resolution=args.full_resolution))
+    else:
+        from src.orchestrator import AnalysisPipeline
+        # Run on the pipeline's own loop so the shared async client is usable
+        pipeline = AnalysisPipeline(max_concurrency=args.llm_concurrency)
+        pipeline.submit(run_batch(
+            paths, args.output, pipeline, args.workers, args.llm_concurrency, args.full_resolution
+        )).result()
+
+    if args.parquet:
+        export_parquet(args.output, args.parquet)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+import cv2
+import numpy as np
+from config import (
+    ANALYSIS_PALETTE, COMPOSITION_GRID, PALETTE_COLORS, PALETTE_SAMPLES, TEXTURE_ANGLES,
+    TEXTURE_DISTANCES
+)
+from src.composition import CompositionAnalyzer, edge_grid, thirds_weight
+from src.palette import PaletteAnalyzer, describe, sample_indices, tone_arrays
+from src.texture import PROPERTIES, GLCMTexture, offset_suffix, texture_stats
+
+CHANNELS = ('b', 'g', 'r')
+# The same keys texture_stats gives ImageAnalyzer for the configured offsets
+_OFFSETS = [(distance, angle) for distance in TEXTURE_DISTANCES for angle in TEXTURE_ANGLES]
+TEXTURE_FEATURES = PROPERTIES + tuple(
+    f'{name}_{offset_suffix(distance, angle)}'
+    for distance, angle in (_OFFSETS if len(_OFFSETS) > 1 else ()) for name in PROPERTIES
+)
+TONE_FEATURES = ('warmth', 'warm_ratio', 'cool_ratio', 'neutral_ratio', 'saturation_mean',
+                 'saturation_std', 'lightness_mean', 'chroma_mean')
+COMPOSITION_FEATURES = ('edge_density', 'symmetry_score', 'symmetry_top_bottom',
+                        'symmetry_diagonal', 'symmetry_anti_diagonal', 'thirds_weight')
+
+# Images per block of the batched symmetry pass, bounding its temporaries
+SYMMETRY_CHUNK = 64
+
+# One row per image; column names are <channel>_<stat> for color, the
+# palette's Lab centers and shares (zero-share rows are padding, and all of
+# them without palette=True), and the plain feature name for tone, texture
+# and composition
+FEATURE_DTYPE = np.dtype(
+    [(f'{col}_{stat}', 'f8') for col in CHANNELS for stat in ('mean', 'std')]
+    + [(f'{col}_dominant_values', 'i8') for col in CHANNELS]
+    + [('palette_lab', 'f8', (PALETTE_COLORS, 3)), ('palette_proportion', 'f8', (PALETTE_COLORS,))]
+    + [(name, 'f8') for name in TONE_FEATURES]
+    + [(name, 'f8') for name in TEXTURE_FEATURES + COMPOSITION_FEATURES]
+    + [('edge_grid', 'f8', COMPOSITION_GRID)]
+)
+
+
+class BatchImageAnalyzer:
+    """ImageAnalyzer features for a stack of same-size RGB images.
+
+    Accepts an N x H x W x 3 uint8 array or a list of same-size images and
+    returns a structured array with one row per image. Images are analyzed at
+    their own size; no working-size policy is applied.
+
+    Tone statistics come from one pixel sample shared by the whole stack.
+    The dominant palette needs k-means per image, which costs far more than
+    every other feature together, so like ImageAnalyzer's it is only computed
+    with ``palette=True`` (default: ANALYSIS_PALETTE); without it the palette columns stay zero and ``to_dicts`` gives an empty
+    ``colors`` list.
+    """
+
+    def __init__(self, images, palette=ANALYSIS_PALETTE):
+        if isinstance(images, (list, tuple)):
+            images = np.stack([np.asarray(image) for image in images])
+        images = np.ascontiguousarray(images)
+        if images.ndim != 4 or images.shape[-1] != 3 or images.dtype != np.uint8:
+            raise ValueError(f"expected an N x H x W x 3 uint8 stack, got {images.dtype} {images.shape}")
+        self.images = images
+        self.palette = palette
+        self._gray = None
+
+    @property
+    def gray(self):
+        """N x H x W grayscale stack from a single conversion call"""
+        if self._gray is None:
+            n, height, width, _ = self.images.shape
+            flat = self.images.reshape(n * height, width, 3)
+            self._gray = cv2.cvtColor(flat, cv2.COLOR_RGB2GRAY).reshape(n, height, width)
+        return self._gray
+
+    def analyze(self):
+        records = np.zeros(len(self.images), dtype=FEATURE_DTYPE)
+        self._analyze_colors(records)
+        self._analyze_texture(records)
+        self._analyze_composition(records)
+        return records
+
+    def _analyze_colors(self, records):
+        n = len(self.images)
+        levels = np.arange(256, dtype=np.float64)
+        # Offsetting each image's values by 256 * index gives every image its
+        # own block of bins, so one bincount builds all N histograms
+        offsets = (np.arange(n, dtype=np.intp) * 256)[:, None]
+
+        for col, channel in zip(CHANNELS, (2, 1, 0)):
+            values = self.images[..., channel].reshape(n, -1)
+            hist = np.bincount((values + offsets).ravel(), minlength=n * 256)
+            hist = hist.reshape(n, 256).astype(np.float64)
+            count = hist.sum(axis=1)
+            mean = hist @ levels / count
+            variance = (hist * (levels[None, :] - mean[:, None]) ** 2).sum(axis=1) / count
+            records[f'{col}_mean'] = mean
+            records[f'{col}_std'] = np.sqrt(np.maximum(variance, 0.0))
+            records[f'{col}_dominant_values'] = hist.argmax(axis=1)
+
+        # Same-size images share the palette's sample positions, so the tone
+        # statistics are computed for the whole stack at once
+        indices = sample_indices(*self.images.shape[1:3], PALETTE_SAMPLES)
+        if indices is None:
+            pixels = self.images.reshape(n, -1, 3)
+        else:
+            pixels = self.images[:, indices[0], indices[1]]
+        for name, values in tone_arrays(pixels[..., ::-1]).items():
+            records[name] = values
+
+        if self.palette:
+            engine = PaletteAnalyzer()
+            for i, image in enumerate(self.images):
+                palette = engine.analyze(image[..., ::-1])
+                for j, color in enumerate(palette['colors']):
+                    records['palette_lab'][i, j] = color['lab']
+                    records['palette_proportion'][i, j] = color['proportion']
+
+    def _analyze_texture(self, records):
+        engine = GLCMTexture()
+        # Per image, so only one levels x levels matrix is alive at a time
+        for i, gray in enumerate(self.gray):
+            stats = texture_stats(engine.descriptors(gray))
+            for name in TEXTURE_FEATURES:
+                records[name][i] = stats[name]
+
+    def _analyze_composition(self, records):
+        engine = CompositionAnalyzer()
+        # Canny has no batched form, so the edge features run per image
+        for i, gray in enumerate(self.gray):
+            edges = engine.edges(gray)
+            records['edge_density'][i] = np.count_nonzero(edges) / edges.size
+            records['thirds_weight'][i] = thirds_weight(edges, engine.thirds_sigma)
+            records['edge_grid'][i] = edge_grid(edges, engine.grid)
+
+        for start in range(0, len(self.gray), SYMMETRY_CHUNK):
+            mirror = stack_symmetry(self.gray[start:start + SYMMETRY_CHUNK])
+            stop = start + len(mirror['left_right'])
+            records['symmetry_score'][start:stop] = mirror['left_right']
+            records['symmetry_top_bottom'][start:stop] = mirror['top_bottom']
+            records['symmetry_diagonal'][start:stop] = mirror['diagonal']
+            records['symmetry_anti_diagonal'][start:stop] = mirror['anti_diagonal']
+
+
+def stack_symmetry(gray):
+    """``composition.symmetry`` of every image of an N x H x W stack at once"""
+    def difference(a, b):
+        # int16 so the uint8 difference cannot wrap around
+        if a.shape[1] == 0 or a.shape[2] == 0:
+            return np.zeros(len(a))
+        return np.abs(a.astype(np.int16) - b).mean(axis=(1, 2))
+
+    _, height, width = gray.shape
+    half_w, half_h = width // 2, height // 2
+    side = min(height, width)
+    top, left = (height - side) // 2, (width - side) // 2
+    square = gray[:, top:top + side, left:left + side]
+    transposed = square.transpose(0, 2, 1)
+    return {
+        'left_right': difference(gray[:, :, :half_w], gray[:, :, ::-1][:, :, :half_w]),
+        'top_bottom': difference(gray[:, :half_h], gray[:, ::-1][:, :half_h]),
+        'diagonal': difference(square, transposed),
+        'anti_diagonal': difference(square, transposed[:, ::-1, ::-1])
+    }
+
+def to_dicts(records):
+    """Convert BatchImageAnalyzer output to ImageAnalyzer.analyze_all() dicts"""
+    results = []
+    for row in records:
+        used = row['palette_proportion'] > 0
+        color_stats = {
+            col: {
+                'mean': row[f'{col}_mean'],
+                'std': row[f'{col}_std'],
+                'dominant_values': row[f'{col}_dominant_values']
+            }
+            for col in CHANNELS
+        }
+        color_stats['palette'] = {
+            'colors': describe(row['palette_lab'][used], row['palette_proportion'][used]) if used.any() else [],
+            **{name: row[name] for name in TONE_FEATURES}
+        }
+        results.append({
+            'color_stats': color_stats,
+            'texture_stats': {name: row[name] for name in TEXTURE_FEATURES},
+            'composition_stats': {
+                **{name: row[name] for name in COMPOSITION_FEATURES},
+                'edge_grid': row['edge_grid'].tolist()
+            }
+        })
+    return results
@@ -0,0 +1,126 @@
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+from config import (
+    ANALYSIS_PALETTE, LLM_BACKEND, LLM_BASE_URL, LLM_JSON_MODE, LLM_PIPELINE_MODE, MODEL_NAME
+)
+from src.prompts import PROMPT_VERSION
+
+
+def llm_settings(model_name=MODEL_NAME, prompt_version=PROMPT_VERSION, backend=LLM_BACKEND,
+                 pipeline_mode=LLM_PIPELINE_MODE, json_mode=LLM_JSON_MODE, base_url=LLM_BASE_URL,
+                 palette=ANALYSIS_PALETTE):
+    """Everything besides the upload that shapes a cached interpretation, as one string.
+
+    The base URL only matters for OpenAI-compatible servers, which can serve
+    any model under any name. ``palette`` decides whether the cached features,
+    and so the prompt, include the dominant colors.
+    """
+    server = base_url if backend == 'openai' else ''
+    return (f"{model_name}|{prompt_version}|{backend}|{server}|{pipeline_mode}|json={bool(json_mode)}"
+            f"|palette={bool(palette)}")
+
+
+def make_cache_key(image_bytes, settings=None):
+    """Content-address an upload by its bytes plus the LLM settings (see ``llm_settings``)"""
+    digest = hashlib.sha256(image_bytes)
+    digest.update(f"|{llm_settings() if settings is None else settings}".encode())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Two-tier cache: an in-memory LRU backed by an optional on-disk store.
+
+    Values are pickled on disk, one file per key. When the directory grows past
+    ``max_disk_bytes`` the least recently used files are removed first.
+    """
+
+    def __init__(self, max_entries=128, cache_dir=None, max_disk_bytes=512 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def get(self, key):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+
+        value = self._read_disk(key)
+        if value is not None:
+            self._remember(key, value)
+        return value
+
+    def set(self, key, value):
+        self._remember(key, value)
+        self._write_disk(key, value)
+
+    def __contains__(self, key):
+        with self._lock:
+            if key in self._memory:
+                return True
+        return self.cache_dir is not None and os.path.exists(self._path(key))
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def _read_disk(self, key):
+        if not self.cache_dir:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        # Touch the file so eviction sees it as recently used
+        os.utime(path)
+        return value
+
+    def _write_disk(self, key, value):
+        if not self.cache_dir:
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        self._evict_disk()
+
+    def _evict_disk(self):
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.pkl'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
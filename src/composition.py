@@ -0,0 +1,199 @@
+"""Composition features: multi-axis symmetry, tiled edge density and thirds weight.
+
+Everything is computed from one grayscale image and one Canny edge buffer.
+Images are read through NumPy views, mirror images are built by OpenCV a
+block of rows at a time, and the rule-of-thirds weight is separable, so no
+full-size temporary is created whatever the number of metrics.
+
+Run ``python -m src.composition IMAGE`` to print the features and timings.
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from config import COMPOSITION_CANNY_THRESHOLDS, COMPOSITION_GRID, COMPOSITION_THIRDS_SIGMA
+
+# Rows per block for the difference and weighting passes
+CHUNK_ROWS = 256
+
+
+def _mirror_difference(height, rows, mirrored, chunk_rows):
+    """Mean |a - mirror(a)| over ``height`` rows, a block at a time.
+
+    ``rows(start, stop)`` returns a block of the image as a view and
+    ``mirrored(start, stop)`` the same rows of its mirror image, built by
+    OpenCV into a block-sized buffer.
+    """
+    total = 0.0
+    size = 0
+    for start in range(0, height, chunk_rows):
+        stop = min(start + chunk_rows, height)
+        block = rows(start, stop)
+        if block.size == 0:
+            # Nothing to mirror in a one-pixel wide image
+            break
+        # L1 norm of the difference is the sum of |a - b|, without uint8 wraparound
+        total += cv2.norm(block, mirrored(start, stop), cv2.NORM_L1)
+        size += block.size
+    return total / size if size else 0.0
+
+
+def symmetry(gray, chunk_rows=CHUNK_ROWS):
+    """Mean gray-level difference from each mirror image; 0 is perfectly symmetric.
+
+    ``left_right`` mirrors across the vertical center line and
+    ``top_bottom`` across the horizontal one, comparing the two halves.
+    ``diagonal`` and ``anti_diagonal`` mirror the centered square crop
+    across its diagonals.
+    """
+    height, width = gray.shape
+    half_w, half_h = width // 2, height // 2
+    side = min(height, width)
+    top, left = (height - side) // 2, (width - side) // 2
+    square = gray[top:top + side, left:left + side]
+    return {
+        'left_right': _mirror_difference(
+            height, lambda a, b: gray[a:b, :half_w],
+            lambda a, b: cv2.flip(gray[a:b, width - half_w:], 1), chunk_rows),
+        'top_bottom': _mirror_difference(
+            half_h, lambda a, b: gray[a:b],
+            lambda a, b: cv2.flip(gray[height - b:height - a], 0), chunk_rows),
+        # Rows a:b of the transpose are columns a:b of the square
+        'diagonal': _mirror_difference(
+            side, lambda a, b: square[a:b],
+            lambda a, b: cv2.transpose(square[:, a:b]), chunk_rows),
+        'anti_diagonal': _mirror_difference(
+            side, lambda a, b: square[a:b],
+            lambda a, b: cv2.flip(cv2.transpose(square[:, side - b:side - a]), -1), chunk_rows)
+    }
+
+
+def cell_bounds(length, cells):
+    """Pixel boundaries of ``cells`` near-equal cells along a side of ``length``"""
+    return np.linspace(0, length, cells + 1).round().astype(np.intp)
+
+
+def edge_grid(edges, grid=COMPOSITION_GRID):
+    """Edge density of each cell of a rows x cols grid over a Canny edge image"""
+    rows, cols = grid
+    row_bounds = cell_bounds(edges.shape[0], rows)
+    col_bounds = cell_bounds(edges.shape[1], cols)
+    # Column sums per grid row (summed in int64 without casting the band),
+    # then per cell from their running totals
+    counts = np.stack([
+        edges[start:stop].sum(axis=0, dtype=np.int64)
+        for start, stop in zip(row_bounds[:-1], row_bounds[1:])
+    ])
+    totals = np.concatenate([np.zeros((rows, 1), np.int64), counts.cumsum(axis=1)], axis=1)
+    counts = (totals[:, col_bounds[1:]] - totals[:, col_bounds[:-1]]) // 255
+    areas = np.outer(np.diff(row_bounds), np.diff(col_bounds))
+    # Cells of images smaller than the grid are empty
+    return np.divide(counts, areas, out=np.zeros(counts.shape), where=areas > 0)
+
+
+def thirds_profiles(height, width, sigma=COMPOSITION_THIRDS_SIGMA):
+    """Row and column weights whose outer product is the rule-of-thirds weight map.
+
+    The map is a sum of Gaussians at the four thirds intersections with
+    ``sigma`` as a fraction of the shorter side; it factors into one
+    profile per axis, each peaking on the two thirds lines.
+    """
+    spread = sigma * min(height, width)
+
+    def profile(length):
+        x = np.arange(length, dtype=np.float64) + 0.5
+        return sum(np.exp(-0.5 * ((x - length * t) / spread) ** 2) for t in (1 / 3, 2 / 3))
+
+    return profile(height), profile(width)
+
+
+def thirds_weight(edges, sigma=COMPOSITION_THIRDS_SIGMA, chunk_rows=CHUNK_ROWS):
+    """How strongly edges gather at the thirds intersections; 1.0 is no preference.
+
+    Mean thirds weight over edge pixels divided by its mean over the image.
+    """
+    row_weights, col_weights = thirds_profiles(*edges.shape, sigma)
+    weighted, count = thirds_sums(edges, row_weights, col_weights, chunk_rows)
+    return thirds_ratio(weighted, count, row_weights, col_weights)
+
+
+def thirds_sums(edges, row_weights, col_weights, chunk_rows=CHUNK_ROWS):
+    """(sum of thirds weights over edge pixels, edge pixel count).
+
+    ``row_weights`` and ``col_weights`` are the profiles for the rows and
+    columns of ``edges``, so the sums of the tiles of an image add up.
+    """
+    weighted = 0.0
+    count = 0
+    for start in range(0, edges.shape[0], chunk_rows):
+        block = edges[start:start + chunk_rows]
+        # Column-weighted edge sum per row (edges are 0 or 255), then by row
+        per_row = np.dot(block, col_weights) / 255
+        weighted += float(per_row @ row_weights[start:start + chunk_rows])
+        count += int(np.count_nonzero(block))
+    return weighted, count
+
+
+def thirds_ratio(weighted, count, row_weights, col_weights):
+    """``thirds_weight`` from the image's ``thirds_sums`` and full profiles"""
+    if count == 0:
+        return 0.0
+    return (weighted / count) / (row_weights.mean() * col_weights.mean())
+
+
+class CompositionAnalyzer:
+    """Composition features of a grayscale image, keyed for ``composition_stats``.
+
+    ``symmetry_score`` keeps its meaning (left-right difference) for existing
+    prompts and history, and the other axes get their own keys.
+    """
+
+    def __init__(self, grid=COMPOSITION_GRID, canny_thresholds=COMPOSITION_CANNY_THRESHOLDS,
+                 thirds_sigma=COMPOSITION_THIRDS_SIGMA):
+        self.grid = tuple(grid)
+        self.canny_thresholds = tuple(canny_thresholds)
+        self.thirds_sigma = thirds_sigma
+
+    def edges(self, gray):
+        return cv2.Canny(gray, *self.canny_thresholds)
+
+    def analyze(self, gray):
+        edges = self.edges(gray)
+        mirror = symmetry(gray)
+        return {
+            'edge_density': np.count_nonzero(edges) / edges.size,
+            'symmetry_score': mirror['left_right'],
+            'symmetry_top_bottom': mirror['top_bottom'],
+            'symmetry_diagonal': mirror['diagonal'],
+            'symmetry_anti_diagonal': mirror['anti_diagonal'],
+            'thirds_weight': thirds_weight(edges, self.thirds_sigma),
+            'edge_grid': edge_grid(edges, self.grid).tolist()
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Composition features of an image")
+    parser.add_argument('image')
+    args = parser.parse_args()
+
+    gray = cv2.imread(args.image, cv2.IMREAD_GRAYSCALE)
+    if gray is None:
+        parser.error(f"could not read {args.image}")
+    analyzer = CompositionAnalyzer()
+    start = time.perf_counter()
+    features = analyzer.analyze(gray)
+    elapsed = time.perf_counter() - start
+
+    print(f"{gray.shape[1]}x{gray.shape[0]} in {elapsed * 1000:.1f} ms")
+    for name, value in features.items():
+        if name == 'edge_grid':
+            for row in value:
+                print(f"  {'  '.join(f'{density:.3f}' for density in row)}")
+        else:
+            print(f"{name:<24} {value:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""Per-user analysis history in SQLite.
+
+Every finished analysis is appended to ``analyses`` with its headline
+features in their own columns, so trend queries walk the (user_id,
+created_at) index instead of parsing stored JSON. ``daily_rollups`` keeps
+per-day sums updated in the same transaction, which lets long histories be
+charted from a few hundred rows. Each sum has its own count of non-missing values, so an
+analysis without a feature leaves that day's mean alone. Days are UTC.
+
+``user_id`` is whatever identity the caller vouches for; the app passes a
+hash of the signed-in user or of a per-session history key, never free text.
+"""
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+from config import HISTORY_DB_PATH
+
+# Column name -> path into the ``analyze_all`` features
+FEATURE_COLUMNS = {
+    'r_mean': ('color_stats', 'r', 'mean'),
+    'g_mean': ('color_stats', 'g', 'mean'),
+    'b_mean': ('color_stats', 'b', 'mean'),
+    'r_std': ('color_stats', 'r', 'std'),
+    'g_std': ('color_stats', 'g', 'std'),
+    'b_std': ('color_stats', 'b', 'std'),
+    'contrast': ('texture_stats', 'contrast'),
+    'homogeneity': ('texture_stats', 'homogeneity'),
+    'energy': ('texture_stats', 'energy'),
+    'edge_density': ('composition_stats', 'edge_density'),
+    'symmetry_score': ('composition_stats', 'symmetry_score'),
+}
+
+_feature_defs = ',\n    '.join(f"{name} REAL" for name in FEATURE_COLUMNS)
+_sum_defs = ',\n    '.join(
+    f"sum_{name} REAL NOT NULL DEFAULT 0,\n    n_{name} INTEGER NOT NULL DEFAULT 0" for name in FEATURE_COLUMNS
+)
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS analyses (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    cache_key TEXT,
+    {_feature_defs},
+    features TEXT NOT NULL,
+    interpretation TEXT,
+    report TEXT
+);
+CREATE INDEX IF NOT EXISTS analyses_user_time ON analyses (user_id, created_at);
+CREATE TABLE IF NOT EXISTS daily_rollups (
+    user_id TEXT NOT NULL,
+    day TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    {_sum_defs},
+    PRIMARY KEY (user_id, day)
+) WITHOUT ROWID;
+"""
+
+
+def feature_row(features):
+    """Headline feature values in FEATURE_COLUMNS order"""
+    row = []
+    for path in FEATURE_COLUMNS.values():
+        value = features
+        for key in path:
+            value = value.get(key) if isinstance(value, dict) else None
+        row.append(None if value is None else float(value))
+    return row
+
+
+def _as_columns(names, rows):
+    """Rows of query results transposed into {name: [values...]}"""
+    return {name: [row[i] for row in rows] for i, name in enumerate(names)}
+
+
+def _check_columns(columns):
+    unknown = set(columns) - set(FEATURE_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown feature columns: {', '.join(sorted(unknown))}")
+    return list(columns)
+
+
+class HistoryStore:
+    """Append-only history of analyses, one SQLite connection per thread"""
+
+    def __init__(self, path=HISTORY_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            # WAL lets readers chart history while another session appends
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def record(self, user_id, features, interpretation=None, report=None, cache_key=None,
+               created_at=None):
+        """Append one analysis and fold it into that day's (UTC) rollup"""
+        # Deferred: image_analysis pulls in OpenCV, which trend pages never need
+        from src.image_analysis import to_builtin
+
+        created_at = time.time() if created_at is None else created_at
+        day = datetime.fromtimestamp(created_at, timezone.utc).date().isoformat()
+        values = feature_row(features)
+        names = list(FEATURE_COLUMNS)
+
+        with self._connect() as conn:
+            cursor = conn.execute(
+                f"INSERT INTO analyses (user_id, created_at, cache_key, {', '.join(names)}, "
+                f"features, interpretation, report) VALUES ({', '.join('?' * (len(names) + 6))})",
+                [user_id, created_at, cache_key, *values,
+                 json.dumps(to_builtin(features)), interpretation, report]
+            )
+            conn.execute(
+                f"INSERT INTO daily_rollups (user_id, day, count, {', '.join(f'sum_{n}, n_{n}' for n in names)}) "
+                f"VALUES (?, ?, 1, {', '.join('?, ?' for _ in names)}) "
+                f"ON CONFLICT (user_id, day) DO UPDATE SET count = count + 1, "
+                + ', '.join(f"sum_{n} = sum_{n} + excluded.sum_{n}, n_{n} = n_{n} + excluded.n_{n}"
+                            for n in names),
+                [user_id, day, *(v for value in values
+                                 for v in ((0.0, 0) if value is None else (value, 1)))]
+            )
+        return cursor.lastrowid
+
+    def revision(self, user_id):
+        """Changes whenever the user's history does; use it to key cached charts"""
+        row = self._connect().execute(
+            "SELECT count(*), max(id) FROM analyses WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        return row[0], row[1]
+
+    def count(self, user_id):
+        return self.revision(user_id)[0]
+
+    def trajectory(self, user_id, columns, since=None):
+        """Per-analysis values as {'created_at': [...], column: [...]}, oldest first"""
+        columns = _check_columns(columns)
+        rows = self._connect().execute(
+            f"SELECT created_at, {', '.join(columns)} FROM analyses "
+            "WHERE user_id = ? AND created_at >= ? ORDER BY created_at",
+            (user_id, since or 0.0)
+        ).fetchall()
+        return _as_columns(['created_at', *columns], rows)
+
+    def daily_trend(self, user_id, columns, since=None):
+        """Daily means from the rollups as {'day': [...], 'count': [...], column: [...]}.
+
+        A day on which no analysis had a feature has None as its mean.
+        """
+        columns = _check_columns(columns)
+        since_day = datetime.fromtimestamp(since or 0.0, timezone.utc).date().isoformat()
+        rows = self._connect().execute(
+            f"SELECT day, count, {', '.join(f'sum_{c} / nullif(n_{c}, 0)' for c in columns)} "
+            "FROM daily_rollups WHERE user_id = ? AND day >= ? ORDER BY day",
+            (user_id, since_day)
+        ).fetchall()
+        return _as_columns(['day', 'count', *columns], rows)
+
+    def recent(self, user_id, limit=10):
+        """Latest analyses, newest first, without the stored feature JSON"""
+        rows = self._connect().execute(
+            "SELECT id, created_at, cache_key, interpretation, report FROM analyses "
+            "WHERE user_id = ? ORDER BY created_at DESC LIMIT ?",
+            (user_id, limit)
+        ).fetchall()
+        keys = ('id', 'created_at', 'cache_key', 'interpretation', 'report')
+        return [dict(zip(keys, row)) for row in rows]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_history_store():
+    """Process-wide HistoryStore, created on first use"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = HistoryStore()
+    return _store
@@ -1,49 +1,118 @@
 import cv2
 import numpy as np
-from skimage.feature import graycomatrix, graycoprops
+from config import ANALYSIS_MAX_SIDE, ANALYSIS_PALETTE, ANALYSIS_RESOLUTIONS
+from src.composition import CompositionAnalyzer
+from src.palette import PaletteAnalyzer
+from src.pyramid import ImagePyramid, resize_to_side
+from src.texture import GLCMTexture, texture_stats
+from src.tracing import set_attributes, traced
 
 class ImageAnalyzer:
-    def __init__(self, image):
-        self.image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
-        
+    def __init__(self, image, max_side=ANALYSIS_MAX_SIDE, resolutions=None, palette=ANALYSIS_PALETTE):
+        # Downscale before the color conversion so only one full-size copy exists
+        rgb = resize_to_side(np.asarray(image), max_side)
+        self._set_image(cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR), resolutions, palette)
+
+    @classmethod
+    def from_bgr(cls, image, max_side=ANALYSIS_MAX_SIDE, resolutions=None, palette=ANALYSIS_PALETTE):
+        """Analyzer for a BGR array, e.g. from ``src.ingest.load_image``, without a color copy"""
+        analyzer = cls.__new__(cls)
+        analyzer._set_image(resize_to_side(image, max_side), resolutions, palette)
+        return analyzer
+
+    def _set_image(self, image, resolutions, palette):
+        self.image = image
+        self.resolutions = dict(ANALYSIS_RESOLUTIONS if resolutions is None else resolutions)
+        # Dominant colors are opt-in; tone statistics are always computed
+        self.palette = palette
+        self.pyramid = ImagePyramid(self.image)
+
+    @property
+    def gray(self):
+        """Grayscale version of the working image, converted once and reused"""
+        return self.pyramid.gray()
+
+    def _working_image(self, family):
+        return self.pyramid.level(self.resolutions.get(family))
+
+    def _working_gray(self, family):
+        return self.pyramid.gray(self.resolutions.get(family))
+
+    @traced('image_analysis.colors')
     def analyze_colors(self):
-        """Extract color features from the image"""
+        """Per-channel statistics plus the palette's tone and, if enabled, its dominant colors"""
         colors = ('b', 'g', 'r')
         color_stats = {}
-        
+        image = self._working_image('color')
+
         for i, col in enumerate(colors):
-            hist = cv2.calcHist([self.image], [i], None, [256], [0, 256])
-            color_stats[col] = {
-                'mean': np.mean(self.image[:,:,i]),
-                'std': np.std(self.image[:,:,i]),
-                'dominant_values': np.argmax(hist)
-            }
+            # Mean and std follow exactly from the histogram, so each
+            # channel is only read once
+            hist = cv2.calcHist([image], [i], None, [256], [0, 256])
+            color_stats[col] = channel_stats(hist.ravel().astype(np.float64))
+        color_stats['palette'] = PaletteAnalyzer(dominant=self.palette).analyze(image)
         return color_stats
 
+    @traced('image_analysis.texture')
     def analyze_texture(self):
         """Analyze texture features"""
-        gray = cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
-        glcm = graycomatrix(gray, [1], [0], symmetric=True, normed=True)
-        
-        return {
-            'contrast': graycoprops(glcm, 'contrast')[0,0],
-            'homogeneity': graycoprops(glcm, 'homogeneity')[0,0],
-            'energy': graycoprops(glcm, 'energy')[0,0]
-        }
+        return texture_stats(GLCMTexture().descriptors(self._working_gray('texture')))
 
+    @traced('image_analysis.composition')
     def analyze_composition(self):
-        """Analyze image composition"""
-        gray = cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
-        edges = cv2.Canny(gray, 100, 200)
-        
+        """Analyze image composition: edges, symmetry on four axes and thirds placement"""
+        return CompositionAnalyzer().analyze(self._working_gray('composition'))
+
+    @traced('image_analysis')
+    def analyze_all(self):
+        """Compute every feature family from one shared grayscale pass.
+
+        Keys match the keyword arguments of ``get_analysis_prompt``.
+        """
+        height, width = self.image.shape[:2]
+        set_attributes(width=width, height=height)
         return {
-            'edge_density': np.mean(edges) / 255,
-            'symmetry_score': self._calculate_symmetry(gray)
+            'color_stats': self.analyze_colors(),
+            'texture_stats': self.analyze_texture(),
+            'composition_stats': self.analyze_composition()
         }
-    
-    def _calculate_symmetry(self, gray_image):
-        height, width = gray_image.shape
-        mid = width // 2
-        left = gray_image[:, :mid]
-        right = np.fliplr(gray_image[:, mid:mid*2])
-        return np.mean(np.abs(left - right)) 
\ No newline at end of file
+
+
+_LEVELS = np.arange(256, dtype=np.float64)
+
+
+def channel_stats(hist):
+    """Mean, std and most common value of one channel from its 256-bin histogram"""
+    count = hist.sum()
+    mean = np.dot(hist, _LEVELS) / count
+    variance = max(np.dot(hist, (_LEVELS - mean) ** 2) / count, 0.0)
+    return {
+        'mean': mean,
+        'std': np.sqrt(variance),
+        'dominant_values': np.argmax(hist)
+    }
+
+
+def flatten_features(features, prefix=''):
+    """Flatten nested feature dicts into {'color_stats.r.mean': value, ...}"""
+    flat = {}
+    for key, value in features.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten_features(value, f"{name}."))
+        else:
+            flat[name] = value
+    return flat
+
+
+def to_builtin(value):
+    """Convert NumPy scalars and arrays in nested features to plain Python types"""
+    if isinstance(value, dict):
+        return {key: to_builtin(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_builtin(item) for item in value]
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
@@ -0,0 +1,68 @@
+import io
+import warnings
+
+import cv2
+import numpy as np
+from PIL import Image, UnidentifiedImageError
+
+from config import ANALYSIS_MAX_SIDE, INGEST_DECODE_MARGIN, INGEST_MAX_PIXELS
+from src.pyramid import resize_to_side
+
+# Decode-time reductions OpenCV offers; JPEGs are scaled inside libjpeg, so
+# the full-size image is never materialized
+_REDUCED_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+
+class ImageTooLargeError(ValueError):
+    """Raised for uploads over the INGEST_MAX_PIXELS budget"""
+
+
+def read_image_size(data):
+    """(width, height) from the image header without decoding pixel data"""
+    with warnings.catch_warnings():
+        # The pixel budget below replaces PIL's decompression bomb warning
+        warnings.simplefilter('ignore', Image.DecompressionBombWarning)
+        try:
+            with Image.open(io.BytesIO(data)) as image:
+                return image.size
+        except Image.DecompressionBombError as e:
+            raise ImageTooLargeError(str(e)) from e
+        except UnidentifiedImageError as e:
+            raise ValueError("Unrecognized image format") from e
+
+
+def load_image(data, max_side=ANALYSIS_MAX_SIDE, max_pixels=INGEST_MAX_PIXELS,
+               margin=INGEST_DECODE_MARGIN):
+    """Decode uploaded bytes straight to a BGR array no larger than max_side.
+
+    Inputs over ``max_pixels`` are rejected before any pixels are decoded.
+    Large images are decoded at 1/2, 1/4 or 1/8 scale when that still covers
+    ``margin * max_side`` and then resized to fit, so at most one
+    full-resolution buffer is alive at a time. Alpha is dropped and grayscale is expanded to
+    three channels, as ImageAnalyzer expects.
+    """
+    width, height = read_image_size(data)
+    if max_pixels is not None and width * height > max_pixels:
+        raise ImageTooLargeError(
+            f"Image is {width}x{height} ({width * height / 1e6:.0f} MP); "
+            f"the limit is {max_pixels / 1e6:.0f} MP"
+        )
+
+    flags = cv2.IMREAD_COLOR
+    if max_side is not None:
+        for factor, reduced in _REDUCED_FLAGS:
+            if max(width, height) / factor >= margin * max_side:
+                flags = reduced
+                break
+
+    # np.frombuffer wraps the upload without copying it
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    # Match PIL, which the analysis used before, and ignore EXIF rotation
+    image = cv2.imdecode(buffer, flags | cv2.IMREAD_IGNORE_ORIENTATION)
+    if image is None:
+        raise ValueError("Could not decode the uploaded image")
+    return resize_to_side(image, max_side)
@@ -1,26 +1,101 @@
-from groq import Groq
-from config import GROQ_API_KEY, MODEL_NAME
-from src.prompts import ART_INTERPRETER_SYSTEM_PROMPT, get_analysis_prompt
+from config import (
+    LLM_COMBINED_MAX_TOKENS,
+    LLM_INTERPRETATION_MAX_TOKENS,
+    LLM_JSON_MODE,
+    LLM_REPORT_MAX_TOKENS,
+    MODEL_NAME
+)
+from src.llm_client import get_client
+from src.structured_output import CombinedStream, InterpretationStream, parse_combined, parse_interpretation
+from src.token_budget import completion_budget, record_budget
+from src.tracing import chunk_usage, record_usage, span, traced
+from src.prompts import ART_INTERPRETER_SYSTEM_PROMPT, get_analysis_prompt, get_combined_prompt
 
 class ArtworkInterpreter:
-    def __init__(self):
-        self.client = Groq(api_key=GROQ_API_KEY)
-    
-    def interpret_features(self, color_stats, texture_stats, composition_stats):
+    def __init__(self, client=None):
+        self.client = client or get_client()
+
+    def build_request(self, color_stats, texture_stats, composition_stats, stream=False):
+        """Keyword arguments for the chat completion call"""
         prompt = get_analysis_prompt(color_stats, texture_stats, composition_stats)
-        
-        completion = self.client.chat.completions.create(
+
+        messages = [
+            {"role": "system", "content": ART_INTERPRETER_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
+        request = dict(
             model=MODEL_NAME,
-            messages=[
-                {"role": "system", "content": ART_INTERPRETER_SYSTEM_PROMPT},
-                {"role": "user", "content": prompt}
-            ],
+            messages=messages,
             temperature=0.7,
-            max_tokens=1024
+            max_tokens=completion_budget(messages, LLM_INTERPRETATION_MAX_TOKENS)
         )
-        
-        return completion.choices[0].message.content
-    
+        # JSON mode is not accepted on streamed requests; those rely on the
+        # prompt and the parser's repair path instead
+        if LLM_JSON_MODE and not stream:
+            request["response_format"] = {"type": "json_object"}
+        return request
+
+    def build_combined_request(self, color_stats, texture_stats, composition_stats):
+        """Chat completion arguments for one reply holding the interpretation and the report"""
+        # Same report length as the compact two-call prompt
+        target_words = int(round(LLM_REPORT_MAX_TOKENS * 0.6, -1))
+        prompt = get_combined_prompt(color_stats, texture_stats, composition_stats, target_words)
+
+        messages = [
+            {"role": "system", "content": ART_INTERPRETER_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
+        # No JSON mode: the reply is marked-up text with a JSON part
+        return dict(
+            model=MODEL_NAME,
+            messages=messages,
+            temperature=0.7,
+            max_tokens=completion_budget(messages, LLM_COMBINED_MAX_TOKENS)
+        )
+
+    @traced('llm.interpret')
+    def interpret_features(self, color_stats, texture_stats, composition_stats):
+        """Parsed interpretation: prose, emotion scores and key points"""
+        request = self.build_request(color_stats, texture_stats, composition_stats)
+        record_budget(request)
+        completion = self.client.chat.completions.create(**request)
+
+        record_usage(completion.usage)
+        return parse_interpretation(completion.choices[0].message.content)
+
+    @traced('llm.combined')
+    def interpret_and_report(self, color_stats, texture_stats, composition_stats):
+        """Parsed interpretation plus 'report' from a single completion"""
+        request = self.build_combined_request(color_stats, texture_stats, composition_stats)
+        record_budget(request)
+        completion = self.client.chat.completions.create(**request)
+
+        record_usage(completion.usage)
+        return parse_combined(completion.choices[0].message.content)
+
+    def stream_features(self, color_stats, texture_stats, composition_stats):
+        """Stream of interpretation prose; call ``result()`` on it afterwards for the scores"""
+        return InterpretationStream(self._stream_text(
+            self.build_request(color_stats, texture_stats, composition_stats, stream=True)
+        ))
+
+    def stream_combined(self, color_stats, texture_stats, composition_stats):
+        """CombinedStream of the interpretation and report sections of one streamed reply"""
+        return CombinedStream(self._stream_text(
+            self.build_combined_request(color_stats, texture_stats, composition_stats),
+            'llm.combined.stream'
+        ))
+
+    def _stream_text(self, request, name='llm.interpret.stream'):
+        stream = self.client.chat.completions.create(**request, stream=True)
+
+        with span(name):
+            record_budget(request)
+            for chunk in stream:
+                record_usage(chunk_usage(chunk))
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+
     def _get_system_prompt(self):
         return """You are an expert art therapist with deep knowledge of color psychology, 
         art therapy principles, and emotional interpretation of artwork. Your role is to analyze 
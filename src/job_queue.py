@@ -0,0 +1,230 @@
+"""Local job queue that runs analysis and LLM stages in worker processes.
+
+In the "queue" serving mode the Streamlit script only submits jobs and polls
+their status, so a slow LLM call or a huge image never holds a UI session,
+and CPU-bound feature extraction scales with JOB_WORKERS rather than the
+number of sessions. Two kinds of job exist:
+
+- ``analyze``: upload bytes -> {'features', 'vector'} (the similarity vector)
+- ``generate``: features -> {'interpretation', 'insights', 'report'}
+
+Jobs are accepted while fewer than ``max_pending`` are queued or running,
+and while their owner (a user or session id) has fewer than ``per_user``.
+Workers report when they pick a job up, so status polling can tell queued
+jobs from running ones.
+"""
+import multiprocessing
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from config import JOB_QUEUE_MAX, JOB_RESULT_TTL, JOB_USER_LIMIT, JOB_WORKERS
+
+ACTIVE_STATES = ('queued', 'running')
+
+_events = None
+
+
+class JobRejected(RuntimeError):
+    """A job was turned away; submit it again later"""
+
+
+class QueueFullError(JobRejected):
+    """Raised when JOB_QUEUE_MAX jobs are already pending"""
+
+
+class UserLimitError(JobRejected):
+    """Raised when the owner already has JOB_USER_LIMIT jobs pending"""
+
+
+class JobError(RuntimeError):
+    """A job failed in its worker; carries the original error as text"""
+
+
+def _init_worker(events):
+    global _events
+    import cv2
+    # One OpenCV thread per process; the pool already spreads jobs over cores
+    cv2.setNumThreads(1)
+    _events = events
+
+
+def _analyze(data):
+    from src.image_analysis import ImageAnalyzer
+    from src.ingest import load_image
+    from src.similarity import feature_vector
+
+    image = load_image(data)
+    features = ImageAnalyzer.from_bgr(image).analyze_all()
+    return {'features': features, 'vector': feature_vector(features, image)}
+
+
+def _generate(features):
+    from src.orchestrator import get_pipeline
+
+    pipeline = get_pipeline()
+    return pipeline.submit(pipeline.generate(features)).result()
+
+
+JOB_KINDS = {'analyze': _analyze, 'generate': _generate}
+
+
+def _run_job(job_id, kind, payload):
+    """Entry point inside a worker process"""
+    _events.put((job_id, time.time()))
+    try:
+        return JOB_KINDS[kind](payload)
+    except ValueError as e:
+        # Bad input, e.g. an undecodable upload: the message is for the user
+        raise JobError(str(e)) from None
+    except Exception as e:
+        # Client library errors do not always survive pickling back
+        raise JobError(f"{type(e).__name__}: {e}") from None
+
+
+class JobQueue:
+    """Pool of worker processes with status polling, backpressure and per-owner limits"""
+
+    def __init__(self, workers=JOB_WORKERS, max_pending=JOB_QUEUE_MAX, per_user=JOB_USER_LIMIT,
+                 result_ttl=JOB_RESULT_TTL):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.per_user = per_user
+        self.result_ttl = result_ttl
+        self._context = multiprocessing.get_context('spawn')
+        self._events = self._context.Queue()
+        self._pool = None
+        self._jobs = {}
+        self._lock = threading.Lock()
+        threading.Thread(target=self._listen, name="job-queue-events", daemon=True).start()
+
+    def _get_pool(self):
+        # Created on first use, and again if a worker died and broke the pool
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=self._context,
+                initializer=_init_worker,
+                initargs=(self._events,)
+            )
+        return self._pool
+
+    def _listen(self):
+        while True:
+            job_id, started = self._events.get()
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is not None and job['state'] == 'queued':
+                    job['state'] = 'running'
+                    job['started'] = started
+
+    def _purge(self):
+        cutoff = time.time() - self.result_ttl
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job['state'] not in ACTIVE_STATES and job['finished'] < cutoff]:
+            del self._jobs[job_id]
+
+    def submit(self, kind, payload, owner=None):
+        """Queue a job and return its id; raises JobRejected when it cannot be taken now"""
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Unknown job kind {kind!r}")
+        with self._lock:
+            self._purge()
+            active = [job for job in self._jobs.values() if job['state'] in ACTIVE_STATES]
+            if len(active) >= self.max_pending:
+                raise QueueFullError(
+                    f"The analysis queue is full ({len(active)} jobs); please try again shortly."
+                )
+            if owner is not None and sum(job['owner'] == owner for job in active) >= self.per_user:
+                raise UserLimitError(
+                    f"You already have {self.per_user} analyses running; please wait for one to finish."
+                )
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {
+                'id': job_id,
+                'kind': kind,
+                'owner': owner,
+                'state': 'queued',
+                'submitted': time.time(),
+                'started': None,
+                'finished': None,
+                'result': None,
+                'error': None
+            }
+            try:
+                pool = self._get_pool()
+                future = pool.submit(_run_job, job_id, kind, payload)
+            except Exception:
+                del self._jobs[job_id]
+                raise
+        future.add_done_callback(lambda f: self._finish(job_id, f, pool))
+        return job_id
+
+    def _finish(self, job_id, future, pool):
+        # exception() raises for a cancelled future instead of returning
+        error = None if future.cancelled() else future.exception()
+        with self._lock:
+            # Every job of a broken pool fails; the first to finish replaces it
+            broken = isinstance(error, BrokenProcessPool) and self._pool is pool
+            if broken:
+                self._pool = None
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job['finished'] = time.time()
+                if future.cancelled():
+                    job['state'] = 'failed'
+                    job['error'] = 'cancelled'
+                elif error is None:
+                    job['state'] = 'done'
+                    job['result'] = future.result()
+                else:
+                    job['state'] = 'failed'
+                    job['error'] = str(error) or type(error).__name__
+        if broken:
+            # Releases its management thread and any surviving workers
+            pool.shutdown(wait=False)
+
+    def status(self, job_id):
+        """Snapshot of a job: state, timestamps, result or error, and queue position.
+
+        Returns None for unknown or expired jobs.
+        """
+        with self._lock:
+            self._purge()
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            status = dict(job)
+            if job['state'] == 'queued':
+                status['position'] = sum(
+                    other['state'] == 'queued' and other['submitted'] < job['submitted']
+                    for other in self._jobs.values()
+                ) + 1
+            return status
+
+    def discard(self, job_id):
+        """Forget a finished job and its result"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job['state'] not in ACTIVE_STATES:
+                del self._jobs[job_id]
+
+    def pending(self):
+        with self._lock:
+            return sum(job['state'] in ACTIVE_STATES for job in self._jobs.values())
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """Process-wide JobQueue, created on first use"""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = JobQueue()
+    return _queue
@@ -0,0 +1,333 @@
+"""Chat completion backends selected by LLM_BACKEND.
+
+Every backend returns a client shaped like the Groq SDK's, which is what
+the interpreter, report generator and orchestrator call:
+``client.chat.completions.create(**request)`` returns a completion with
+``choices[0].message.content`` and ``usage``, or with ``stream=True`` an
+iterator of chunks with ``choices[0].delta.content`` and ``usage`` on the
+last one. The async clients return the same from an awaited ``create``.
+
+- ``groq``: the Groq SDK
+- ``openai``: any OpenAI-compatible server (llama.cpp, vLLM, ...) over httpx
+- ``stub``: canned replies from src/stub_completions.py in process, with a
+  fixed delay before the first token and a fixed token rate
+"""
+import asyncio
+import json
+import sys
+import time
+from types import SimpleNamespace
+
+import httpx
+
+from config import (
+    GROQ_API_KEY,
+    LLM_API_KEY,
+    LLM_BACKEND,
+    LLM_BASE_URL,
+    LLM_MAX_CONNECTIONS,
+    LLM_STUB_LATENCY,
+    LLM_STUB_TOKENS_PER_SECOND,
+    LLM_TIMEOUT
+)
+from src.stub_completions import approximate_tokens, completion_for, prompt_text
+
+BACKENDS = ('groq', 'openai', 'stub')
+
+
+class RateLimitError(Exception):
+    """HTTP 429 from an OpenAI-compatible server; ``response`` carries its headers"""
+
+    def __init__(self, message, response):
+        super().__init__(message)
+        self.response = response
+
+
+def rate_limit_errors():
+    """What the orchestrator backs off and retries on, whichever backend is in use.
+
+    The Groq SDK is only imported once a groq client is created, so its
+    error type joins the tuple from then on.
+    """
+    groq = sys.modules.get('groq')
+    if groq is None:
+        return (RateLimitError,)
+    return (groq.RateLimitError, RateLimitError)
+
+
+class _Record(SimpleNamespace):
+    """Response object; fields the server left out read as None, as in the SDK's models"""
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return None
+
+
+def _namespace(data):
+    """JSON data as nested attribute objects, like the SDK's response models"""
+    if isinstance(data, dict):
+        return _Record(**{key: _namespace(value) for key, value in data.items()})
+    if isinstance(data, list):
+        return [_namespace(item) for item in data]
+    return data
+
+
+def _completion(text, usage, model):
+    return _namespace({
+        'object': 'chat.completion',
+        'model': model,
+        'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': text},
+                     'finish_reason': 'stop'}],
+        'usage': usage
+    })
+
+
+def _chunk(text, usage=None):
+    return _namespace({
+        'object': 'chat.completion.chunk',
+        'choices': [{'index': 0, 'delta': {'content': text}}],
+        'usage': usage
+    })
+
+
+# OpenAI-compatible HTTP servers
+
+def _payload(request, stream):
+    payload = dict(request, stream=stream)
+    if stream:
+        # Ask for token usage on the final chunk, as Groq sends it
+        payload['stream_options'] = {'include_usage': True}
+    return payload
+
+
+def _check(response, body):
+    if response.status_code == 429:
+        raise RateLimitError(f"Rate limited by {response.url}", response)
+    if response.is_error:
+        raise httpx.HTTPStatusError(
+            f"{response.status_code} from {response.url}: {body[:500]!r}",
+            request=response.request, response=response
+        )
+
+
+def _sse_data(line):
+    """Decoded JSON of one server-sent event line, or None for anything else"""
+    if not line.startswith('data:'):
+        return None
+    data = line[5:].strip()
+    if not data or data == '[DONE]':
+        return None
+    return json.loads(data)
+
+
+class _Chat:
+    def __init__(self, completions):
+        self.completions = completions
+
+
+class _HTTPCompletions:
+    def __init__(self, http):
+        self._http = http
+
+    def create(self, stream=False, **request):
+        if not stream:
+            response = self._http.post('/chat/completions', json=_payload(request, False))
+            _check(response, response.text)
+            return _namespace(response.json())
+        return self._stream(_payload(request, True))
+
+    def _stream(self, payload):
+        with self._http.stream('POST', '/chat/completions', json=payload) as response:
+            if response.is_error:
+                _check(response, response.read().decode(errors='replace'))
+            for line in response.iter_lines():
+                data = _sse_data(line)
+                if data is not None:
+                    yield _namespace(data)
+
+
+class _AsyncHTTPStream:
+    def __init__(self, response):
+        self._response = response
+
+    def __aiter__(self):
+        return self._chunks()
+
+    async def _chunks(self):
+        try:
+            async for line in self._response.aiter_lines():
+                data = _sse_data(line)
+                if data is not None:
+                    yield _namespace(data)
+        finally:
+            await self._response.aclose()
+
+
+class _AsyncHTTPCompletions:
+    def __init__(self, http):
+        self._http = http
+
+    async def create(self, stream=False, **request):
+        if not stream:
+            response = await self._http.post('/chat/completions', json=_payload(request, False))
+            _check(response, response.text)
+            return _namespace(response.json())
+        # Send now so errors and rate limits surface from the awaited call, as with Groq
+        response = await self._http.send(
+            self._http.build_request('POST', '/chat/completions', json=_payload(request, True)),
+            stream=True
+        )
+        if response.is_error:
+            body = (await response.aread()).decode(errors='replace')
+            await response.aclose()
+            _check(response, body)
+        return _AsyncHTTPStream(response)
+
+
+def _headers(api_key):
+    return {'Authorization': f'Bearer {api_key}'} if api_key else {}
+
+
+class OpenAICompatibleClient:
+    """Client for an OpenAI-compatible ``/chat/completions`` endpoint at ``base_url``"""
+
+    def __init__(self, base_url=LLM_BASE_URL, api_key=LLM_API_KEY, timeout=LLM_TIMEOUT):
+        self._http = httpx.Client(base_url=base_url, headers=_headers(api_key), timeout=timeout)
+        self.chat = _Chat(_HTTPCompletions(self._http))
+
+
+class AsyncOpenAICompatibleClient:
+    """Async client for an OpenAI-compatible server with a bounded connection pool"""
+
+    def __init__(self, base_url=LLM_BASE_URL, api_key=LLM_API_KEY, timeout=LLM_TIMEOUT,
+                 max_connections=LLM_MAX_CONNECTIONS):
+        limits = httpx.Limits(max_connections=max_connections,
+                              max_keepalive_connections=max_connections)
+        self._http = httpx.AsyncClient(
+            base_url=base_url, headers=_headers(api_key), timeout=timeout, limits=limits
+        )
+        self.chat = _Chat(_AsyncHTTPCompletions(self._http))
+
+
+# In-process stub
+
+class _StubReply:
+    """Canned words for one request and the usage a server would report"""
+
+    def __init__(self, request):
+        words = completion_for(request).split(' ')
+        self.words = words[:max(1, request.get('max_tokens') or len(words))]
+        self.model = request.get('model', 'stub')
+        prompt_tokens = approximate_tokens(prompt_text(request))
+        self.usage = {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': len(self.words),
+            'total_tokens': prompt_tokens + len(self.words)
+        }
+
+    def text(self):
+        return ' '.join(self.words)
+
+    def pieces(self):
+        return [word if i == 0 else ' ' + word for i, word in enumerate(self.words)]
+
+
+class _StubCompletions:
+    def __init__(self, latency, tokens_per_second):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+
+    def create(self, stream=False, **request):
+        reply = _StubReply(request)
+        time.sleep(self.latency)
+        if stream:
+            return self._stream(reply)
+        time.sleep(len(reply.words) / self.tokens_per_second)
+        return _completion(reply.text(), reply.usage, reply.model)
+
+    def _stream(self, reply):
+        for piece in reply.pieces():
+            yield _chunk(piece)
+            time.sleep(1 / self.tokens_per_second)
+        yield _chunk(None, reply.usage)
+
+
+class _AsyncStubStream:
+    def __init__(self, reply, tokens_per_second):
+        self._reply = reply
+        self._tokens_per_second = tokens_per_second
+
+    def __aiter__(self):
+        return self._chunks()
+
+    async def _chunks(self):
+        for piece in self._reply.pieces():
+            yield _chunk(piece)
+            await asyncio.sleep(1 / self._tokens_per_second)
+        yield _chunk(None, self._reply.usage)
+
+
+class _AsyncStubCompletions(_StubCompletions):
+    async def create(self, stream=False, **request):
+        reply = _StubReply(request)
+        await asyncio.sleep(self.latency)
+        if stream:
+            return _AsyncStubStream(reply, self.tokens_per_second)
+        await asyncio.sleep(len(reply.words) / self.tokens_per_second)
+        return _completion(reply.text(), reply.usage, reply.model)
+
+
+class StubClient:
+    """Canned completions after ``latency`` seconds at ``tokens_per_second``; no network"""
+
+    def __init__(self, latency=LLM_STUB_LATENCY, tokens_per_second=LLM_STUB_TOKENS_PER_SECOND):
+        self.chat = _Chat(_StubCompletions(latency, tokens_per_second))
+
+
+class AsyncStubClient:
+    """Async StubClient; waits with asyncio.sleep so concurrent calls overlap"""
+
+    def __init__(self, latency=LLM_STUB_LATENCY, tokens_per_second=LLM_STUB_TOKENS_PER_SECOND):
+        self.chat = _Chat(_AsyncStubCompletions(latency, tokens_per_second))
+
+
+def _check_backend(backend):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown LLM backend {backend!r}; expected one of {', '.join(BACKENDS)}")
+
+
+def create_client(backend=LLM_BACKEND):
+    """Synchronous client for ``backend``"""
+    _check_backend(backend)
+    if backend == 'openai':
+        return OpenAICompatibleClient()
+    if backend == 'stub':
+        return StubClient()
+    # Imported here so other backends, and cold starts, skip the SDK
+    from groq import Groq
+    return Groq(api_key=GROQ_API_KEY)
+
+
+def create_async_client(backend=LLM_BACKEND):
+    """Async client for ``backend`` with a bounded connection pool.
+
+    SDK-level retries are disabled because the orchestrator retries
+    rate-limited calls itself. The client must be created and used on a
+    single event loop.
+    """
+    _check_backend(backend)
+    if backend == 'openai':
+        return AsyncOpenAICompatibleClient()
+    if backend == 'stub':
+        return AsyncStubClient()
+    from groq import AsyncGroq
+    limits = httpx.Limits(
+        max_connections=LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_MAX_CONNECTIONS
+    )
+    return AsyncGroq(
+        api_key=GROQ_API_KEY,
+        max_retries=0,
+        http_client=httpx.AsyncClient(limits=limits)
+    )
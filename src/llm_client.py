@@ -0,0 +1,17 @@
+import threading
+
+from config import LLM_BACKEND
+from src.llm_backends import create_client
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Process-wide synchronous client for LLM_BACKEND, created on first use"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = create_client(LLM_BACKEND)
+    return _client
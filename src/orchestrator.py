@@ -0,0 +1,258 @@
+import asyncio
+import contextvars
+import queue
+import random
+import threading
+
+from config import (
+    LLM_BACKOFF_BASE,
+    LLM_BACKEND,
+    LLM_BACKOFF_MAX,
+    LLM_MAX_CONCURRENCY,
+    LLM_MAX_RETRIES,
+    LLM_PIPELINE_MODE,
+    LLM_TIMEOUT
+)
+from src.image_analysis import ImageAnalyzer
+from src.interpretation_engine import ArtworkInterpreter
+from src.llm_backends import create_async_client, rate_limit_errors
+from src.report_generator import ReportGenerator
+from src.structured_output import (
+    CombinedStream,
+    InterpretationStream,
+    insights_from,
+    parse_combined,
+    parse_interpretation
+)
+from src.token_budget import record_budget
+from src.tracing import chunk_usage, record_usage, span
+
+
+class AnalysisPipeline:
+    """Runs analysis, interpretation and report generation as async stages.
+
+    The pipeline owns a private event loop on a daemon thread, so one pooled
+    async LLM client and one concurrency limit are shared by every caller in
+    the process. Synchronous callers such as the Streamlit script use ``run``,
+    which blocks only the calling thread.
+
+    ``mode`` is "two_call" (interpretation, then a report from it) or
+    "combined" (both from one completion); ``backend`` is one of
+    src.llm_backends.BACKENDS.
+    """
+
+    def __init__(self, max_concurrency=LLM_MAX_CONCURRENCY, timeout=LLM_TIMEOUT,
+                 max_retries=LLM_MAX_RETRIES, mode=LLM_PIPELINE_MODE, backend=LLM_BACKEND):
+        self.mode = mode
+        self.backend = backend
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self._client = None
+        self._client_lock = threading.Lock()
+        self._semaphore = None
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="analysis-pipeline", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, coro):
+        """Schedule a coroutine on the pipeline loop and return a concurrent Future.
+
+        The caller's context variables (such as the active trace) are carried
+        over to the coroutine.
+        """
+        return asyncio.run_coroutine_threadsafe(
+            self._in_context(coro, contextvars.copy_context()), self._loop
+        )
+
+    @staticmethod
+    async def _in_context(coro, context):
+        for var, value in context.items():
+            var.set(value)
+        return await coro
+
+    def run(self, image):
+        """Blocking wrapper around ``process`` for synchronous callers"""
+        return self.submit(self.process(image)).result()
+
+    async def process(self, image):
+        features = await self.analyze(image)
+        return {**features, **await self.generate(features)}
+
+    async def generate(self, features):
+        """{'interpretation', 'insights', 'report'} for analyzed features, per ``mode``"""
+        if self.mode == "combined":
+            parsed = await self.combined(features)
+            report = parsed["report"]
+        else:
+            parsed = await self.interpret(features)
+            report = None
+        if not report:
+            # Two-call mode, or a combined reply that stopped before its report
+            report = await self.report(parsed["interpretation"])
+        return {
+            "interpretation": parsed["interpretation"],
+            "insights": insights_from(parsed),
+            "report": report
+        }
+
+    async def analyze(self, image):
+        """Features of a BGR array as returned by ``src.ingest.load_image``"""
+        # OpenCV and NumPy release the GIL, so a worker thread keeps the loop free
+        return await asyncio.to_thread(lambda: ImageAnalyzer.from_bgr(image).analyze_all())
+
+    async def interpret(self, features):
+        request = ArtworkInterpreter(client=self._get_client()).build_request(
+            features["color_stats"], features["texture_stats"], features["composition_stats"]
+        )
+        with span('llm.interpret'):
+            record_budget(request)
+            completion = await self._complete(request)
+            record_usage(completion.usage)
+        return parse_interpretation(completion.choices[0].message.content)
+
+    async def combined(self, features):
+        """Parsed interpretation plus 'report' from one completion"""
+        request = ArtworkInterpreter(client=self._get_client()).build_combined_request(
+            features["color_stats"], features["texture_stats"], features["composition_stats"]
+        )
+        with span('llm.combined'):
+            record_budget(request)
+            completion = await self._complete(request)
+            record_usage(completion.usage)
+        return parse_combined(completion.choices[0].message.content)
+
+    async def report(self, interpretation):
+        request = ReportGenerator(client=self._get_client()).build_request(interpretation)
+        with span('llm.report'):
+            record_budget(request)
+            completion = await self._complete(request)
+            record_usage(completion.usage)
+        return completion.choices[0].message.content
+
+    def stream_interpretation(self, features):
+        """Synchronous stream of interpretation prose; ``result()`` parses the full reply"""
+        request = ArtworkInterpreter(client=self._get_client()).build_request(
+            features["color_stats"], features["texture_stats"], features["composition_stats"],
+            stream=True
+        )
+        return InterpretationStream(self.iterate(self._stream(request, 'llm.interpret.stream')))
+
+    def stream_combined(self, features):
+        """CombinedStream over one streamed reply; read its sections in order"""
+        request = ArtworkInterpreter(client=self._get_client()).build_combined_request(
+            features["color_stats"], features["texture_stats"], features["composition_stats"]
+        )
+        return CombinedStream(self.iterate(self._stream(request, 'llm.combined.stream')))
+
+    def stream_report(self, interpretation):
+        """Synchronous iterator over report text chunks"""
+        request = ReportGenerator(client=self._get_client()).build_request(interpretation)
+        return self.iterate(self._stream(request, 'llm.report.stream'))
+
+    def iterate(self, agen):
+        """Consume an async generator on the pipeline loop from synchronous code"""
+        items = queue.Queue()
+        done = object()
+
+        async def pump():
+            try:
+                async for item in agen:
+                    items.put((item, None))
+            except Exception as e:
+                items.put((None, e))
+            finally:
+                items.put((done, None))
+
+        future = self.submit(pump())
+        try:
+            while True:
+                item, error = items.get()
+                if error is not None:
+                    raise error
+                if item is done:
+                    return
+                yield item
+        finally:
+            # Stop generating if the consumer goes away mid-stream
+            future.cancel()
+
+    def _get_client(self):
+        # Created on first use, from whichever thread asks first. The client's
+        # connection pool and the semaphore only bind to an event loop when
+        # first awaited, and every request is awaited on self._loop. The lock
+        # keeps two concurrent first requests from each building a client.
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._semaphore = asyncio.Semaphore(self.max_concurrency)
+                    self._client = create_async_client(self.backend)
+        return self._client
+
+    async def _complete(self, request):
+        client = self._get_client()
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._semaphore:
+                    return await asyncio.wait_for(
+                        client.chat.completions.create(**request), self.timeout
+                    )
+            except rate_limit_errors() as e:
+                if attempt == self.max_retries:
+                    raise
+                await asyncio.sleep(self._backoff(attempt, e))
+
+    async def _stream(self, request, name):
+        with span(name):
+            record_budget(request)
+            async for text in self._stream_chunks(request):
+                yield text
+
+    async def _stream_chunks(self, request):
+        client = self._get_client()
+        for attempt in range(self.max_retries + 1):
+            async with self._semaphore:
+                try:
+                    stream = await asyncio.wait_for(
+                        client.chat.completions.create(**request, stream=True), self.timeout
+                    )
+                except rate_limit_errors() as e:
+                    if attempt == self.max_retries:
+                        raise
+                    error = e
+                else:
+                    # Once tokens flow the timeout applies to each chunk, not the whole reply
+                    chunks = stream.__aiter__()
+                    while True:
+                        try:
+                            chunk = await asyncio.wait_for(chunks.__anext__(), self.timeout)
+                        except StopAsyncIteration:
+                            return
+                        record_usage(chunk_usage(chunk))
+                        if chunk.choices and chunk.choices[0].delta.content:
+                            yield chunk.choices[0].delta.content
+            await asyncio.sleep(self._backoff(attempt, error))
+
+    def _backoff(self, attempt, error):
+        try:
+            retry_after = float(error.response.headers.get("retry-after"))
+        except (TypeError, ValueError):
+            # Full jitter keeps concurrent sessions from retrying in lockstep
+            return random.uniform(0, min(LLM_BACKOFF_BASE * 2 ** attempt, LLM_BACKOFF_MAX))
+        return min(retry_after, LLM_BACKOFF_MAX) + random.uniform(0, LLM_BACKOFF_BASE)
+
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def get_pipeline():
+    """Process-wide AnalysisPipeline, created on first use"""
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                _pipeline = AnalysisPipeline()
+    return _pipeline
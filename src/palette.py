@@ -0,0 +1,177 @@
+"""Dominant palette and perceptual color statistics.
+
+Pixels are sampled on a stratified grid (one random pixel per cell), so the
+cost depends on PALETTE_SAMPLES rather than the image size and every region
+of the canvas is represented. The sample is converted to CIELAB, where
+Euclidean distance tracks perceived difference, and clustered with
+cv2.kmeans (k-means++ seeding, fixed RNG seed so results are repeatable).
+
+Run ``python -m benchmarks.bench_palette`` to check latency across image
+sizes and the error against clustering every pixel.
+"""
+import cv2
+import numpy as np
+
+from config import PALETTE_COLORS, PALETTE_NEUTRAL_CHROMA, PALETTE_SAMPLES
+
+# Hue angles (HSV degrees) counted as warm: reds, oranges and yellows
+WARM_HUES = ((0.0, 75.0), (330.0, 360.0))
+KMEANS_CRITERIA = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 30, 0.1)
+KMEANS_ATTEMPTS = 3
+
+
+def sample_indices(height, width, samples=PALETTE_SAMPLES, seed=0):
+    """(rows, cols) index arrays of one pixel from each cell of a grid, or None.
+
+    None means the image has no more than ``samples`` pixels and is used
+    whole. The indices only depend on the size, so they can be shared by
+    every image of a same-size stack.
+    """
+    if height * width <= samples:
+        return None
+    # Square-ish cells: the grid follows the image's aspect ratio
+    rows = int(min(height, max(1, round(np.sqrt(samples * height / width)))))
+    cols = int(min(width, max(1, samples // rows)))
+    rng = np.random.default_rng(seed)
+    row_starts = np.arange(rows) * height // rows
+    col_starts = np.arange(cols) * width // cols
+    row_sizes = np.diff(np.append(row_starts, height))
+    col_sizes = np.diff(np.append(col_starts, width))
+    r = row_starts[:, None] + (rng.random((rows, cols)) * row_sizes[:, None]).astype(np.intp)
+    c = col_starts[None, :] + (rng.random((rows, cols)) * col_sizes[None, :]).astype(np.intp)
+    return r.ravel(), c.ravel()
+
+
+def sample_pixels(image, samples=PALETTE_SAMPLES, seed=0):
+    """About ``samples`` BGR pixels as an N x 3 array, one from each cell of a grid.
+
+    Images with no more than ``samples`` pixels are returned whole.
+    """
+    indices = sample_indices(*image.shape[:2], samples, seed)
+    if indices is None:
+        return image.reshape(-1, 3)
+    return image[indices]
+
+
+def _convert(pixels, code):
+    """cv2 color conversion of a ... x 3 float32 array, keeping its shape"""
+    return cv2.cvtColor(pixels.reshape(-1, 1, 3), code).reshape(pixels.shape)
+
+
+def to_lab(pixels):
+    """N x 3 uint8 BGR pixels as float32 CIELAB (L 0-100, a and b about -128-127)"""
+    return _convert(pixels.astype(np.float32) / 255, cv2.COLOR_BGR2Lab)
+
+
+def cluster(lab, colors=PALETTE_COLORS, seed=0):
+    """(Lab centers, share of pixels) of ``colors`` k-means clusters, largest first"""
+    if len(lab) == 1:
+        # cv2.kmeans would read a single 1 x 3 sample as three 1-D samples
+        return lab.astype(np.float64), np.ones(1)
+    colors = min(colors, len(lab))
+    # k-means++ seeding draws from OpenCV's RNG
+    cv2.setRNGSeed(seed)
+    _, labels, centers = cv2.kmeans(np.ascontiguousarray(lab, np.float32), colors, None,
+                                    KMEANS_CRITERIA, KMEANS_ATTEMPTS, cv2.KMEANS_PP_CENTERS)
+    labels = labels.ravel()
+    counts = np.bincount(labels, minlength=colors)
+    # OpenCV accumulates centers in float32, which drifts over millions of
+    # pixels; recompute them from the final labels in float64
+    sums = np.stack([np.bincount(labels, weights=lab[:, i], minlength=colors) for i in range(3)], axis=1)
+    centers = np.divide(sums, counts[:, None], out=centers.astype(np.float64), where=counts[:, None] > 0)
+    proportions = counts / len(lab)
+    order = np.argsort(-proportions, kind='stable')
+    return centers[order], proportions[order]
+
+
+def describe(centers, proportions):
+    """Palette entries (hex, RGB, HSV, Lab and share) for Lab cluster centers"""
+    # Converted from the rounded Lab values that are stored, so a palette
+    # rebuilt from its own 'lab' entries comes out identical
+    centers = np.round(np.asarray(centers, np.float64), 2)
+    bgr = np.clip(_convert(np.asarray(centers, np.float32), cv2.COLOR_Lab2BGR), 0, 1)
+    hsv = _convert(bgr, cv2.COLOR_BGR2HSV)
+    palette = []
+    for lab, color, (h, s, v), share in zip(centers, np.rint(bgr * 255).astype(int), hsv, proportions):
+        b, g, r = (int(value) for value in color)
+        palette.append({
+            'hex': f'#{r:02x}{g:02x}{b:02x}',
+            'rgb': [r, g, b],
+            'hsv': [round(float(h), 1), round(float(s), 4), round(float(v), 4)],
+            'lab': [float(value) for value in lab],
+            'proportion': float(share)
+        })
+    return palette
+
+
+def tone_arrays(pixels, neutral_chroma=PALETTE_NEUTRAL_CHROMA, lab=None):
+    """``tone_stats`` of an N x S x 3 stack of BGR pixel samples, one array of N per statistic"""
+    lab = to_lab(pixels) if lab is None else lab
+    hsv = _convert(pixels.astype(np.float32) / 255, cv2.COLOR_BGR2HSV)
+    chroma = np.hypot(lab[..., 1], lab[..., 2])
+    chromatic = chroma >= neutral_chroma
+    hue = hsv[..., 0]
+    warm = chromatic & np.logical_or.reduce([(hue >= low) & (hue < high) for low, high in WARM_HUES])
+    cool = chromatic & ~warm
+    total = pixels.shape[1]
+    n_chromatic = np.count_nonzero(chromatic, axis=1)
+    n_warm, n_cool = np.count_nonzero(warm, axis=1), np.count_nonzero(cool, axis=1)
+    return {
+        'warmth': np.divide(n_warm - n_cool, n_chromatic, out=np.zeros(len(pixels)), where=n_chromatic > 0),
+        'warm_ratio': n_warm / total,
+        'cool_ratio': n_cool / total,
+        'neutral_ratio': (total - n_chromatic) / total,
+        'saturation_mean': hsv[..., 1].mean(axis=1),
+        'saturation_std': hsv[..., 1].std(axis=1),
+        'lightness_mean': lab[..., 0].mean(axis=1) / 100,
+        'chroma_mean': chroma.mean(axis=1)
+    }
+
+
+def tone_stats(pixels, neutral_chroma=PALETTE_NEUTRAL_CHROMA, lab=None):
+    """Warmth, saturation and lightness statistics of N x 3 BGR pixels.
+
+    ``warmth`` is (warm - cool) / chromatic pixels, from -1 (all cool) to 1
+    (all warm); pixels with Lab chroma under ``neutral_chroma`` are neutral.
+    Saturation is HSV saturation from 0 to 1, lightness is L* / 100.
+    """
+    stats = tone_arrays(pixels[None], neutral_chroma, None if lab is None else lab[None])
+    return {name: float(values[0]) for name, values in stats.items()}
+
+
+def palette_distance(reference, palette):
+    """Share-weighted mean delta E (CIE76) from each reference color to its nearest palette color"""
+    ref_lab = np.array([color['lab'] for color in reference])
+    lab = np.array([color['lab'] for color in palette])
+    nearest = np.linalg.norm(ref_lab[:, None, :] - lab[None, :, :], axis=2).min(axis=1)
+    shares = np.array([color['proportion'] for color in reference])
+    return float(nearest @ shares / shares.sum())
+
+
+class PaletteAnalyzer:
+    """Top ``colors`` dominant colors with their shares, plus tone statistics.
+
+    ``analyze`` returns the ``color_stats['palette']`` dict: ``colors`` (see
+    ``describe``) and the ``tone_stats`` values, all from ``samples`` pixels.
+    With ``dominant=False`` the clustering is skipped and ``colors`` is empty.
+    """
+
+    def __init__(self, colors=PALETTE_COLORS, samples=PALETTE_SAMPLES,
+                 neutral_chroma=PALETTE_NEUTRAL_CHROMA, seed=0, dominant=True):
+        self.colors = colors
+        self.samples = samples
+        self.neutral_chroma = neutral_chroma
+        self.seed = seed
+        self.dominant = dominant
+
+    def analyze_pixels(self, pixels):
+        """Palette of an N x 3 BGR pixel array, e.g. every pixel of an image"""
+        lab = to_lab(pixels)
+        return {
+            'colors': describe(*cluster(lab, self.colors, self.seed)) if self.dominant else [],
+            **tone_stats(pixels, self.neutral_chroma, lab)
+        }
+
+    def analyze(self, image):
+        """Palette of a BGR image from a stratified sample of its pixels"""
+        return self.analyze_pixels(sample_pixels(image, self.samples, self.seed))
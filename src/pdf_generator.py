@@ -1,24 +1,121 @@
+import hashlib
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from fpdf import FPDF
+from fpdf.enums import MethodReturnValue
+from fpdf.template import FlexTemplate
 from datetime import datetime
+from config import PDF_CACHE_ENTRIES, PDF_CHART_SIZE, PDF_IMAGE_CACHE_ENTRIES, PDF_LINE_HEIGHT
+from src.cache import ResultCache
+from src.report_images import (
+    can_render_charts, chart_key, chart_png, thumbnail_jpeg, thumbnail_key, upload_digest
+)
+from src.tracing import span, traced
+
+REPORT_TITLE = 'Art Therapy Analysis Report'
+# Height (mm) of the box the artwork thumbnail is fitted into
+THUMBNAIL_HEIGHT = 70
+CHART_GAP = 5
+FOOTER_TEXT = 'This report is for self-reflection purposes only and should not be considered as professional psychological advice.'
+DISCLAIMER_TEXT = """
+        1. This art therapy analysis report is generated using automated tools and AI analysis.
+        
+        2. The interpretations provided are meant for self-reflection and personal insight only.
+        
+        3. This report should not be used as a substitute for professional psychological evaluation or therapy.
+        
+        4. If you are experiencing psychological distress, please seek help from a qualified mental health professional.
+        
+        5. Art interpretation is subjective and may not accurately reflect your actual psychological state.
+        
+        6. The analysis provided should be considered as possibilities rather than definitive conclusions.
+        """
+
+def _text_element(name, x1, y1, x2, y2, size, style='', align='L', text=''):
+    """FlexTemplate text element in the core Helvetica font"""
+    return {
+        'name': name, 'type': 'T', 'x1': x1, 'y1': y1, 'x2': x2, 'y2': y2,
+        'font': 'helvetica', 'size': size, 'bold': 'B' in style, 'italic': 'I' in style,
+        'align': align, 'text': text
+    }
+
+
+class PageTemplate:
+    """Fixed parts of every report, laid out once per process.
+
+    The header, footer and disclaimer page are fpdf2 FlexTemplate element
+    lists. Their positions and the disclaimer's line breaks are computed from
+    the page geometry when the template is built. Each document then only
+    fills in its date and page numbers.
+    """
+
+    def __init__(self, width, height, margin):
+        left, right, top = margin, width - margin, margin
+        self.header = [
+            _text_element('title', left, top, right, top + 10, 12, 'B', 'C', REPORT_TITLE),
+            _text_element('generated_on', left, top + 10, right, top + 20, 12, 'B', 'C')
+        ]
+        # Page content starts below the header and a 10 mm gap
+        self.body_top = top + 30
+
+        bottom = height - 15
+        self.footer = [
+            _text_element('notice', left, bottom, right, bottom + 5, 8, 'I', 'C', FOOTER_TEXT),
+            _text_element('page', left, bottom + 5, right, bottom + 10, 8, 'I', 'R')
+        ]
+
+        probe = FPDF()
+        probe.set_margins(margin, margin)
+        probe.add_page()
+        probe.set_font('helvetica', '', 12)
+        lines = probe.multi_cell(0, PDF_LINE_HEIGHT, DISCLAIMER_TEXT, dry_run=True,
+                                 output=MethodReturnValue.LINES)
+        self.disclaimer = [
+            _text_element('disclaimer_title', left, self.body_top, right, self.body_top + 10, 14, 'B',
+                          text='Important Disclaimers')
+        ]
+        y = self.body_top + 10
+        for i, line in enumerate(lines):
+            self.disclaimer.append(_text_element(f'disclaimer_{i}', left, y, right, y + PDF_LINE_HEIGHT, 12,
+                                                 text=line))
+            y += PDF_LINE_HEIGHT
+        self.disclaimer_bottom = y
+
 
 class TherapyReportPDF(FPDF):
+    # Built by the first document and shared by every later one
+    _template = None
+    _template_lock = threading.Lock()
+
     def __init__(self):
         super().__init__()
         self.set_auto_page_break(auto=True, margin=15)
+        self.template = self._get_template()
+        self._header = FlexTemplate(self, self.template.header)
+        self._footer = FlexTemplate(self, self.template.footer)
+        self._disclaimer = FlexTemplate(self, self.template.disclaimer)
+        # One timestamp per document, formatted once rather than on every page
+        self.generated_on = f'Generated on: {datetime.now().strftime("%Y-%m-%d %H:%M")}'
         self.add_page()
         self.set_font('Arial', 'B', 16)
+
+    def _get_template(self):
+        cls = type(self)
+        if cls._template is None:
+            with cls._template_lock:
+                if cls._template is None:
+                    cls._template = PageTemplate(self.w, self.h, self.l_margin)
+        return cls._template
         
     def header(self):
-        self.set_font('Arial', 'B', 12)
-        self.cell(0, 10, 'Art Therapy Analysis Report', 0, 1, 'C')
-        self.cell(0, 10, f'Generated on: {datetime.now().strftime("%Y-%m-%d %H:%M")}', 0, 1, 'C')
-        self.ln(10)
+        self._header['generated_on'] = self.generated_on
+        self._header.render()
+        self.set_y(self.template.body_top)
         
     def footer(self):
-        self.set_y(-15)
-        self.set_font('Arial', 'I', 8)
-        self.cell(0, 10, 'This report is for self-reflection purposes only and should not be considered as professional psychological advice.', 0, 0, 'C')
-        self.cell(0, 10, f'Page {self.page_no()}', 0, 0, 'R')
+        self._footer['page'] = f'Page {self.page_no()}'
+        self._footer.render()
         
     def chapter_title(self, title):
         self.set_font('Arial', 'B', 14)
@@ -27,32 +124,39 @@ class TherapyReportPDF(FPDF):
         
     def chapter_body(self, body):
         self.set_font('Arial', '', 12)
-        self.multi_cell(0, 10, body)
+        self.multi_cell(0, PDF_LINE_HEIGHT, body)
         self.ln()
+
+    def add_images(self, thumbnail=None, charts=()):
+        """Artwork thumbnail (JPEG bytes) centered, then PNG charts two to a row"""
+        self.chapter_title('Your Artwork')
+        if thumbnail is not None:
+            self.image(io.BytesIO(thumbnail), x=self.l_margin, y=self.y, w=self.epw,
+                       h=THUMBNAIL_HEIGHT, keep_aspect_ratio=True)
+            self.ln(THUMBNAIL_HEIGHT + CHART_GAP)
+        width = (self.epw - CHART_GAP) / 2
+        height = width * PDF_CHART_SIZE[1] / PDF_CHART_SIZE[0]
+        for start in range(0, len(charts), 2):
+            if self.will_page_break(height):
+                self.add_page()
+            for i, chart in enumerate(charts[start:start + 2]):
+                self.image(io.BytesIO(chart), x=self.l_margin + i * (width + CHART_GAP), y=self.y,
+                           w=width, h=height)
+            self.ln(height + CHART_GAP)
         
     def add_disclaimer(self):
         self.add_page()
-        self.set_font('Arial', 'B', 14)
-        self.cell(0, 10, 'Important Disclaimers', 0, 1, 'L')
-        self.set_font('Arial', '', 12)
-        disclaimer_text = """
-        1. This art therapy analysis report is generated using automated tools and AI analysis.
-        
-        2. The interpretations provided are meant for self-reflection and personal insight only.
-        
-        3. This report should not be used as a substitute for professional psychological evaluation or therapy.
-        
-        4. If you are experiencing psychological distress, please seek help from a qualified mental health professional.
-        
-        5. Art interpretation is subjective and may not accurately reflect your actual psychological state.
-        
-        6. The analysis provided should be considered as possibilities rather than definitive conclusions.
-        """
-        self.multi_cell(0, 10, disclaimer_text)
+        self._disclaimer.render()
+        self.set_y(self.template.disclaimer_bottom)
 
-def generate_pdf_report(interpretation, report):
+@traced('pdf.generate')
+def generate_pdf_report(interpretation, report, thumbnail=None, charts=()):
     pdf = TherapyReportPDF()
     
+    # Artwork and charts first, when the caller has them
+    if thumbnail is not None or charts:
+        pdf.add_images(thumbnail, charts)
+    
     # Add interpretation section
     pdf.chapter_title('Detailed Art Analysis')
     pdf.chapter_body(interpretation)
@@ -71,4 +175,108 @@ def generate_pdf_report(interpretation, report):
     # Add disclaimers
     pdf.add_disclaimer()
     
-    return pdf 
\ No newline at end of file
+    return pdf
+
+
+class PDFRenderer:
+    """Renders report PDFs on demand, memoized by the hash of their content.
+
+    ``render`` builds (or reuses) the PDF bytes; ``prefetch`` starts a build on
+    a background thread so a later ``render`` call returns immediately. The
+    artwork thumbnail and chart images are cached separately, so a report
+    rebuilt for new text reuses them. The thumbnail is keyed by
+    ``artwork_key``, a digest of the upload the caller already has (the
+    result cache key in the app). ``charts`` are (name, data, figure)
+    triples, keyed by name and the data the figure is drawn from; they are
+    left out when Plotly cannot export images here.
+    """
+
+    def __init__(self, max_entries=PDF_CACHE_ENTRIES, workers=1, image_entries=PDF_IMAGE_CACHE_ENTRIES):
+        self._cache = ResultCache(max_entries=max_entries)
+        self._images = ResultCache(max_entries=image_entries)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='pdf-render')
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(interpretation, report, image_keys=()):
+        digest = hashlib.sha256(interpretation.encode())
+        digest.update(b'\0')
+        digest.update(report.encode())
+        for image_key in image_keys:
+            digest.update(b'\0')
+            digest.update(image_key.encode())
+        return digest.hexdigest()
+
+    def _prepare(self, interpretation, report, artwork, charts, artwork_key):
+        """PDF key plus (key, encode) of the thumbnail, or None, and of each chart"""
+        thumbnail = None
+        if artwork is not None:
+            artwork_key = upload_digest(artwork) if artwork_key is None else artwork_key
+            thumbnail = (thumbnail_key(artwork_key), lambda: thumbnail_jpeg(artwork))
+        chart_sources = []
+        if can_render_charts():
+            chart_sources = [(chart_key(name, data), lambda fig=fig: chart_png(fig))
+                             for name, data, fig in charts]
+        image_keys = [source[0] for source in [thumbnail, *chart_sources] if source is not None]
+        return self.key(interpretation, report, image_keys), thumbnail, chart_sources
+
+    def render(self, interpretation, report, artwork=None, charts=(), artwork_key=None):
+        """PDF bytes of a report, with the artwork (upload bytes) and Plotly charts if given"""
+        key, thumbnail, chart_sources = self._prepare(interpretation, report, artwork, charts, artwork_key)
+        pdf_bytes = self._cache.get(key)
+        if pdf_bytes is not None:
+            return pdf_bytes
+        with self._lock:
+            future = self._pending.get(key)
+        if future is not None:
+            return future.result()
+        return self._build(key, interpretation, report, thumbnail, chart_sources)
+
+    def prefetch(self, interpretation, report, artwork=None, charts=(), artwork_key=None):
+        key, thumbnail, chart_sources = self._prepare(interpretation, report, artwork, charts, artwork_key)
+        with self._lock:
+            if key in self._pending or key in self._cache:
+                return
+            self._pending[key] = self._executor.submit(
+                self._build, key, interpretation, report, thumbnail, chart_sources
+            )
+
+    def _image(self, source):
+        key, encode = source
+        data = self._images.get(key)
+        if data is None:
+            with span('pdf.rasterize'):
+                # A chart that could not be exported is cached as empty and left out
+                data = encode() or b''
+            self._images.set(key, data)
+        return data
+
+    def _build(self, key, interpretation, report, thumbnail=None, chart_sources=()):
+        try:
+            pdf = generate_pdf_report(
+                interpretation, report,
+                thumbnail=None if thumbnail is None else self._image(thumbnail),
+                charts=[chart for chart in map(self._image, chart_sources) if chart]
+            )
+            with span('pdf.output'):
+                pdf_bytes = bytes(pdf.output())
+            self._cache.set(key, pdf_bytes)
+            return pdf_bytes
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+
+_renderer = None
+_renderer_lock = threading.Lock()
+
+
+def get_pdf_renderer():
+    """Process-wide PDFRenderer, created on first use"""
+    global _renderer
+    if _renderer is None:
+        with _renderer_lock:
+            if _renderer is None:
+                _renderer = PDFRenderer()
+    return _renderer
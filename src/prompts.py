@@ -1,3 +1,6 @@
+# Bump whenever a prompt changes so cached results are not reused across versions
+PROMPT_VERSION = "1"
+
 # Art Analysis System Prompts
 ART_INTERPRETER_SYSTEM_PROMPT = """You are a friendly and approachable art therapist who helps people 
 understand their artwork while providing detailed insights into their emotional and mental state. 
@@ -47,8 +50,86 @@ Your report should include:
 
 Use clear headings and maintain a professional yet approachable tone throughout."""
 
+# Compact report prompts: the system prompt no longer repeats the section
+# outline that the user prompt already gives, and the reply is sized to the
+# completion budget (see src/token_budget.py)
+REPORT_GENERATOR_COMPACT_SYSTEM_PROMPT = """You write art therapy reports that turn an artwork analysis into a 
+clear, well-structured report. Be informative and supportive, use accessible language with clear 
+headings, avoid diagnostic language and keep a professional yet approachable tone."""
+
+# The interpreter answers with one JSON object so the UI can chart scores and
+# list key points from the same completion; the prose comes first so it can
+# be streamed while the rest is generated (see src/structured_output.py)
+INTERPRETATION_FORMAT = """Respond with a single JSON object and nothing else, using exactly these keys in this order:
+{
+  "interpretation": "<the full analysis above as Markdown text>",
+  "emotions": {"joy": <0-1>, "calm": <0-1>, "energy": <0-1>, "tension": <0-1>, "expression": <0-1>},
+  "key_points": {
+    "emotional_state": ["<3 short points>"],
+    "cognitive_patterns": ["<3 short points>"],
+    "behavioral_insights": ["<3 short points>"]
+  }
+}
+Emotion scores are numbers from 0 (absent) to 1 (very strong). Key points are single sentences of under 12 words."""
+
+# Combined mode: one completion carries the interpretation, the chart values
+# and the report as marked parts (split by src/structured_output.py)
+COMBINED_FORMAT = """Answer in three parts. Start each part with its marker line exactly as shown, and write nothing before the first marker.
+===INTERPRETATION===
+The full analysis above, as Markdown.
+===INSIGHTS===
+{{"emotions": {{"joy": <0-1>, "calm": <0-1>, "energy": <0-1>, "tension": <0-1>, "expression": <0-1>}}, "key_points": {{"emotional_state": ["<3 short points>"], "cognitive_patterns": ["<3 short points>"], "behavioral_insights": ["<3 short points>"]}}}}
+===REPORT===
+A report for the artist built from the analysis, with exactly these numbered sections, each title on its own line and a blank line between sections:
+1. Executive Summary - key findings, main emotional themes, notable strengths
+2. Detailed Analysis - emotional expression, cognitive patterns, behavioral insights
+3. Strengths and Resources - coping mechanisms, resilience, support
+4. Areas for Growth - stress points and suggested focus areas
+5. Recommendations - self-care, areas to explore, resources
+6. Professional Notes - limitations, appropriate use, when to seek professional support
+Keep the report under {target_words} words.
+Emotion scores are numbers from 0 (absent) to 1 (very strong). Key points are single sentences of under 12 words."""
+
+def _palette_details(color_stats):
+    """Prompt lines for the dominant palette and color temperature, when the features have them"""
+    palette = color_stats.get('palette')
+    if not palette:
+        return ''
+    colors = ', '.join(
+        f"{color['hex']} {color['proportion']:.0%} (hue {color['hsv'][0]:.0f}°, "
+        f"saturation {color['hsv'][1]:.2f}, value {color['hsv'][2]:.2f})"
+        for color in palette['colors']
+    )
+    # Dominant colors are only there when ANALYSIS_PALETTE is on
+    lines = [f"- Dominant Palette (share of canvas): {colors}"] if colors else []
+    lines += [
+        f"- Color Temperature (-1 all cool to 1 all warm): {palette['warmth']:+.2f}; "
+        f"warm {palette['warm_ratio']:.0%}, cool {palette['cool_ratio']:.0%}, neutral {palette['neutral_ratio']:.0%}",
+        f"- Saturation: mean {palette['saturation_mean']:.2f}, spread {palette['saturation_std']:.2f}; "
+        f"Lightness: mean {palette['lightness_mean']:.2f}"
+    ]
+    return ''.join(f"\n    {line}" for line in lines)
+
+
+def _composition_details(composition_stats):
+    """Prompt lines for the multi-axis composition features, when the features have them"""
+    lines = []
+    axes = [('left-right', 'symmetry_score'), ('top-bottom', 'symmetry_top_bottom'),
+            ('diagonal', 'symmetry_diagonal'), ('anti-diagonal', 'symmetry_anti_diagonal')]
+    if composition_stats.get('symmetry_top_bottom') is not None:
+        values = ', '.join(f"{name} {composition_stats[key]:.2f}" for name, key in axes
+                           if composition_stats.get(key) is not None)
+        lines.append(f"- Symmetry by axis (mean gray-level difference from the mirror image, 0 = perfectly symmetric): {values}")
+    if composition_stats.get('thirds_weight') is not None:
+        lines.append(f"- Rule-of-Thirds Weight (edge emphasis at the thirds intersections, 1.0 = none): {composition_stats['thirds_weight']:.2f}")
+    if composition_stats.get('edge_grid'):
+        rows = ' / '.join(' '.join(f"{density:.3f}" for density in row) for row in composition_stats['edge_grid'])
+        lines.append(f"- Edge Density by Region (grid, top row first): {rows}")
+    return ''.join(f"\n    {line}" for line in lines)
+
+
 # Analysis Prompt Templates
-def get_analysis_prompt(color_stats, texture_stats, composition_stats):
+def get_analysis_prompt(color_stats, texture_stats, composition_stats, output_format=INTERPRETATION_FORMAT):
     return f"""Please provide a comprehensive analysis of this artwork's features, 
     examining both emotional expression and potential mental state indicators.
     
@@ -56,7 +137,7 @@ def get_analysis_prompt(color_stats, texture_stats, composition_stats):
     Color Analysis:
     - Red Channel: mean={color_stats['r']['mean']:.2f}, std={color_stats['r']['std']:.2f}
     - Green Channel: mean={color_stats['g']['mean']:.2f}, std={color_stats['g']['std']:.2f}
-    - Blue Channel: mean={color_stats['b']['mean']:.2f}, std={color_stats['b']['std']:.2f}
+    - Blue Channel: mean={color_stats['b']['mean']:.2f}, std={color_stats['b']['std']:.2f}{_palette_details(color_stats)}
     
     Texture Analysis:
     - Contrast: {texture_stats['contrast']:.2f}
@@ -65,7 +146,7 @@ def get_analysis_prompt(color_stats, texture_stats, composition_stats):
     
     Composition Analysis:
     - Edge Density: {composition_stats['edge_density']:.2f}
-    - Symmetry Score: {composition_stats['symmetry_score']:.2f}
+    - Symmetry Score: {composition_stats['symmetry_score']:.2f}{_composition_details(composition_stats)}
     
     Please provide detailed insights on:
     1. Emotional State Analysis
@@ -93,7 +174,9 @@ def get_analysis_prompt(color_stats, texture_stats, composition_stats):
        - Growth opportunities
        - Resource needs
     
-    Maintain a balance between professional insight and supportive language."""
+    Maintain a balance between professional insight and supportive language.
+    
+    {output_format}"""
 
 def get_report_prompt(interpretation):
     return f"""Based on the following detailed art analysis:
@@ -144,4 +227,25 @@ def get_report_prompt(interpretation):
        - Professional support recommendations
 
     Format the report professionally while maintaining an encouraging and supportive tone.
-    Include appropriate disclaimers about the nature of art interpretation and its limitations.""" 
\ No newline at end of file
+    Include appropriate disclaimers about the nature of art interpretation and its limitations.""" 
+
+def get_compact_report_prompt(interpretation, target_words):
+    return f"""Art analysis notes:
+
+{interpretation}
+
+Write a report from these notes with exactly these numbered sections:
+1. Executive Summary - key findings, main emotional themes, notable strengths
+2. Detailed Analysis - emotional expression, cognitive patterns, behavioral insights
+3. Strengths and Resources - coping mechanisms, resilience, support
+4. Areas for Growth - stress points and suggested focus areas
+5. Recommendations - self-care, areas to explore, resources
+6. Professional Notes - limitations, appropriate use, when to seek professional support
+
+Keep an encouraging tone, note that art interpretation has limits, and stay under {target_words} words."""
+
+def get_combined_prompt(color_stats, texture_stats, composition_stats, target_words):
+    return get_analysis_prompt(
+        color_stats, texture_stats, composition_stats,
+        output_format=COMBINED_FORMAT.format(target_words=target_words)
+    )
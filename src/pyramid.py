@@ -0,0 +1,56 @@
+import cv2
+
+
+def fit_to_side(width, height, max_side):
+    """Size that fits (width, height) inside max_side, keeping aspect ratio"""
+    if max_side is None or max(width, height) <= max_side:
+        return width, height
+    scale = max_side / max(width, height)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def resize_to_side(image, max_side):
+    """Downscale an image array so its longest side is at most max_side"""
+    height, width = image.shape[:2]
+    size = fit_to_side(width, height, max_side)
+    if size == (width, height):
+        return image
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+
+
+class ImagePyramid:
+    """Lazily built, cached downscaled copies of a BGR image.
+
+    Levels are keyed by their maximum side length. Each new level is resized
+    from the smallest cached level that is still larger than it, so asking for
+    several working sizes never touches the base image more than once.
+    """
+
+    def __init__(self, image):
+        self.base = image
+        self._levels = {}
+        self._grays = {}
+
+    def _key(self, max_side):
+        height, width = self.base.shape[:2]
+        if max_side is None or max(height, width) <= max_side:
+            return None
+        return max_side
+
+    def level(self, max_side=None):
+        """BGR image whose longest side is at most max_side (None for full size)"""
+        key = self._key(max_side)
+        if key is None:
+            return self.base
+        if key not in self._levels:
+            candidates = [side for side in self._levels if side > key]
+            source = self._levels[min(candidates)] if candidates else self.base
+            self._levels[key] = resize_to_side(source, key)
+        return self._levels[key]
+
+    def gray(self, max_side=None):
+        """Grayscale version of ``level(max_side)``, converted once per level"""
+        key = self._key(max_side)
+        if key not in self._grays:
+            self._grays[key] = cv2.cvtColor(self.level(key), cv2.COLOR_BGR2GRAY)
+        return self._grays[key]
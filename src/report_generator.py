@@ -1,22 +1,58 @@
-from groq import Groq
-from config import GROQ_API_KEY, MODEL_NAME
-from src.prompts import REPORT_GENERATOR_SYSTEM_PROMPT, get_report_prompt
+from config import LLM_COMPACT_PROMPTS, LLM_REPORT_MAX_TOKENS, MODEL_NAME
+from src.llm_client import get_client
+from src.token_budget import completion_budget, compress_interpretation, record_budget
+from src.tracing import chunk_usage, record_usage, span, traced
+from src.prompts import (
+    REPORT_GENERATOR_COMPACT_SYSTEM_PROMPT,
+    REPORT_GENERATOR_SYSTEM_PROMPT,
+    get_compact_report_prompt,
+    get_report_prompt
+)
 
 class ReportGenerator:
-    def __init__(self):
-        self.client = Groq(api_key=GROQ_API_KEY)
-        
-    def generate_report(self, interpretation):
-        prompt = get_report_prompt(interpretation)
-        
-        completion = self.client.chat.completions.create(
+    def __init__(self, client=None, compact=LLM_COMPACT_PROMPTS):
+        self.client = client or get_client()
+        self.compact = compact
+
+    def build_request(self, interpretation):
+        """Keyword arguments for the chat completion call"""
+        if self.compact:
+            # About 0.75 words per token, less some room for Markdown
+            target_words = int(round(LLM_REPORT_MAX_TOKENS * 0.6, -1))
+            system_prompt = REPORT_GENERATOR_COMPACT_SYSTEM_PROMPT
+            prompt = get_compact_report_prompt(compress_interpretation(interpretation), target_words)
+        else:
+            system_prompt = REPORT_GENERATOR_SYSTEM_PROMPT
+            prompt = get_report_prompt(interpretation)
+
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt}
+        ]
+        return dict(
             model=MODEL_NAME,
-            messages=[
-                {"role": "system", "content": REPORT_GENERATOR_SYSTEM_PROMPT},
-                {"role": "user", "content": prompt}
-            ],
+            messages=messages,
             temperature=0.7,
-            max_tokens=1024
+            max_tokens=completion_budget(messages, LLM_REPORT_MAX_TOKENS)
         )
-        
-        return completion.choices[0].message.content 
\ No newline at end of file
+
+    @traced('llm.report')
+    def generate_report(self, interpretation):
+        request = self.build_request(interpretation)
+        record_budget(request)
+        completion = self.client.chat.completions.create(**request)
+
+        record_usage(completion.usage)
+        return completion.choices[0].message.content
+
+    def stream_report(self, interpretation):
+        """Yield the report text in chunks as the model generates it"""
+        request = self.build_request(interpretation)
+        stream = self.client.chat.completions.create(**request, stream=True)
+
+        with span('llm.report.stream'):
+            record_budget(request)
+            for chunk in stream:
+                record_usage(chunk_usage(chunk))
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
\ No newline at end of file
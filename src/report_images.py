@@ -0,0 +1,65 @@
+"""Images embedded in PDF reports: the artwork thumbnail and static charts.
+
+The thumbnail is decoded at reduced size straight from the upload and
+re-encoded as a small JPEG, which the PDF embeds as-is. Charts are exported
+to PNG by Plotly through kaleido; without kaleido, or the Chrome it drives,
+reports leave them out. Images are keyed by the upload digest the caller
+computed once and by the small inputs each chart is drawn from, so a render
+never rehashes the upload or serializes a figure.
+"""
+import hashlib
+import json
+
+import cv2
+
+from config import PDF_CHART_SIZE, PDF_THUMBNAIL_QUALITY, PDF_THUMBNAIL_SIDE
+from src.ingest import load_image
+
+try:
+    import kaleido
+except ImportError:
+    kaleido = None
+
+
+def upload_digest(data):
+    """Digest of upload bytes, for callers without a cache key to key the thumbnail on"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def thumbnail_key(artwork_key, max_side=PDF_THUMBNAIL_SIDE, quality=PDF_THUMBNAIL_QUALITY):
+    return f"thumbnail|{artwork_key}|{max_side}|{quality}"
+
+
+def chart_key(name, data, size=PDF_CHART_SIZE):
+    """Key of chart ``name`` drawn from ``data``: its input values, or a cache key they derive from"""
+    digest = hashlib.sha256(json.dumps([name, data], sort_keys=True, default=float).encode())
+    return f"chart|{digest.hexdigest()}|{size[0]}x{size[1]}"
+
+
+def can_render_charts():
+    return kaleido is not None
+
+
+def thumbnail_jpeg(data, max_side=PDF_THUMBNAIL_SIDE, quality=PDF_THUMBNAIL_QUALITY):
+    """Upload bytes as a JPEG at most ``max_side`` pixels on its longest side"""
+    image = load_image(data, max_side=max_side)
+    ok, encoded = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality,
+                                               cv2.IMWRITE_JPEG_OPTIMIZE, 1])
+    if not ok:
+        raise ValueError("Could not encode the artwork thumbnail")
+    return encoded.tobytes()
+
+
+def chart_png(fig, size=PDF_CHART_SIZE):
+    """PNG rendering of a Plotly figure at ``size`` (width, height) pixels, or None.
+
+    None means the chart cannot be exported here: kaleido is missing, or
+    it found no Chrome to render with.
+    """
+    if kaleido is None:
+        return None
+    width, height = size
+    try:
+        return fig.to_image(format='png', width=width, height=height)
+    except RuntimeError:
+        return None
@@ -0,0 +1,68 @@
+"""Report how far analysis features drift when computed on downscaled images.
+
+Usage:
+    python -m src.resolution_drift artwork.jpg [more.jpg ...] --sides 256 512 1024 2048
+"""
+import argparse
+
+import numpy as np
+from PIL import Image
+
+from src.image_analysis import ImageAnalyzer, flatten_features
+
+DEFAULT_SIDES = (256, 512, 1024, 2048)
+FAMILIES = ('color', 'texture', 'composition')
+
+
+def feature_drift(image, sides=DEFAULT_SIDES):
+    """Relative drift of every feature at each working size against full resolution.
+
+    Returns ``{side: {'color_stats.r.mean': drift, ...}}`` where drift is
+    ``|value - full| / max(|full|, 1e-9)``.
+    """
+    full = ImageAnalyzer(image, max_side=None, resolutions={})
+    reference = flatten_features(full.analyze_all())
+
+    report = {}
+    for side in sides:
+        analyzer = ImageAnalyzer(image, max_side=None,
+                                 resolutions={family: side for family in FAMILIES})
+        values = flatten_features(analyzer.analyze_all())
+        report[side] = {
+            name: abs(float(values[name]) - float(ref)) / max(abs(float(ref)), 1e-9)
+            for name, ref in reference.items()
+            # Maps such as the composition edge grid are not compared
+            if not isinstance(ref, list)
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('images', nargs='+', help='Image files to analyze')
+    parser.add_argument('--sides', nargs='+', type=int, default=list(DEFAULT_SIDES),
+                        help='Working sizes (longest side in pixels) to compare')
+    args = parser.parse_args()
+
+    # Worst case over all images for each (side, feature)
+    worst = {}
+    for path in args.images:
+        with Image.open(path) as image:
+            report = feature_drift(image.convert('RGB'), args.sides)
+        for side, drifts in report.items():
+            for name, drift in drifts.items():
+                worst[side, name] = max(worst.get((side, name), 0.0), drift)
+
+    names = sorted({name for _, name in worst})
+    width = max(len(name) for name in names)
+    print(f"{'feature':<{width}}  " + "  ".join(f"{side:>8}" for side in args.sides))
+    for name in names:
+        cells = "  ".join(f"{worst[side, name]:>8.2%}" for side in args.sides)
+        print(f"{name:<{width}}  {cells}")
+    print(f"{'max':<{width}}  " + "  ".join(
+        f"{np.max([worst[side, name] for name in names]):>8.2%}" for side in args.sides
+    ))
+
+
+if __name__ == "__main__":
+    main()
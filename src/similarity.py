@@ -0,0 +1,183 @@
+"""Near-duplicate lookup for uploaded artworks.
+
+Each analyzed upload is reduced to a short vector of normalized color,
+texture and composition stats plus a 64-bit difference hash of the image,
+and stored with its result cache key. A new upload whose vector lies within
+SIMILARITY_THRESHOLD of a stored one can reuse that upload's interpretation
+and report instead of calling the LLM again.
+"""
+import os
+import threading
+
+import cv2
+import numpy as np
+
+from config import SIMILARITY_BACKEND, SIMILARITY_INDEX_DIR, SIMILARITY_THRESHOLD
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+# Bump when the vector layout or a feature's definition changes; older index
+# files are then ignored
+VECTOR_VERSION = 1
+HASH_SIZE = 8
+# A hash that differs in every bit adds this much distance
+HASH_WEIGHT = 0.5
+
+# (path into the features, scale to roughly [0, 1])
+_STAT_FIELDS = (
+    (('color_stats', 'r', 'mean'), 255.0),
+    (('color_stats', 'g', 'mean'), 255.0),
+    (('color_stats', 'b', 'mean'), 255.0),
+    (('color_stats', 'r', 'std'), 128.0),
+    (('color_stats', 'g', 'std'), 128.0),
+    (('color_stats', 'b', 'std'), 128.0),
+    (('texture_stats', 'homogeneity'), 1.0),
+    (('texture_stats', 'energy'), 1.0),
+    (('composition_stats', 'edge_density'), 1.0),
+    (('composition_stats', 'symmetry_score'), 255.0),
+)
+VECTOR_DIM = len(_STAT_FIELDS) + 1 + HASH_SIZE * HASH_SIZE
+
+
+def difference_hash(image, hash_size=HASH_SIZE):
+    """dHash bits of a BGR or grayscale image: is each pixel brighter than its left neighbour"""
+    # Shrinking before the gray conversion keeps this cheap on large images
+    small = cv2.resize(image, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    if small.ndim == 3:
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    return (small[:, 1:] > small[:, :-1]).ravel()
+
+
+def feature_vector(features, image=None):
+    """Float32 vector for ``analyze_all`` features, plus the image's dHash when given"""
+    vector = np.zeros(VECTOR_DIM, dtype=np.float32)
+    for i, (path, scale) in enumerate(_STAT_FIELDS):
+        value = features
+        for key in path:
+            value = value[key]
+        vector[i] = float(value) / scale
+
+    # GLCM contrast spans several orders of magnitude, so compare it in log space
+    vector[len(_STAT_FIELDS)] = np.log1p(float(features['texture_stats']['contrast'])) / np.log1p(255.0 ** 2)
+    if image is not None:
+        bits = difference_hash(image)
+        vector[len(_STAT_FIELDS) + 1:] = bits * (HASH_WEIGHT / np.sqrt(bits.size))
+    return vector
+
+
+class FeatureIndex:
+    """Append-only nearest-neighbour index from feature vectors to cache keys.
+
+    Vectors live in a flat float32 memmap under ``index_dir`` (in memory when
+    unset) with their keys in a text file alongside. Search is exact by
+    default; ``backend='hnsw'`` builds an approximate hnswlib graph over the
+    same vectors when hnswlib is installed.
+    """
+
+    def __init__(self, index_dir=None, backend='flat', dim=VECTOR_DIM, capacity=1024):
+        self.index_dir = index_dir
+        self.dim = dim
+        self.keys = []
+        self._lock = threading.Lock()
+        self._hnsw = None
+
+        if index_dir:
+            os.makedirs(index_dir, exist_ok=True)
+            self._vectors_path = os.path.join(index_dir, f"vectors-v{VECTOR_VERSION}.f32")
+            self._keys_path = os.path.join(index_dir, f"keys-v{VECTOR_VERSION}.txt")
+            if os.path.exists(self._keys_path):
+                with open(self._keys_path) as f:
+                    self.keys = [line.strip() for line in f if line.strip()]
+            # Rows past the last key are spare capacity (or a vector whose key
+            # write never happened) and are ignored
+            stored = os.path.getsize(self._vectors_path) // (4 * dim) if os.path.exists(self._vectors_path) else 0
+            self._vectors = self._open(max(capacity, stored, len(self.keys)))
+        else:
+            self._vectors = np.zeros((capacity, dim), dtype=np.float32)
+
+        if backend == 'hnsw' and hnswlib is not None:
+            self._hnsw = hnswlib.Index(space='l2', dim=dim)
+            self._hnsw.init_index(max_elements=len(self._vectors), ef_construction=200, M=16)
+            if self.keys:
+                self._hnsw.add_items(self._vectors[:len(self.keys)], np.arange(len(self.keys)))
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _open(self, capacity):
+        mode = 'r+' if os.path.exists(self._vectors_path) else 'w+'
+        if mode == 'r+' and os.path.getsize(self._vectors_path) < capacity * self.dim * 4:
+            with open(self._vectors_path, 'r+b') as f:
+                f.truncate(capacity * self.dim * 4)
+        return np.memmap(self._vectors_path, dtype=np.float32, mode=mode, shape=(capacity, self.dim))
+
+    def _grow(self):
+        capacity = 2 * len(self._vectors)
+        if self.index_dir:
+            self._vectors.flush()
+            self._vectors = self._open(capacity)
+        else:
+            self._vectors = np.concatenate([self._vectors, np.zeros_like(self._vectors)])
+        if self._hnsw is not None:
+            self._hnsw.resize_index(capacity)
+
+    def add(self, vector, key):
+        with self._lock:
+            if len(self.keys) == len(self._vectors):
+                self._grow()
+            row = len(self.keys)
+            self._vectors[row] = vector
+            if self.index_dir:
+                self._vectors.flush()
+                with open(self._keys_path, 'a') as f:
+                    f.write(key + '\n')
+            if self._hnsw is not None:
+                self._hnsw.add_items(np.asarray(vector, dtype=np.float32)[None], [row])
+            self.keys.append(key)
+
+    def search(self, vector, k=1):
+        """Up to ``k`` (key, distance) pairs, nearest first"""
+        with self._lock:
+            count = len(self.keys)
+            if count == 0:
+                return []
+            k = min(k, count)
+            if self._hnsw is not None:
+                rows, squared = self._hnsw.knn_query(np.asarray(vector, dtype=np.float32), k=k)
+                rows, squared = rows[0], squared[0]
+            else:
+                squared = np.sum((self._vectors[:count] - vector) ** 2, axis=1)
+                rows = np.argpartition(squared, k - 1)[:k]
+                rows = rows[np.argsort(squared[rows])]
+                squared = squared[rows]
+            return [(self.keys[row], float(np.sqrt(max(d, 0.0)))) for row, d in zip(rows, squared)]
+
+    def nearest(self, vector, threshold=SIMILARITY_THRESHOLD, exclude=None):
+        """(key, distance) of the closest stored vector within ``threshold``, or None.
+
+        ``exclude`` skips entries for the given key, e.g. the upload's own.
+        The key can have been added more than once, so the search asks for
+        one more hit than it has entries.
+        """
+        k = 1 + (self.keys.count(exclude) if exclude is not None else 0)
+        for key, distance in self.search(vector, k=k):
+            if key != exclude and distance <= threshold:
+                return key, distance
+        return None
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_similarity_index():
+    """Process-wide FeatureIndex, created on first use"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = FeatureIndex(SIMILARITY_INDEX_DIR, SIMILARITY_BACKEND)
+    return _index
@@ -0,0 +1,356 @@
+"""Parse the interpreter's JSON reply into prose, emotion scores and key points.
+
+The model is asked for one JSON object (see ``INTERPRETATION_FORMAT`` in
+src/prompts.py) with the prose first, so it can be shown while the scores
+are still being generated. Replies that are not valid JSON are repaired
+where possible; otherwise the whole reply is kept as prose with no scores.
+In combined mode (``COMBINED_FORMAT``) the reply is instead split at marker
+lines into the interpretation, the same scores as JSON, and the report.
+"""
+import json
+import re
+
+EMOTIONS = ('joy', 'calm', 'energy', 'tension', 'expression')
+KEY_POINT_SECTIONS = ('emotional_state', 'cognitive_patterns', 'behavioral_insights')
+MAX_KEY_POINTS = 5
+
+_FIELD = re.compile(r'"interpretation"\s*:\s*"')
+_FENCE = re.compile(r'^\s*```(?:json)?\s*|\s*```\s*$')
+_TRAILING_COMMA = re.compile(r',\s*([}\]])')
+
+
+def _score(value):
+    try:
+        score = float(value)
+    except (TypeError, ValueError):
+        return None
+    if score != score:
+        return None
+    # Models sometimes answer on a 0-10 or 0-100 scale despite the prompt
+    if score > 10:
+        score /= 100
+    elif score > 1:
+        score /= 10
+    return min(max(score, 0.0), 1.0)
+
+
+def _emotions(value):
+    """All five scores in [0, 1], or None when any is missing or not a number"""
+    if not isinstance(value, dict):
+        return None
+    lowered = {str(key).lower(): item for key, item in value.items()}
+    scores = {name: _score(lowered.get(name)) for name in EMOTIONS}
+    return None if None in scores.values() else scores
+
+
+def _key_points(value):
+    value = value if isinstance(value, dict) else {}
+    lowered = {str(key).lower().replace(' ', '_'): item for key, item in value.items()}
+    points = {}
+    for section in KEY_POINT_SECTIONS:
+        items = lowered.get(section)
+        items = items if isinstance(items, list) else []
+        points[section] = [str(item).strip() for item in items if str(item).strip()][:MAX_KEY_POINTS]
+    return points
+
+
+def repair_json(text):
+    """Best-effort fix of common model JSON faults: code fences, leading prose,
+    trailing commas and replies cut off at max_tokens"""
+    text = _FENCE.sub('', text)
+    start = text.find('{')
+    if start < 0:
+        return None
+    text = text[start:]
+
+    # Drop anything after the top-level object, or close whatever is still
+    # open when the reply stops mid-object
+    stack = []
+    in_string = escaped = False
+    for i, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in '{[':
+            stack.append('}' if char == '{' else ']')
+        elif char in '}]' and stack:
+            stack.pop()
+            if not stack:
+                return _TRAILING_COMMA.sub(r'\1', text[:i + 1])
+    if escaped:
+        text = text[:-1]
+    if in_string:
+        text += '"'
+    text = re.sub(r',\s*"[^"]*"\s*:?\s*$|[,:]\s*$', '', text.rstrip())
+    text += ''.join(reversed(stack))
+    return _TRAILING_COMMA.sub(r'\1', text)
+
+
+def _load(text):
+    try:
+        return json.loads(text, strict=False)
+    except ValueError:
+        pass
+    repaired = repair_json(text)
+    if repaired is None:
+        return None
+    try:
+        return json.loads(repaired, strict=False)
+    except ValueError:
+        return None
+
+
+def parse_interpretation(text):
+    """{'interpretation', 'emotions', 'key_points', 'structured'} from a model reply.
+
+    ``structured`` is False when the reply could not be read as the requested
+    JSON object and its text is used as the interpretation as-is.
+    """
+    data = _load(text) if '{' in text else None
+    if not isinstance(data, dict) or not isinstance(data.get('interpretation'), str):
+        prose = text
+        match = _FIELD.search(text)
+        if data is None and match:
+            # Unrepairable JSON: keep whatever prose made it through
+            prose = FieldExtractor().feed('{' + text[match.start():]) or text
+        return {
+            'interpretation': prose.strip(),
+            'emotions': None,
+            'key_points': _key_points(None),
+            'structured': False
+        }
+    return {
+        'interpretation': data['interpretation'].strip(),
+        'emotions': _emotions(data.get('emotions')),
+        'key_points': _key_points(data.get('key_points')),
+        'structured': True
+    }
+
+
+def insights_from(parsed):
+    """The chart and key point values of a parsed interpretation, as stored with results"""
+    return {'emotions': parsed['emotions'], 'key_points': parsed['key_points']}
+
+
+class FieldExtractor:
+    """Incrementally decode the "interpretation" string from a partial JSON reply.
+
+    ``feed`` returns the newly available prose for each chunk. A reply that
+    does not start as JSON is passed through unchanged.
+    """
+
+    def __init__(self):
+        self.state = 'seek'
+        self.buffer = ''
+
+    def feed(self, chunk):
+        if self.state == 'done':
+            return ''
+        if self.state == 'plain':
+            return chunk
+
+        self.buffer += chunk
+        if self.state == 'seek':
+            head = self.buffer.lstrip()
+            if head and head[0] not in '{`':
+                self.state = 'plain'
+                text, self.buffer = self.buffer, ''
+                return text
+            match = _FIELD.search(self.buffer)
+            if match is None:
+                return ''
+            self.state = 'string'
+            self.buffer = self.buffer[match.end():]
+
+        # Decode up to the closing quote, holding back a split escape sequence
+        buffer, i, end = self.buffer, 0, False
+        while i < len(buffer):
+            char = buffer[i]
+            if char == '"':
+                end = True
+                break
+            if char != '\\':
+                i += 1
+                continue
+            if i + 1 >= len(buffer):
+                break
+            if buffer[i + 1] != 'u':
+                i += 2
+                continue
+            if i + 6 > len(buffer):
+                break
+            # A high surrogate needs its low half before it can be decoded
+            if buffer[i + 2:i + 4].lower() in ('d8', 'd9', 'da', 'db'):
+                if i + 12 > len(buffer):
+                    break
+                i += 12
+            else:
+                i += 6
+
+        segment, self.buffer = buffer[:i], buffer[i + 1 if end else i:]
+        if end:
+            self.state = 'done'
+        if not segment:
+            return ''
+        try:
+            return json.loads(f'"{segment}"', strict=False)
+        except ValueError:
+            # An invalid escape: show the raw text rather than failing the stream
+            return segment
+
+
+class InterpretationStream:
+    """Iterate the prose of a streamed reply, then call ``result`` for the parsed whole"""
+
+    def __init__(self, chunks):
+        self._chunks = chunks
+        self._raw = []
+        self._iterator = self._prose()
+
+    def _prose(self):
+        extractor = FieldExtractor()
+        for chunk in self._chunks:
+            self._raw.append(chunk)
+            text = extractor.feed(chunk)
+            if text:
+                yield text
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._iterator)
+
+    def close(self):
+        self._iterator.close()
+        if hasattr(self._chunks, 'close'):
+            self._chunks.close()
+
+    def result(self):
+        return parse_interpretation(''.join(self._raw))
+
+
+# Marker lines of the combined interpretation + report reply (COMBINED_FORMAT)
+COMBINED_SECTIONS = ('interpretation', 'insights', 'report')
+_MARKER = re.compile(r'^[ \t]*={3}[ \t]*(INTERPRETATION|INSIGHTS|REPORT)[ \t]*={3}[ \t]*$', re.MULTILINE)
+
+
+def split_combined(text):
+    """{section: text} of a combined reply; text before any marker counts as interpretation"""
+    parts = {name: '' for name in COMBINED_SECTIONS}
+    name, start = 'interpretation', 0
+    for match in _MARKER.finditer(text):
+        parts[name] += text[start:match.start()]
+        name, start = match.group(1).lower(), match.end()
+    parts[name] += text[start:]
+    return {key: value.strip() for key, value in parts.items()}
+
+
+def parse_combined(text):
+    """{'interpretation', 'report', 'emotions', 'key_points', 'structured'} from a combined reply.
+
+    ``structured`` is False when the insights part is missing or unreadable;
+    ``report`` is empty when the reply stopped before the report marker.
+    """
+    parts = split_combined(text)
+    data = _load(parts['insights']) if '{' in parts['insights'] else None
+    data = data if isinstance(data, dict) else None
+    return {
+        'interpretation': parts['interpretation'],
+        'report': parts['report'],
+        'emotions': _emotions(data.get('emotions')) if data else None,
+        'key_points': _key_points(data.get('key_points') if data else None),
+        'structured': data is not None
+    }
+
+
+class CombinedStream:
+    """Split a streamed combined reply into its sections as it arrives.
+
+    ``section(name)`` yields that section's text; sections come in reply
+    order, so iterating 'report' first consumes (and buffers) everything
+    before it. ``result`` returns ``parse_combined`` of the whole reply.
+    """
+
+    # Longest marker line, held back while a partial one may be arriving
+    _HOLD = len('===INTERPRETATION===') + 4
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._source = chunks
+        self._raw = []
+        self._pending = ''
+        self._current = 'interpretation'
+        self._queues = {name: [] for name in COMBINED_SECTIONS}
+        self._finished = False
+
+    def _emit(self, text):
+        if text:
+            self._queues[self._current].append(text)
+
+    def _pump(self):
+        """Read one chunk into the section queues; False once the reply is done"""
+        if self._finished:
+            return False
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            self._finished = True
+            self._emit(self._pending)
+            self._pending = ''
+            return False
+        self._raw.append(chunk)
+        self._pending += chunk
+        while True:
+            match = _MARKER.search(self._pending)
+            if match is None:
+                break
+            self._emit(self._pending[:match.start()])
+            self._current = match.group(1).lower()
+            self._pending = self._pending[match.end():].lstrip('\r\n')
+        # Hold back a last line that may be the start of a marker line
+        line_start = self._pending.rfind('\n') + 1
+        tail = self._pending[line_start:]
+        if tail.strip() and (tail.strip()[0] != '=' or len(tail) > self._HOLD):
+            line_start = len(self._pending)
+        self._emit(self._pending[:line_start])
+        self._pending = self._pending[line_start:]
+        return True
+
+    def section(self, name):
+        """Generator of one section's text, reading the stream as far as needed"""
+        order = COMBINED_SECTIONS.index(name)
+        queue = self._queues[name]
+        while True:
+            while queue:
+                yield queue.pop(0)
+            if COMBINED_SECTIONS.index(self._current) > order and not queue:
+                return
+            if not self._pump() and not queue:
+                return
+
+    def text(self, name):
+        """One section's full text, reading the stream as far as needed"""
+        return ''.join(self.section(name)).strip()
+
+    def interpretation_result(self):
+        """``parse_combined`` without 'report', reading no further than the report marker"""
+        for _ in self.section('insights'):
+            pass
+        parsed = parse_combined(''.join(self._raw))
+        del parsed['report']
+        return parsed
+
+    def close(self):
+        if hasattr(self._source, 'close'):
+            self._source.close()
+
+    def result(self):
+        while self._pump():
+            pass
+        return parse_combined(''.join(self._raw))
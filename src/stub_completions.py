@@ -0,0 +1,103 @@
+"""Canned chat completions for offline runs.
+
+Shared by the in-process stub backend (src/llm_backends.py) and the stub HTTP
+server in benchmarks/. The reply is picked from the request the way the real
+model's output would be shaped: the combined marked-up reply, the JSON
+interpretation, or a plain report.
+"""
+import json
+
+CANNED_COMPLETION = """1. Executive Summary
+The artwork shows a balanced palette with warm accents and steady, confident strokes.
+
+2. Detailed Analysis
+The color choices suggest openness and curiosity. Texture is varied but controlled, and the composition is organized around a clear focal area.
+
+3. Strengths and Resources
+Sustained engagement with the work and deliberate choices point to good focus and self-direction.
+
+4. Areas for Growth
+Some dense regions may reflect moments of pressure worth exploring gently.
+
+5. Recommendations
+Keep a regular creative practice and reflect on which colors feel most comfortable.
+
+6. Professional Notes
+This automated interpretation is for self-reflection only and is not a clinical assessment."""
+
+
+# Interpretation prose of typical length and layout for the analysis prompt
+SAMPLE_INTERPRETATION = """**1. Emotional State Analysis**
+- Primary emotional themes: The warm red and yellow accents against softer blues suggest an underlying optimism. There is a wish for connection, balanced by a need for calm and personal space.
+- Emotional regulation indicators: Color intensity stays within a moderate range across the canvas, which points to feelings that are present but held with care. Sudden shifts are rare.
+- Potential stress markers: A few dense, high-contrast regions in the lower half may reflect moments of pressure or unresolved tension that the artist returned to several times.
+
+**2. Cognitive Processing**
+- Organization and structure: The composition is built around a clear focal area with supporting elements arranged around it. This suggests an organized approach and an ability to prioritize.
+- Decision-making patterns: Deliberate, repeated color choices indicate careful decisions rather than impulsive ones. Some areas were reworked, showing reflection and adjustment.
+- Problem-solving approaches: Transitions between regions are handled smoothly, which can reflect flexible thinking when balancing competing demands.
+
+**3. Behavioral Indicators**
+- Energy levels: Moderate edge density and varied stroke direction suggest steady, sustained energy rather than bursts of activity followed by fatigue.
+- Activity patterns: The even coverage of the canvas points to consistent engagement with the task from start to finish.
+- Social engagement indicators: Open space around the focal area may suggest comfort with others while keeping healthy boundaries.
+
+**4. Coping Mechanisms**
+- Observed strengths: Sustained focus, thoughtful color use and a willingness to revisit difficult areas are all signs of resourcefulness.
+- Support system indicators: The grounding presence of calm tones near the edges can be read as a sense of having stable supports to rely on.
+- Resilience markers: Tension is contained and balanced by lighter regions, suggesting an ability to recover after stress.
+
+**5. Areas for Attention**
+- Potential stress points: The dense lower regions are worth exploring gently, for example by asking what was happening while those areas were made.
+- Growth opportunities: Experimenting with freer strokes or new colors could support emotional expression and playfulness.
+- Resource needs: Regular creative time, and a conversation with a trusted person or art therapist, could help turn these insights into steps forward.
+
+These observations are tentative and meant to support self-reflection, not to diagnose."""
+
+# Returned to interpretation requests, which ask for a JSON object
+CANNED_INTERPRETATION = json.dumps({
+    'interpretation': SAMPLE_INTERPRETATION,
+    'emotions': {'joy': 0.7, 'calm': 0.6, 'energy': 0.5, 'tension': 0.3, 'expression': 0.8},
+    'key_points': {
+        'emotional_state': ['Warm, open emotional tone', 'Moments of pressure in dense areas'],
+        'cognitive_patterns': ['Organized around a clear focal area', 'Deliberate color choices'],
+        'behavioral_insights': ['Sustained engagement with the work', 'Steady, confident strokes']
+    }
+}, indent=2)
+
+# Returned to combined-mode requests: interpretation, scores and report in one reply
+CANNED_COMBINED = "\n".join([
+    "===INTERPRETATION===",
+    SAMPLE_INTERPRETATION,
+    "===INSIGHTS===",
+    json.dumps({key: value for key, value in json.loads(CANNED_INTERPRETATION).items() if key != 'interpretation'}),
+    "===REPORT===",
+    CANNED_COMPLETION
+])
+
+
+def prompt_text(request):
+    return ' '.join(str(message.get('content', '')) for message in request.get('messages', []))
+
+
+def wants_combined(request):
+    return '===REPORT===' in prompt_text(request)
+
+
+def wants_json(request):
+    if (request.get('response_format') or {}).get('type') == 'json_object':
+        return True
+    return '"interpretation"' in prompt_text(request)
+
+
+def approximate_tokens(text):
+    return max(1, round(len(text.split()) * 1.3))
+
+
+def completion_for(request):
+    """Canned reply text for a chat completion request"""
+    if wants_combined(request):
+        return CANNED_COMBINED
+    if wants_json(request):
+        return CANNED_INTERPRETATION
+    return CANNED_COMPLETION
@@ -0,0 +1,264 @@
+"""Thread-parallel tiled feature extraction for very large scans.
+
+``TiledAnalyzer`` is an ``ImageAnalyzer`` that splits each working image
+into tiles and runs the OpenCV and NumPy work on them in a thread pool;
+OpenCV releases the GIL, so the tiles spread over every core. Per-tile
+partial results merge exactly into the whole-image features:
+
+- colors: per-channel histograms are summed, then mean, std and dominant
+  value follow from the merged histogram as before
+- texture: GLCM pair counts are summed per offset; each tile counts the
+  pairs that start inside it, reading the partner pixel across its edge
+- composition: edge counts, thirds-weight sums and per-cell edge counts are
+  summed. Canny runs on each tile plus ``overlap`` pixels of halo, so edges
+  match the whole-image pass except where hysteresis follows a weak edge
+  further than the halo. Symmetry compares mirrored halves across the image
+  and runs as one more task on the shared grayscale image.
+
+Texture properties and edge density of every tile are kept in
+``tile_maps`` for heatmaps. Run ``python -m src.tiled_analysis IMAGE`` to
+compare against the whole-image analysis and time both.
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from config import ANALYSIS_TILE_OVERLAP, ANALYSIS_TILE_SIZE, ANALYSIS_TILE_WORKERS
+from src.composition import (
+    CompositionAnalyzer,
+    cell_bounds,
+    symmetry,
+    thirds_profiles,
+    thirds_ratio,
+    thirds_sums
+)
+from src.image_analysis import ImageAnalyzer, channel_stats, flatten_features
+from src.palette import PaletteAnalyzer
+from src.texture import PROPERTIES, GLCMTexture, texture_stats
+from src.tracing import set_attributes, traced
+
+MAP_NAMES = PROPERTIES + ('edge_density',)
+
+
+def tile_grid(height, width, tile_size=ANALYSIS_TILE_SIZE):
+    """Row and column boundaries of near-equal tiles at most ``tile_size`` a side"""
+    return (cell_bounds(height, max(1, -(-height // tile_size))),
+            cell_bounds(width, max(1, -(-width // tile_size))))
+
+
+def tile_regions(height, width, tile_size=ANALYSIS_TILE_SIZE):
+    """(top, bottom, left, right) of every tile, row by row"""
+    row_bounds, col_bounds = tile_grid(height, width, tile_size)
+    return [(int(top), int(bottom), int(left), int(right))
+            for top, bottom in zip(row_bounds[:-1], row_bounds[1:])
+            for left, right in zip(col_bounds[:-1], col_bounds[1:])]
+
+
+def _color_tile(image, region):
+    top, bottom, left, right = region
+    tile = image[top:bottom, left:right]
+    return np.stack([
+        cv2.calcHist([tile], [channel], None, [256], [0, 256]).ravel()
+        for channel in range(image.shape[2])
+    ]).astype(np.float64)
+
+
+def _texture_tile(engine, gray, region):
+    return np.stack([engine.region_counts(gray, region, distance, angle)
+                     for distance, angle in engine.offsets])
+
+
+def _edge_tile(composition, gray, region, overlap, profiles, grid_bounds):
+    """Edge count, thirds-weight sum and per-grid-cell edge counts of one tile"""
+    height, width = gray.shape
+    top, bottom, left, right = region
+    outer_top, outer_left = max(0, top - overlap), max(0, left - overlap)
+    outer = gray[outer_top:min(height, bottom + overlap), outer_left:min(width, right + overlap)]
+    edges = composition.edges(outer)[top - outer_top:bottom - outer_top,
+                                     left - outer_left:right - outer_left]
+
+    row_weights, col_weights = profiles
+    weighted, count = thirds_sums(edges, row_weights[top:bottom], col_weights[left:right])
+
+    # Edge pixels of the tile in each composition grid cell it overlaps
+    row_bounds, col_bounds = grid_bounds
+    cells = np.zeros((len(row_bounds) - 1, len(col_bounds) - 1), np.int64)
+    for i, (cell_top, cell_bottom) in enumerate(zip(row_bounds[:-1], row_bounds[1:])):
+        rows = slice(max(cell_top, top) - top, min(cell_bottom, bottom) - top)
+        if rows.start >= rows.stop:
+            continue
+        for j, (cell_left, cell_right) in enumerate(zip(col_bounds[:-1], col_bounds[1:])):
+            cols = slice(max(cell_left, left) - left, min(cell_right, right) - left)
+            if cols.start < cols.stop:
+                cells[i, j] = np.count_nonzero(edges[rows, cols])
+    return count, weighted, cells
+
+
+class TiledAnalyzer(ImageAnalyzer):
+    """ImageAnalyzer that computes each feature family from tiles in a thread pool.
+
+    Features have the same keys and values as ``ImageAnalyzer``; per-tile
+    maps of texture properties and edge density are left in ``tile_maps``
+    as 2-D arrays, one value per tile.
+    """
+
+    tile_size = ANALYSIS_TILE_SIZE
+    overlap = ANALYSIS_TILE_OVERLAP
+    workers = ANALYSIS_TILE_WORKERS
+
+    def _set_image(self, image, resolutions, palette):
+        super()._set_image(image, resolutions, palette)
+        self.tile_maps = {}
+
+    def _map(self, fn, *iterables):
+        with ThreadPoolExecutor(max_workers=self.workers or os.cpu_count()) as pool:
+            # Results come back in tile order and are merged as they arrive
+            yield from pool.map(fn, *iterables)
+
+    def _grid_map(self, values, shape):
+        rows, cols = tile_grid(*shape, self.tile_size)
+        return np.asarray(values, np.float64).reshape(len(rows) - 1, len(cols) - 1)
+
+    @traced('image_analysis.colors')
+    def analyze_colors(self):
+        """Color features from the per-tile channel histograms.
+
+        The palette already works from a fixed-size pixel sample, so it is
+        computed on the whole image.
+        """
+        image = self._working_image('color')
+        regions = tile_regions(*image.shape[:2], self.tile_size)
+        set_attributes(tiles=len(regions))
+        hists = sum(self._map(lambda region: _color_tile(image, region), regions))
+        color_stats = {col: channel_stats(hist) for col, hist in zip(('b', 'g', 'r'), hists)}
+        color_stats['palette'] = PaletteAnalyzer(dominant=self.palette).analyze(image)
+        return color_stats
+
+    @traced('image_analysis.texture')
+    def analyze_texture(self):
+        """Texture features from per-tile GLCM counts"""
+        gray = self._working_gray('texture')
+        engine = GLCMTexture()
+        regions = tile_regions(*gray.shape, self.tile_size)
+        set_attributes(tiles=len(regions))
+
+        totals = 0
+        tile_values = {name: [] for name in PROPERTIES}
+        for counts in self._map(lambda region: _texture_tile(engine, gray, region), regions):
+            totals = totals + counts
+            # Properties of the stacked per-offset counts, averaged over offsets
+            for name, values in engine.properties_from_counts(counts).items():
+                tile_values[name].append(values.mean())
+
+        for name, values in tile_values.items():
+            self.tile_maps[name] = self._grid_map(values, gray.shape)
+        return texture_stats({
+            offset: engine.properties_from_counts(counts)
+            for offset, counts in zip(engine.offsets, totals)
+        })
+
+    @traced('image_analysis.composition')
+    def analyze_composition(self):
+        """Composition features from per-tile edges, with symmetry on the whole image"""
+        gray = self._working_gray('composition')
+        composition = CompositionAnalyzer()
+        height, width = gray.shape
+        regions = tile_regions(height, width, self.tile_size)
+        set_attributes(tiles=len(regions))
+        profiles = thirds_profiles(height, width, composition.thirds_sigma)
+        grid_bounds = (cell_bounds(height, composition.grid[0]), cell_bounds(width, composition.grid[1]))
+
+        with ThreadPoolExecutor(max_workers=1) as side:
+            # Mirrors span the whole image, so symmetry overlaps the tiles as one task
+            mirror = side.submit(symmetry, gray)
+            edge_count, weighted, cells = 0, 0.0, 0
+            densities = []
+            for (top, bottom, left, right), (count, tile_weighted, tile_cells) in zip(regions, self._map(
+                    lambda region: _edge_tile(composition, gray, region, self.overlap, profiles, grid_bounds),
+                    regions)):
+                edge_count += count
+                weighted += tile_weighted
+                cells = cells + tile_cells
+                densities.append(count / ((bottom - top) * (right - left)))
+            mirror = mirror.result()
+
+        self.tile_maps['edge_density'] = self._grid_map(densities, gray.shape)
+        areas = np.outer(np.diff(grid_bounds[0]), np.diff(grid_bounds[1]))
+        return {
+            'edge_density': edge_count / gray.size,
+            'symmetry_score': mirror['left_right'],
+            'symmetry_top_bottom': mirror['top_bottom'],
+            'symmetry_diagonal': mirror['diagonal'],
+            'symmetry_anti_diagonal': mirror['anti_diagonal'],
+            'thirds_weight': thirds_ratio(weighted, edge_count, *profiles),
+            'edge_grid': np.divide(cells, areas, out=np.zeros(cells.shape), where=areas > 0).tolist()
+        }
+
+
+def heatmap(values, size):
+    """Color-mapped BGR image of a tile map, stretched to ``size`` (width, height)"""
+    low, high = float(np.min(values)), float(np.max(values))
+    scaled = (values - low) / (high - low) if high > low else np.zeros_like(values)
+    image = cv2.resize((scaled * 255).astype(np.uint8), size, interpolation=cv2.INTER_NEAREST)
+    return cv2.applyColorMap(image, cv2.COLORMAP_VIRIDIS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('image')
+    parser.add_argument('--tile-size', type=int, default=ANALYSIS_TILE_SIZE)
+    parser.add_argument('--workers', type=int, default=ANALYSIS_TILE_WORKERS,
+                        help='Threads (default: number of cores)')
+    parser.add_argument('--max-side', type=int, default=None,
+                        help='Downscale to this longest side first (default: full resolution)')
+    parser.add_argument('--heatmaps', help='Write a PNG heatmap of each tile map to this directory')
+    parser.add_argument('--no-compare', action='store_true', help='Skip the whole-image analysis')
+    args = parser.parse_args()
+
+    image = cv2.imread(args.image, cv2.IMREAD_COLOR)
+    if image is None:
+        parser.error(f"could not read {args.image}")
+    resolutions = {}
+
+    tiled = TiledAnalyzer.from_bgr(image, max_side=args.max_side, resolutions=resolutions)
+    tiled.tile_size = args.tile_size
+    tiled.workers = args.workers
+    start = time.perf_counter()
+    features = flatten_features(tiled.analyze_all())
+    tiled_time = time.perf_counter() - start
+    height, width = tiled.image.shape[:2]
+    size = (width, height)
+    print(f"{width}x{height}, {len(tile_regions(height, width, args.tile_size))} tiles of "
+          f"{args.tile_size} px: tiled {tiled_time * 1000:.0f} ms")
+
+    if not args.no_compare:
+        start = time.perf_counter()
+        reference = flatten_features(
+            ImageAnalyzer.from_bgr(image, max_side=args.max_side, resolutions=resolutions).analyze_all()
+        )
+        whole_time = time.perf_counter() - start
+        print(f"whole image {whole_time * 1000:.0f} ms ({whole_time / tiled_time:.1f}x)")
+        name_width = max(len(name) for name in reference)
+        print(f"{'feature':<{name_width}}  {'value':>12}  relative difference")
+        for name, ref in reference.items():
+            if name == 'color_stats.palette.colors':
+                # Same sample on both paths; the palette's scalars are compared
+                continue
+            ref, value = np.asarray(ref, np.float64), np.asarray(features[name], np.float64)
+            difference = np.max(np.abs(value - ref) / np.maximum(np.abs(ref), 1e-12))
+            print(f"{name:<{name_width}}  {float(np.max(value)):>12.6g}  {difference:.2e}")
+
+    if args.heatmaps:
+        os.makedirs(args.heatmaps, exist_ok=True)
+        for name in MAP_NAMES:
+            path = os.path.join(args.heatmaps, f"{name}.png")
+            cv2.imwrite(path, heatmap(tiled.tile_maps[name], size))
+            print(f"wrote {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Token counting, interpretation compaction and completion budgets.
+
+Counts use tiktoken's cl100k_base encoding when tiktoken is installed; it is
+not the Llama tokenizer, but is close enough for budgeting. Otherwise a
+word-piece heuristic is used. Either way counts are estimates; the usage
+reported by the API remains the source of truth and is what the traces log.
+
+tiktoken downloads the encoding on first use into ``TIKTOKEN_CACHE_DIR``
+(a temp directory by default). The app loads it from its warm-up thread;
+offline deployments can point TIKTOKEN_CACHE_DIR at a pre-filled directory.
+"""
+import re
+
+from config import LLM_CONTEXT_TOKENS, LLM_MIN_COMPLETION_TOKENS, REPORT_INTERPRETATION_TOKENS
+from src.tracing import set_attributes
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Per-message overhead of the chat template (role markers and separators)
+MESSAGE_OVERHEAD = 4
+# Head room left in the context window for counting error
+CONTEXT_MARGIN = 64
+# Roughly one BPE token per word piece of up to 6 characters or symbol
+_PIECES = re.compile(r'\w{1,6}|[^\w\s]')
+_HEADING = re.compile(r'^(#{1,6}\s+\S|\*\*[^*]+\*\*:?$|\d+[.)]\s+\S|[A-Z][^.!?]{0,60}:$)')
+_BULLET = re.compile(r'^\s*([-*•]|[a-z][.)]|\d+[.)])\s+')
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+_encoding = None
+
+
+def load_encoding():
+    """The tiktoken encoding, or None without tiktoken or when it cannot be fetched"""
+    global _encoding
+    if _encoding is None and tiktoken is not None:
+        try:
+            _encoding = tiktoken.get_encoding('cl100k_base')
+        except Exception:
+            # The encoding file is fetched on first use and may be unavailable offline
+            _encoding = False
+    return _encoding or None
+
+
+def count_tokens(text):
+    """Estimated token count of ``text``"""
+    if not text:
+        return 0
+    encoding = load_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return len(_PIECES.findall(text))
+
+
+def count_message_tokens(messages):
+    """Estimated prompt tokens of a chat ``messages`` list"""
+    return sum(count_tokens(message['content']) + MESSAGE_OVERHEAD for message in messages) + 2
+
+
+def completion_budget(messages, cap, context=LLM_CONTEXT_TOKENS, floor=LLM_MIN_COMPLETION_TOKENS):
+    """``max_tokens`` for a call: up to ``cap``, within what the context window has left"""
+    available = context - count_message_tokens(messages) - CONTEXT_MARGIN
+    return max(floor, min(cap, available))
+
+
+def record_budget(request):
+    """Note a request's estimated prompt size and completion budget on the current span"""
+    set_attributes(
+        estimated_prompt_tokens=count_message_tokens(request['messages']),
+        max_tokens=request.get('max_tokens')
+    )
+
+
+def _first_sentence(text):
+    return _SENTENCE_END.split(text.strip(), 1)[0]
+
+
+def _is_heading(line):
+    line = line.strip()
+    return bool(_HEADING.match(line)) and len(line) < 80 and not line.endswith('.')
+
+
+def _sections(text):
+    """[(heading or None, [content lines])] split at Markdown or numbered headings"""
+    sections = [(None, [])]
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        if _is_heading(line):
+            sections.append((line.strip().strip('#*: ').strip(), []))
+        else:
+            sections[-1][1].append(line.strip())
+    return [(heading, lines) for heading, lines in sections if heading or lines]
+
+
+def compress_interpretation(text, budget=REPORT_INTERPRETATION_TOKENS):
+    """Shorten an interpretation to about ``budget`` tokens for the report prompt.
+
+    Keeps every section heading and the first sentence of each point or
+    paragraph; if that is still too long, later points of each section are
+    dropped in turn so every section stays represented.
+    """
+    if count_tokens(text) <= budget:
+        return text
+
+    sections = []
+    for heading, lines in _sections(text):
+        points = []
+        for line in lines:
+            marker = '- ' if _BULLET.match(line) else ''
+            sentence = _first_sentence(_BULLET.sub('', line))
+            if sentence:
+                points.append(marker + sentence)
+        sections.append((heading, points))
+
+    def render():
+        blocks = []
+        for heading, points in sections:
+            blocks.append('\n'.join(([heading] if heading else []) + points))
+        return '\n\n'.join(block for block in blocks if block)
+
+    compact = render()
+    while count_tokens(compact) > budget:
+        # Trim the section with the most points, keeping at least one each
+        longest = max(range(len(sections)), key=lambda i: len(sections[i][1]))
+        if len(sections[longest][1]) <= 1:
+            break
+        sections[longest][1].pop()
+        compact = render()
+
+    if count_tokens(compact) > budget:
+        # Still over budget with one point per section: cut at a word boundary
+        words = compact.split(' ')
+        while len(words) > 1 and count_tokens(' '.join(words)) > budget:
+            words = words[:int(len(words) * 0.9)]
+        compact = ' '.join(words)
+    return compact
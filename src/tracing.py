@@ -0,0 +1,283 @@
+"""Lightweight per-request tracing.
+
+A trace is a tree of timed spans. Open one per request with ``trace``, then
+mark stages with the ``span`` context manager or the ``traced`` decorator;
+spans opened outside a trace form a trace of their own. Finished traces are
+appended to TRACE_LOG_PATH as JSON lines and aggregated into Prometheus text
+metrics served on TRACE_METRICS_PORT.
+"""
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config import TRACE_LOG_PATH, TRACE_METRICS_PORT
+
+# Upper bounds (seconds) of the stage duration histogram buckets
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+logger = logging.getLogger(__name__)
+
+_current_trace = contextvars.ContextVar('current_trace', default=None)
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+
+class Span:
+    def __init__(self, name, parent=None, attributes=None):
+        self.id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.parent = parent
+        self.attributes = dict(attributes or {})
+        self.start = time.time()
+        self._start_counter = time.perf_counter()
+        self.duration = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def finish(self):
+        self.duration = time.perf_counter() - self._start_counter
+
+    def to_dict(self, trace_start):
+        return {
+            'name': self.name,
+            'id': self.id,
+            'parent': self.parent,
+            'offset_ms': (self.start - trace_start) * 1000,
+            'duration_ms': (self.duration or 0.0) * 1000,
+            'attributes': self.attributes
+        }
+
+
+class Trace:
+    def __init__(self, name, attributes=None):
+        self.id = uuid.uuid4().hex
+        self.root = Span(name, attributes=attributes)
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, span):
+        # Spans may finish on the pipeline loop or worker threads
+        with self._lock:
+            self.spans.append(span)
+
+    def to_dict(self):
+        start = self.root.start
+        with self._lock:
+            spans = [span.to_dict(start) for span in self.spans]
+        return {
+            'trace_id': self.id,
+            'name': self.root.name,
+            'start': start,
+            'duration_ms': (self.root.duration or 0.0) * 1000,
+            'attributes': self.root.attributes,
+            'spans': spans
+        }
+
+
+class _Metrics:
+    """Process-wide aggregates behind the Prometheus endpoint"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.durations = {}
+        self.tokens = {}
+        self.cache = {}
+
+    def observe(self, span):
+        with self._lock:
+            hist = self.durations.setdefault(
+                span.name, {'buckets': [0] * len(DURATION_BUCKETS), 'sum': 0.0, 'count': 0}
+            )
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if span.duration <= bound:
+                    hist['buckets'][i] += 1
+            hist['sum'] += span.duration
+            hist['count'] += 1
+
+            for kind in ('prompt_tokens', 'completion_tokens'):
+                if span.attributes.get(kind):
+                    key = (span.name, kind.split('_')[0])
+                    self.tokens[key] = self.tokens.get(key, 0) + span.attributes[kind]
+
+            if span.attributes.get('cache') in ('hit', 'miss'):
+                key = (span.name, span.attributes['cache'])
+                self.cache[key] = self.cache.get(key, 0) + 1
+
+    def render(self):
+        lines = [
+            '# HELP art_stage_duration_seconds Time spent in each traced stage.',
+            '# TYPE art_stage_duration_seconds histogram'
+        ]
+        with self._lock:
+            for name, hist in sorted(self.durations.items()):
+                for bound, count in zip(DURATION_BUCKETS, hist['buckets']):
+                    lines.append(f'art_stage_duration_seconds_bucket{{stage="{name}",le="{bound}"}} {count}')
+                lines.append(f'art_stage_duration_seconds_bucket{{stage="{name}",le="+Inf"}} {hist["count"]}')
+                lines.append(f'art_stage_duration_seconds_sum{{stage="{name}"}} {hist["sum"]}')
+                lines.append(f'art_stage_duration_seconds_count{{stage="{name}"}} {hist["count"]}')
+
+            lines += ['# HELP art_llm_tokens_total LLM tokens reported by the API usage field.',
+                      '# TYPE art_llm_tokens_total counter']
+            for (name, kind), count in sorted(self.tokens.items()):
+                lines.append(f'art_llm_tokens_total{{stage="{name}",kind="{kind}"}} {count}')
+
+            lines += ['# HELP art_cache_lookups_total Result cache lookups by outcome.',
+                      '# TYPE art_cache_lookups_total counter']
+            for (name, result), count in sorted(self.cache.items()):
+                lines.append(f'art_cache_lookups_total{{stage="{name}",result="{result}"}} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = _Metrics()
+_export_lock = threading.Lock()
+
+
+def _export(finished):
+    if not TRACE_LOG_PATH:
+        return
+    line = json.dumps(finished.to_dict(), default=str)
+    with _export_lock, open(TRACE_LOG_PATH, 'a') as f:
+        f.write(line + '\n')
+
+
+@contextmanager
+def trace(name, **attributes):
+    """Open a trace; spans inside it (on any thread the context reaches) join it"""
+    current = Trace(name, attributes)
+    trace_token = _current_trace.set(current)
+    span_token = _current_span.set(current.root)
+    try:
+        yield current
+    finally:
+        current.root.finish()
+        try:
+            _current_span.reset(span_token)
+            _current_trace.reset(trace_token)
+        except ValueError:
+            pass
+        metrics.observe(current.root)
+        _export(current)
+
+
+@contextmanager
+def span(name, **attributes):
+    """Time a stage inside the current trace (or as a trace of its own)"""
+    current = _current_trace.get()
+    if current is None:
+        with trace(name, **attributes) as standalone:
+            yield standalone.root
+        return
+
+    parent = _current_span.get()
+    child = Span(name, parent.id if parent else None, attributes)
+    token = _current_span.set(child)
+    try:
+        yield child
+    finally:
+        child.finish()
+        try:
+            _current_span.reset(token)
+        except ValueError:
+            # A generator holding the span was closed from another context
+            pass
+        current.add(child)
+        metrics.observe(child)
+
+
+def traced(name=None):
+    """Decorator form of ``span`` for plain and async functions"""
+    def decorator(fn):
+        span_name = name or fn.__qualname__
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+def current_span():
+    return _current_span.get()
+
+
+def set_attributes(**attributes):
+    """Attach attributes to the innermost open span, if any"""
+    active = _current_span.get()
+    if active is not None:
+        active.set(**attributes)
+
+
+def record_usage(usage):
+    """Copy token counts from a Groq ``usage`` object onto the current span and log them"""
+    if usage is None:
+        return
+    prompt_tokens = getattr(usage, 'prompt_tokens', None)
+    completion_tokens = getattr(usage, 'completion_tokens', None)
+    set_attributes(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+
+    active = _current_span.get()
+    logger.info(
+        "%s: %s prompt + %s completion tokens (max_tokens %s)",
+        active.name if active else 'llm', prompt_tokens, completion_tokens,
+        active.attributes.get('max_tokens') if active else None
+    )
+
+
+def chunk_usage(chunk):
+    """Usage carried by a streaming chunk (Groq sends it on the last one)"""
+    usage = getattr(chunk, 'usage', None)
+    if usage is None and getattr(chunk, 'x_groq', None) is not None:
+        usage = getattr(chunk.x_groq, 'usage', None)
+    return usage
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.rstrip('/') != '/metrics':
+            self.send_error(404)
+            return
+        body = metrics.render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+_metrics_server = None
+_metrics_lock = threading.Lock()
+
+
+def start_metrics_server(port=TRACE_METRICS_PORT, host='0.0.0.0'):
+    """Serve /metrics on a daemon thread; later calls are no-ops"""
+    global _metrics_server
+    if port is None:
+        return None
+    with _metrics_lock:
+        if _metrics_server is None:
+            _metrics_server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            _metrics_server.daemon_threads = True
+            threading.Thread(target=_metrics_server.serve_forever, daemon=True).start()
+    return _metrics_server
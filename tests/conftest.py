@@ -0,0 +1,9 @@
+import pytest
+
+from benchmarks.corpus import synthetic_artwork
+
+
+@pytest.fixture(scope='session')
+def artwork():
+    """Small deterministic RGB painting shared by the analysis tests"""
+    return synthetic_artwork(320, 240)
@@ -0,0 +1,79 @@
+import io
+import sys
+
+import cv2
+import numpy as np
+import pytest
+from streamlit.testing.v1 import AppTest
+
+import app
+import src.similarity
+from src.cache import ResultCache, llm_settings
+from src.image_analysis import ImageAnalyzer
+from src.similarity import FeatureIndex, feature_vector
+
+
+class Upload(io.BytesIO):
+    name = 'artwork.png'
+    type = 'image/png'
+
+
+class FinishedJobs:
+    """Job queue whose jobs are done as soon as they are submitted"""
+
+    def __init__(self, results):
+        self.results = results
+        self.submitted = []
+        self.discarded = []
+
+    def submit(self, kind, payload, owner=None):
+        self.submitted.append(kind)
+        return f"{kind}-{len(self.submitted)}"
+
+    def status(self, job_id):
+        kind = job_id.split('-')[0]
+        return {'state': 'done', 'result': self.results[kind]}
+
+    def discard(self, job_id):
+        self.discarded.append(job_id)
+
+
+def run_app():
+    import app
+    app.main()
+
+
+@pytest.fixture
+def upload(artwork):
+    ok, encoded = cv2.imencode('.png', artwork[..., ::-1])
+    return encoded.tobytes()
+
+
+def test_queue_mode_reuses_a_near_duplicate(monkeypatch, artwork, upload):
+    bgr = np.ascontiguousarray(artwork[..., ::-1])
+    features = ImageAnalyzer.from_bgr(bgr).analyze_all()
+    vector = feature_vector(features, bgr)
+
+    cache, index = ResultCache(max_entries=4), FeatureIndex()
+    cache.set('earlier', {**features, 'interpretation': 'Earlier interpretation',
+                          'insights': None, 'report': 'Earlier report', 'llm_settings': llm_settings()})
+    index.add(vector, 'earlier')
+    jobs = FinishedJobs({'analyze': {'features': features, 'vector': vector}})
+
+    monkeypatch.setattr(app, 'SERVING_MODE', 'queue')
+    monkeypatch.setattr(app, 'SIMILARITY_REUSE', 'auto')
+    monkeypatch.setattr(app, 'get_result_cache', lambda: cache)
+    monkeypatch.setattr(app, 'get_job_queue', lambda: jobs)
+    monkeypatch.setattr(src.similarity, 'get_similarity_index', lambda: index)
+    monkeypatch.setattr(app.st, 'file_uploader', lambda *args, **kwargs: Upload(upload))
+    # The script runner leaves its script as __main__, which spawned workers
+    # of later tests would then import
+    monkeypatch.setitem(sys.modules, '__main__', sys.modules['__main__'])
+
+    at = AppTest.from_function(run_app, default_timeout=60).run()
+    assert not at.exception
+    # Only the analysis ran in a worker; the LLM stages were taken over
+    assert jobs.submitted == ['analyze']
+    assert jobs.discarded == ['analyze-1']
+    assert cache.get(app.make_cache_key(upload))['report'] == 'Earlier report'
+    assert len(index) == 2
@@ -0,0 +1,74 @@
+import asyncio
+import json
+
+import cv2
+import numpy as np
+
+from src.batch import extract_record, find_images, is_done, load_records, run_batch
+from src.image_analysis import to_builtin
+
+
+def write_images(directory, artwork, names=('a.png', 'b.jpg')):
+    paths = []
+    for name in names:
+        path = directory / name
+        cv2.imwrite(str(path), cv2.cvtColor(artwork, cv2.COLOR_RGB2BGR))
+        paths.append(str(path))
+    return paths
+
+
+def test_find_images_walks_directories_and_reads_manifests(tmp_path, artwork):
+    (tmp_path / 'sub').mkdir()
+    write_images(tmp_path, artwork, ('a.png',))
+    write_images(tmp_path / 'sub', artwork, ('b.JPG',))
+    (tmp_path / 'notes.txt').write_text('not an image')
+    assert find_images(str(tmp_path)) == [str(tmp_path / 'a.png'), str(tmp_path / 'sub' / 'b.JPG')]
+
+    manifest = tmp_path / 'manifest.txt'
+    manifest.write_text(f"# archive\na.png\n\n{tmp_path / 'sub' / 'b.JPG'}\n")
+    assert find_images(str(manifest)) == [str(tmp_path / 'a.png'), str(tmp_path / 'sub' / 'b.JPG')]
+
+
+def test_load_records_keeps_the_latest_and_skips_a_truncated_line(tmp_path):
+    output = tmp_path / 'out.jsonl'
+    output.write_text('\n'.join([
+        json.dumps({'path': 'a', 'error': 'boom'}),
+        json.dumps({'path': 'a', 'features': {}}),
+        '{"path": "b", "feat'
+    ]))
+    records = load_records(str(output))
+    assert list(records) == ['a'] and 'error' not in records['a']
+    assert load_records(str(tmp_path / 'missing.jsonl')) == {}
+
+
+def test_is_done_needs_a_report_unless_offline():
+    assert not is_done(None, True)
+    assert not is_done({'error': 'x'}, True)
+    assert is_done({'features': {}}, True)
+    assert not is_done({'features': {}}, False)
+    assert is_done({'features': {}, 'report': 'r'}, False)
+
+
+def test_extract_record_reports_errors_instead_of_raising(tmp_path, artwork):
+    bad = tmp_path / 'bad.jpg'
+    bad.write_bytes(b'not a jpeg')
+    assert 'error' in extract_record(str(bad))
+
+    record = extract_record(write_images(tmp_path, artwork, ('good.png',))[0])
+    assert set(record['features']) == {'color_stats', 'texture_stats', 'composition_stats'}
+    json.dumps(record)
+
+
+def test_to_builtin_converts_numpy_values():
+    converted = to_builtin({'a': np.float32(1.5), 'b': [np.int64(2), np.arange(2)]})
+    assert converted == {'a': 1.5, 'b': [2, [0, 1]]}
+    assert type(converted['a']) is float and type(converted['b'][0]) is int
+
+
+def test_offline_run_appends_one_record_per_image(tmp_path, artwork):
+    paths = write_images(tmp_path, artwork)
+    output = str(tmp_path / 'out.jsonl')
+    asyncio.run(run_batch(paths, output, workers=1))
+    records = load_records(output)
+    assert sorted(records) == sorted(paths)
+    assert all(is_done(record, offline=True) for record in records.values())
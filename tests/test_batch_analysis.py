@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from src.batch_analysis import TONE_FEATURES, BatchImageAnalyzer, stack_symmetry, to_dicts
+from src.composition import symmetry
+from src.image_analysis import ImageAnalyzer
+from src.palette import PaletteAnalyzer
+
+
+@pytest.fixture(scope='module')
+def tiles(artwork):
+    """Twelve 60 x 80 tiles cut from the shared artwork"""
+    return np.stack([artwork[row:row + 60, col:col + 80]
+                     for row in range(0, 180, 60) for col in range(0, 320, 80)])
+
+
+def test_features_match_image_analyzer(tiles):
+    results = to_dicts(BatchImageAnalyzer(tiles).analyze())
+    for tile, batch in zip(tiles, results):
+        single = ImageAnalyzer(tile).analyze_all()
+        for col in ('r', 'g', 'b'):
+            for stat in ('mean', 'std', 'dominant_values'):
+                assert np.isclose(batch['color_stats'][col][stat], single['color_stats'][col][stat])
+        for family in ('texture_stats', 'composition_stats'):
+            for name, value in batch[family].items():
+                assert np.allclose(value, single[family][name]), (family, name)
+
+
+def test_lists_of_images_are_stacked(tiles):
+    assert np.array_equal(BatchImageAnalyzer(list(tiles)).analyze(), BatchImageAnalyzer(tiles).analyze())
+
+
+def test_rejects_anything_but_a_uint8_rgb_stack(tiles):
+    with pytest.raises(ValueError):
+        BatchImageAnalyzer(tiles.astype(np.float32))
+    with pytest.raises(ValueError):
+        BatchImageAnalyzer(tiles[..., 0])
+
+
+def test_tone_stats_match_the_palette_engine(tiles):
+    results = to_dicts(BatchImageAnalyzer(tiles).analyze())
+    for tile, batch in zip(tiles, results):
+        single = PaletteAnalyzer().analyze(tile[..., ::-1])
+        for name in TONE_FEATURES:
+            assert batch['color_stats']['palette'][name] == pytest.approx(single[name], abs=1e-6), name
+        # Dominant colors are opt-in
+        assert batch['color_stats']['palette']['colors'] == []
+
+
+def test_sampled_tone_stats_share_positions_across_the_stack():
+    images = np.random.default_rng(1).integers(0, 256, (3, 150, 150, 3), dtype=np.uint8)
+    records = BatchImageAnalyzer(images).analyze()
+    for image, row in zip(images, records):
+        single = PaletteAnalyzer().analyze(image[..., ::-1])
+        assert row['warmth'] == pytest.approx(single['warmth'])
+        assert row['lightness_mean'] == pytest.approx(single['lightness_mean'])
+
+
+def test_dominant_palette_with_palette_enabled(tiles):
+    results = to_dicts(BatchImageAnalyzer(tiles[:3], palette=True).analyze())
+    for tile, batch in zip(tiles, results):
+        expected = PaletteAnalyzer().analyze(tile[..., ::-1])['colors']
+        assert [color['hex'] for color in batch['color_stats']['palette']['colors']] == \
+            [color['hex'] for color in expected]
+
+
+@pytest.mark.parametrize('shape', [(37, 52), (52, 37), (1, 9)])
+def test_stack_symmetry_matches_each_image(shape):
+    images = np.random.default_rng(2).integers(0, 256, (5,) + shape, dtype=np.uint8)
+    batched = stack_symmetry(images)
+    for i, image in enumerate(images):
+        for name, value in symmetry(image).items():
+            assert batched[name][i] == pytest.approx(value), name
@@ -0,0 +1,55 @@
+import httpx
+
+from benchmarks.bench_startup import children, measure_once, parse_importtime, summarize
+from benchmarks.compare import compare
+from benchmarks.stub_server import CANNED_COMPLETION, StubGroqServer
+
+
+def result(median_s, peak_bytes=1000):
+    return {'median_s': median_s, 'peak_bytes': peak_bytes}
+
+
+def test_compare_flags_slower_and_larger_benchmarks():
+    baseline = {'results': {'fast': result(0.1), 'noisy': result(0.0001), 'gone': result(1.0)}}
+    current = {'results': {'fast': result(0.2, 2000), 'noisy': result(0.001)}}
+    rows = {(name, metric): regressed for name, metric, *_, regressed in compare(baseline, current)}
+    assert rows[('fast', 'time')] and rows[('fast', 'memory')]
+    # Under min_seconds in the baseline: reported, never flagged
+    assert not rows[('noisy', 'time')]
+    assert not any(name == 'gone' for name, _ in rows)
+
+
+def test_compare_accepts_changes_within_the_threshold():
+    rows = compare({'results': {'a': result(1.0)}}, {'results': {'a': result(1.1)}}, threshold=0.15)
+    assert not any(regressed for *_, regressed in rows)
+
+
+def test_stub_server_replays_canned_completions():
+    request = {'model': 'm', 'messages': [{'role': 'user', 'content': 'Write the report'}]}
+    with StubGroqServer(latency=0, tokens_per_second=1e6) as server:
+        response = httpx.post(f"{server.base_url}/openai/v1/chat/completions", json=request)
+        with httpx.stream('POST', f"{server.base_url}/openai/v1/chat/completions",
+                          json={**request, 'stream': True}) as streamed:
+            events = [line for line in streamed.iter_lines() if line.startswith('data:')]
+    reply = response.json()
+    assert reply['choices'][0]['message']['content'] == CANNED_COMPLETION
+    assert reply['usage']['completion_tokens'] == len(CANNED_COMPLETION.split(' '))
+    assert events[-1] == 'data: [DONE]'
+    assert len(server.requests) == 2
+
+
+def test_parse_importtime_reads_nesting_and_times():
+    stderr = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |     json.decoder\n"
+        "import time:       300 |        420 |   json\n"
+        "import time:        50 |        470 | app\n"
+    )
+    rows = parse_importtime(stderr)
+    assert rows == [('json.decoder', 2, 120, 120), ('json', 1, 300, 420), ('app', 0, 50, 470)]
+    assert children(rows, 'app') == [('json', 420)]
+
+
+def test_app_startup_defers_upload_modules():
+    # Only the deferred-module check; the time budget depends on the machine
+    assert summarize(measure_once('app'))['deferred_imported'] == []
@@ -0,0 +1,48 @@
+from src.cache import ResultCache, llm_settings, make_cache_key
+
+IMAGE = b'\x89PNG fake upload bytes'
+
+
+def test_key_is_stable_for_the_same_upload_and_settings():
+    assert make_cache_key(IMAGE) == make_cache_key(IMAGE)
+    assert make_cache_key(IMAGE) != make_cache_key(IMAGE + b'!')
+
+
+def test_key_changes_with_each_llm_setting():
+    base = dict(model_name='m', prompt_version='1', backend='groq', pipeline_mode='two_call',
+                json_mode=True, base_url='http://a/v1', palette=False)
+    changes = [
+        {'model_name': 'other'},
+        {'prompt_version': '2'},
+        {'backend': 'stub'},
+        {'pipeline_mode': 'combined'},
+        {'json_mode': False},
+        {'palette': True},
+    ]
+    keys = {make_cache_key(IMAGE, llm_settings(**base))}
+    for change in changes:
+        keys.add(make_cache_key(IMAGE, llm_settings(**{**base, **change})))
+    assert len(keys) == len(changes) + 1
+
+
+def test_base_url_only_matters_for_openai_compatible_backends():
+    groq = dict(model_name='m', prompt_version='1', backend='groq', pipeline_mode='two_call', json_mode=True)
+    assert llm_settings(**groq, base_url='http://a/v1') == llm_settings(**groq, base_url='http://b/v1')
+    openai = {**groq, 'backend': 'openai'}
+    assert llm_settings(**openai, base_url='http://a/v1') != llm_settings(**openai, base_url='http://b/v1')
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = ResultCache(max_entries=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+
+
+def test_disk_tier_survives_a_new_cache(tmp_path):
+    ResultCache(cache_dir=str(tmp_path)).set('key', {'report': 'text'})
+    assert ResultCache(cache_dir=str(tmp_path)).get('key') == {'report': 'text'}
+    assert 'missing' not in ResultCache(cache_dir=str(tmp_path))
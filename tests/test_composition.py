@@ -0,0 +1,95 @@
+import cv2
+import numpy as np
+import pytest
+
+from src.composition import (
+    CompositionAnalyzer, edge_grid, symmetry, thirds_profiles, thirds_sums, thirds_weight
+)
+
+
+@pytest.fixture
+def gray(artwork):
+    return cv2.cvtColor(artwork, cv2.COLOR_RGB2GRAY)
+
+
+def naive_symmetry(gray):
+    image = gray.astype(np.float64)
+    height, width = image.shape
+    half_w, half_h = width // 2, height // 2
+    side = min(height, width)
+    top, left = (height - side) // 2, (width - side) // 2
+    square = image[top:top + side, left:left + side]
+    return {
+        'left_right': np.abs(image[:, :half_w] - image[:, ::-1][:, :half_w]).mean(),
+        'top_bottom': np.abs(image[:half_h] - image[::-1][:half_h]).mean(),
+        'diagonal': np.abs(square - square.T).mean(),
+        'anti_diagonal': np.abs(square - square[::-1, ::-1].T).mean(),
+    }
+
+
+@pytest.mark.parametrize('chunk_rows', [7, 256])
+def test_symmetry_matches_full_size_mirrors(gray, chunk_rows):
+    assert symmetry(gray, chunk_rows) == pytest.approx(naive_symmetry(gray))
+
+
+def test_mirrored_images_are_symmetric():
+    half = np.random.default_rng(0).integers(0, 256, (40, 30), dtype=np.uint8)
+    image = np.hstack([half, half[:, ::-1]])
+    assert symmetry(image)['left_right'] == 0.0
+    assert symmetry(image)['top_bottom'] > 0
+    square = np.triu(half[:30]) + np.triu(half[:30], 1).T
+    assert symmetry(square)['diagonal'] == 0.0
+
+
+def test_edge_grid_counts_each_cell():
+    edges = np.zeros((30, 40), np.uint8)
+    edges[:10, :10] = 255
+    edges[25, 35] = 255
+    grid = edge_grid(edges, (3, 4))
+    assert grid.shape == (3, 4)
+    assert grid[0, 0] == 1.0
+    assert grid[2, 3] == pytest.approx(1 / 100)
+    assert grid.sum() == pytest.approx(1 + 1 / 100)
+
+
+def test_edge_grid_of_an_image_smaller_than_the_grid():
+    grid = edge_grid(np.full((2, 2), 255, np.uint8), (3, 3))
+    assert grid.shape == (3, 3)
+    assert np.isfinite(grid).all()
+
+
+def test_thirds_weight_matches_the_dense_map(gray):
+    edges = cv2.Canny(gray, 50, 150)
+    rows, cols = thirds_profiles(*edges.shape)
+    weights = np.outer(rows, cols)
+    expected = weights[edges > 0].mean() / weights.mean()
+    assert thirds_weight(edges, chunk_rows=13) == pytest.approx(expected)
+
+
+def test_thirds_weight_prefers_edges_on_the_intersections():
+    height, width = 90, 120
+    on, off = np.zeros((height, width), np.uint8), np.zeros((height, width), np.uint8)
+    on[29:31, 39:41] = 255
+    off[44:46, 59:61] = 255
+    assert thirds_weight(on) > 1 > thirds_weight(off)
+    assert thirds_weight(np.zeros((height, width), np.uint8)) == 0.0
+
+
+def test_thirds_sums_of_tiles_add_up(gray):
+    edges = cv2.Canny(gray, 50, 150)
+    rows, cols = thirds_profiles(*edges.shape)
+    whole = thirds_sums(edges, rows, cols)
+    split = 100
+    parts = [
+        thirds_sums(edges[:split], rows[:split], cols),
+        thirds_sums(edges[split:], rows[split:], cols),
+    ]
+    assert sum(p[0] for p in parts) == pytest.approx(whole[0])
+    assert sum(p[1] for p in parts) == whole[1]
+
+
+def test_analyzer_keeps_symmetry_score_as_left_right(gray):
+    stats = CompositionAnalyzer(grid=(2, 3)).analyze(gray)
+    assert stats['symmetry_score'] == symmetry(gray)['left_right']
+    assert np.array(stats['edge_grid']).shape == (2, 3)
+    assert 0 < stats['edge_density'] < 1
@@ -0,0 +1,69 @@
+import pytest
+
+from src.history import HistoryStore
+
+DAY = 24 * 3600
+
+
+def features(r=None, g=None):
+    stats = {}
+    if r is not None:
+        stats['r'] = {'mean': r}
+    if g is not None:
+        stats['g'] = {'mean': g}
+    return {'color_stats': stats}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return HistoryStore(str(tmp_path / 'history.sqlite3'))
+
+
+def test_trajectory_is_per_user_and_oldest_first(store):
+    store.record('a', features(r=30), created_at=2 * DAY)
+    store.record('a', features(r=10), created_at=DAY)
+    store.record('b', features(r=99), created_at=DAY)
+    trend = store.trajectory('a', ['r_mean'])
+    assert trend == {'created_at': [DAY, 2 * DAY], 'r_mean': [10.0, 30.0]}
+    assert store.revision('a')[0] == 2
+
+
+def test_rollup_means_ignore_missing_features(store):
+    store.record('a', features(r=10), created_at=DAY + 60)
+    store.record('a', features(r=20, g=4), created_at=DAY + 120)
+    trend = store.daily_trend('a', ['r_mean', 'g_mean', 'b_mean'])
+    assert trend['count'] == [2]
+    assert trend['r_mean'] == [15.0]
+    # Only one analysis on the day had green, and none had blue
+    assert trend['g_mean'] == [4.0]
+    assert trend['b_mean'] == [None]
+
+
+def test_rollup_days_are_utc(store):
+    # One second either side of midnight UTC
+    store.record('a', features(r=10), created_at=2 * DAY - 1)
+    store.record('a', features(r=20), created_at=2 * DAY + 1)
+    trend = store.daily_trend('a', ['r_mean'], since=DAY)
+    assert trend['day'] == ['1970-01-02', '1970-01-03']
+    assert trend['r_mean'] == [10.0, 20.0]
+
+
+def test_rollups_match_the_trajectory_means(store):
+    values = [12.0, 7.5, 30.25, 4.0]
+    for i, value in enumerate(values):
+        store.record('a', features(r=value), created_at=DAY + i)
+    assert store.daily_trend('a', ['r_mean'])['r_mean'] == [pytest.approx(sum(values) / len(values))]
+
+
+def test_rollups_persist_across_stores(tmp_path):
+    path = str(tmp_path / 'history.sqlite3')
+    store = HistoryStore(path)
+    store.record('a', features(r=10), created_at=DAY)
+    store.record('a', features(r=20, g=6), created_at=DAY + 1)
+    trend = HistoryStore(path).daily_trend('a', ['r_mean', 'g_mean'])
+    assert trend == {'day': ['1970-01-02'], 'count': [2], 'r_mean': [15.0], 'g_mean': [6.0]}
+
+
+def test_unknown_columns_are_rejected(store):
+    with pytest.raises(ValueError, match='Unknown feature columns'):
+        store.trajectory('a', ['r_mean; DROP TABLE analyses'])
@@ -0,0 +1,24 @@
+from src.image_analysis import ImageAnalyzer, flatten_features
+
+
+def test_analyze_all_matches_the_separate_families(artwork):
+    features = ImageAnalyzer(artwork).analyze_all()
+    assert set(features) == {'color_stats', 'texture_stats', 'composition_stats'}
+    analyzer = ImageAnalyzer(artwork)
+    assert flatten_features(features) == flatten_features({
+        'color_stats': analyzer.analyze_colors(),
+        'texture_stats': analyzer.analyze_texture(),
+        'composition_stats': analyzer.analyze_composition()
+    })
+
+
+def test_gray_is_converted_once(artwork):
+    analyzer = ImageAnalyzer(artwork)
+    assert analyzer.gray is analyzer.gray
+    assert analyzer.gray.shape == artwork.shape[:2]
+
+
+def test_dominant_colors_are_opt_in(artwork):
+    assert ImageAnalyzer(artwork, palette=False).analyze_colors()['palette']['colors'] == []
+    palette = ImageAnalyzer(artwork, palette=True).analyze_colors()['palette']
+    assert palette['colors'] and 'warmth' in palette
@@ -0,0 +1,46 @@
+import cv2
+import numpy as np
+import pytest
+
+from src.image_analysis import ImageAnalyzer, flatten_features, to_builtin
+from src.ingest import ImageTooLargeError, load_image, read_image_size
+
+
+def encode(image, ext='.png'):
+    return cv2.imencode(ext, image)[1].tobytes()
+
+
+def test_header_size_without_decoding(artwork):
+    assert read_image_size(encode(artwork)) == (320, 240)
+    with pytest.raises(ValueError):
+        read_image_size(b'not an image')
+
+
+def test_loads_bgr_capped_at_max_side(artwork):
+    bgr = cv2.cvtColor(artwork, cv2.COLOR_RGB2BGR)
+    assert np.array_equal(load_image(encode(bgr)), bgr)
+    assert load_image(encode(bgr), max_side=160).shape == (120, 160, 3)
+
+
+def test_large_jpegs_use_a_reduced_decode(artwork):
+    big = cv2.resize(cv2.cvtColor(artwork, cv2.COLOR_RGB2BGR), (3200, 2400))
+    image = load_image(encode(big, '.jpg'), max_side=200, margin=2.0)
+    assert image.shape == (150, 200, 3)
+
+
+def test_alpha_and_grayscale_become_three_channels(artwork):
+    gray = cv2.cvtColor(artwork, cv2.COLOR_RGB2GRAY)
+    bgra = cv2.cvtColor(artwork, cv2.COLOR_RGB2BGRA)
+    assert load_image(encode(gray)).shape == (240, 320, 3)
+    assert load_image(encode(bgra)).shape == (240, 320, 3)
+
+
+def test_oversized_uploads_are_rejected_before_decoding(artwork):
+    with pytest.raises(ImageTooLargeError):
+        load_image(encode(artwork), max_pixels=1000)
+
+
+def test_from_bgr_matches_the_rgb_constructor(artwork):
+    bgr = cv2.cvtColor(artwork, cv2.COLOR_RGB2BGR)
+    assert (flatten_features(to_builtin(ImageAnalyzer.from_bgr(bgr).analyze_all()))
+            == flatten_features(to_builtin(ImageAnalyzer(artwork).analyze_all())))
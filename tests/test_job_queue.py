@@ -0,0 +1,123 @@
+import time
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import cv2
+import pytest
+
+from src.job_queue import JobQueue, QueueFullError, UserLimitError
+
+
+class HeldPool:
+    """Executor whose jobs stay pending until the test finishes them"""
+
+    def __init__(self):
+        self.futures = []
+        self.shut_down = False
+
+    def submit(self, fn, *args):
+        future = Future()
+        self.futures.append(future)
+        return future
+
+    def shutdown(self, wait=True):
+        self.shut_down = True
+
+
+@pytest.fixture
+def held(monkeypatch):
+    queue = JobQueue(workers=1, max_pending=3, per_user=2)
+    pool = HeldPool()
+    monkeypatch.setattr(queue, '_get_pool', lambda: pool)
+    return queue, pool
+
+
+def wait(queue, job_id, timeout=60):
+    deadline = time.time() + timeout
+    while queue.status(job_id)['state'] in ('queued', 'running'):
+        assert time.time() < deadline, 'job did not finish'
+        time.sleep(0.05)
+    return queue.status(job_id)
+
+
+def test_limits_per_owner_and_for_the_whole_queue(held):
+    queue, pool = held
+    queue.submit('analyze', b'', owner='a')
+    queue.submit('analyze', b'', owner='a')
+    with pytest.raises(UserLimitError):
+        queue.submit('analyze', b'', owner='a')
+    queue.submit('analyze', b'', owner='b')
+    with pytest.raises(QueueFullError):
+        queue.submit('analyze', b'', owner='c')
+    assert queue.pending() == 3
+
+    # A finished job frees its owner's slot and the queue's
+    pool.futures[0].set_result({'features': {}})
+    queue.submit('analyze', b'', owner='a')
+    with pytest.raises(ValueError, match='Unknown job kind'):
+        queue.submit('train', b'')
+
+
+def test_status_reports_position_result_and_error(held):
+    queue, pool = held
+    first = queue.submit('analyze', b'', owner='a')
+    second = queue.submit('analyze', b'', owner='b')
+    assert queue.status(first)['position'] == 1
+    assert queue.status(second)['position'] == 2
+
+    pool.futures[0].set_result({'vector': [1.0]})
+    pool.futures[1].set_exception(RuntimeError('worker died'))
+    assert queue.status(first)['state'] == 'done'
+    assert queue.status(first)['result'] == {'vector': [1.0]}
+    assert queue.status(second)['state'] == 'failed'
+    assert queue.status(second)['error'] == 'worker died'
+
+    queue.discard(first)
+    assert queue.status(first) is None
+    assert queue.status('unknown') is None
+
+
+def test_cancelled_jobs_fail(held):
+    queue, pool = held
+    job_id = queue.submit('analyze', b'', owner='a')
+    pool.futures[0].cancel()
+    assert queue.status(job_id)['state'] == 'failed'
+    assert queue.status(job_id)['error'] == 'cancelled'
+
+
+def test_a_broken_pool_is_shut_down_and_replaced(held):
+    queue, pool = held
+    queue._pool = pool
+    first = queue.submit('analyze', b'', owner='a')
+    second = queue.submit('analyze', b'', owner='b')
+    for future in pool.futures:
+        future.set_exception(BrokenProcessPool('a worker died'))
+    assert pool.shut_down
+    assert queue._pool is None
+    assert queue.status(first)['state'] == queue.status(second)['state'] == 'failed'
+
+
+def test_finished_jobs_expire(held):
+    queue, pool = held
+    queue.result_ttl = 0
+    job_id = queue.submit('analyze', b'', owner='a')
+    pool.futures[0].set_result({})
+    time.sleep(0.01)
+    assert queue.status(job_id) is None
+
+
+def test_workers_analyze_uploads(artwork):
+    queue = JobQueue(workers=1)
+    ok, encoded = cv2.imencode('.png', artwork[..., ::-1])
+    good = queue.submit('analyze', encoded.tobytes(), owner='a')
+    bad = queue.submit('analyze', b'not an image', owner='a')
+
+    status = wait(queue, good)
+    assert status['state'] == 'done'
+    assert {'color_stats', 'texture_stats', 'composition_stats'} <= set(status['result']['features'])
+    assert status['result']['vector'].ndim == 1
+
+    status = wait(queue, bad)
+    assert status['state'] == 'failed'
+    assert status['error']
+    queue._pool.shutdown()
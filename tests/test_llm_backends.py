@@ -0,0 +1,101 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from src.llm_backends import (
+    AsyncOpenAICompatibleClient, AsyncStubClient, OpenAICompatibleClient, RateLimitError,
+    StubClient, create_async_client, create_client, rate_limit_errors
+)
+
+REQUEST = {'model': 'm', 'messages': [{'role': 'user', 'content': 'Describe the artwork'}], 'max_tokens': 5}
+USAGE = {'prompt_tokens': 7, 'completion_tokens': 2, 'total_tokens': 9}
+
+
+def server(requests):
+    """Handler of a minimal OpenAI-compatible server that records each request body"""
+    def handle(request):
+        body = json.loads(request.content)
+        requests.append((request.url.path, body))
+        if body['messages'][0]['content'] == 'slow down':
+            return httpx.Response(429, headers={'retry-after': '2'})
+        if not body['stream']:
+            return httpx.Response(200, json={
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': 'Warm hues'}}],
+                'usage': USAGE
+            })
+        events = [{'choices': [{'index': 0, 'delta': {'content': piece}}]} for piece in ('Warm', ' hues')]
+        events.append({'choices': [], 'usage': USAGE})
+        lines = [f"data: {json.dumps(event)}\n\n" for event in events] + ['data: [DONE]\n\n']
+        return httpx.Response(200, text=''.join(lines), headers={'content-type': 'text/event-stream'})
+    return handle
+
+
+def test_stub_replies_in_the_sdk_shape():
+    client = StubClient(latency=0, tokens_per_second=1e6)
+    completion = client.chat.completions.create(**REQUEST)
+    assert completion.choices[0].message.content
+    assert completion.usage.completion_tokens <= REQUEST['max_tokens']
+    chunks = list(client.chat.completions.create(stream=True, **REQUEST))
+    text = ''.join(chunk.choices[0].delta.content for chunk in chunks[:-1])
+    assert text == completion.choices[0].message.content
+    assert chunks[-1].usage.total_tokens == completion.usage.total_tokens
+
+
+def test_async_stub_streams_the_same_text():
+    async def run():
+        client = AsyncStubClient(latency=0, tokens_per_second=1e6)
+        completion = await client.chat.completions.create(**REQUEST)
+        stream = await client.chat.completions.create(stream=True, **REQUEST)
+        pieces = [chunk.choices[0].delta.content async for chunk in stream]
+        return completion, pieces
+    completion, pieces = asyncio.run(run())
+    assert ''.join(pieces[:-1]) == completion.choices[0].message.content
+
+
+def test_openai_compatible_client_reads_completions_and_streams():
+    requests = []
+    client = OpenAICompatibleClient(base_url='http://llm.local/v1')
+    client.chat.completions._http = httpx.Client(
+        base_url='http://llm.local/v1', transport=httpx.MockTransport(server(requests))
+    )
+
+    completion = client.chat.completions.create(**REQUEST)
+    assert completion.choices[0].message.content == 'Warm hues'
+    assert completion.usage.total_tokens == 9
+    # Fields the server left out read as None, as in the SDK's models
+    assert completion.choices[0].finish_reason is None
+
+    chunks = list(client.chat.completions.create(stream=True, **REQUEST))
+    assert ''.join(chunk.choices[0].delta.content for chunk in chunks if chunk.choices) == 'Warm hues'
+    assert chunks[-1].usage.completion_tokens == 2
+    assert requests[0][0] == '/v1/chat/completions'
+    assert requests[1][1]['stream_options'] == {'include_usage': True}
+
+
+def test_async_openai_compatible_client_raises_rate_limits_from_the_call():
+    requests = []
+
+    async def run():
+        client = AsyncOpenAICompatibleClient(base_url='http://llm.local/v1')
+        client.chat.completions._http = httpx.AsyncClient(
+            base_url='http://llm.local/v1', transport=httpx.MockTransport(server(requests))
+        )
+        stream = await client.chat.completions.create(stream=True, **REQUEST)
+        pieces = [chunk.choices[0].delta.content async for chunk in stream if chunk.choices]
+        slow = dict(REQUEST, messages=[{'role': 'user', 'content': 'slow down'}])
+        with pytest.raises(RateLimitError) as raised:
+            await client.chat.completions.create(stream=True, **slow)
+        return pieces, raised.value
+    pieces, error = asyncio.run(run())
+    assert ''.join(pieces) == 'Warm hues'
+    assert error.response.headers['retry-after'] == '2'
+    assert RateLimitError in rate_limit_errors()
+
+
+def test_backends_are_checked_by_name():
+    assert isinstance(create_client('stub'), StubClient)
+    assert isinstance(create_async_client('openai'), AsyncOpenAICompatibleClient)
+    with pytest.raises(ValueError, match='Unknown LLM backend'):
+        create_client('gpt')
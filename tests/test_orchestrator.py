@@ -0,0 +1,114 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import cv2
+import pytest
+
+import src.orchestrator as orchestrator
+from src.llm_backends import AsyncStubClient, RateLimitError
+from src.orchestrator import AnalysisPipeline
+from src.stub_completions import CANNED_COMPLETION, SAMPLE_INTERPRETATION
+
+
+class FlakyClient:
+    """Stub client that is rate limited ``failures`` times, tracking calls in flight"""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._stub = AsyncStubClient(latency=0.01, tokens_per_second=1e6)
+        self.chat = SimpleNamespace(completions=self)
+
+    async def create(self, **request):
+        if self.failures:
+            self.failures -= 1
+            raise RateLimitError("429", SimpleNamespace(headers={}))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            return await self._stub.chat.completions.create(**request)
+        finally:
+            self.in_flight -= 1
+
+
+@pytest.fixture
+def make_pipeline(monkeypatch):
+    def make(client=None, **options):
+        client = client or AsyncStubClient(latency=0, tokens_per_second=1e6)
+        monkeypatch.setattr(orchestrator, 'create_async_client', lambda backend: client)
+        pipeline = AnalysisPipeline(**options)
+        monkeypatch.setattr(pipeline, '_backoff', lambda attempt, error: 0)
+        return pipeline
+    return make
+
+
+def test_run_returns_features_interpretation_and_report(make_pipeline, artwork):
+    result = make_pipeline(mode='two_call').run(cv2.cvtColor(artwork, cv2.COLOR_RGB2BGR))
+    assert {'color_stats', 'texture_stats', 'composition_stats'} <= set(result)
+    assert result['interpretation'] == SAMPLE_INTERPRETATION
+    assert result['report'] == CANNED_COMPLETION
+    assert result['insights']['emotions']['joy'] == 0.7
+
+
+def test_rate_limited_calls_are_retried(make_pipeline):
+    client = FlakyClient(failures=2)
+    pipeline = make_pipeline(client, max_retries=2)
+    assert pipeline.submit(pipeline.report(SAMPLE_INTERPRETATION)).result() == CANNED_COMPLETION
+
+
+def test_rate_limit_is_raised_after_the_last_retry(make_pipeline):
+    pipeline = make_pipeline(FlakyClient(failures=3), max_retries=2)
+    with pytest.raises(RateLimitError):
+        pipeline.submit(pipeline.report(SAMPLE_INTERPRETATION)).result()
+
+
+def test_concurrent_calls_share_one_limit(make_pipeline):
+    client = FlakyClient()
+    pipeline = make_pipeline(client, max_concurrency=2)
+
+    async def many():
+        return await asyncio.gather(*(pipeline.report(SAMPLE_INTERPRETATION) for _ in range(6)))
+
+    assert pipeline.submit(many()).result() == [CANNED_COMPLETION] * 6
+    assert client.max_in_flight == 2
+
+
+def test_streamed_report_matches_the_reply(make_pipeline):
+    pipeline = make_pipeline()
+    chunks = list(pipeline.stream_report(SAMPLE_INTERPRETATION))
+    assert len(chunks) > 1
+    assert ''.join(chunks) == CANNED_COMPLETION
+
+
+def test_streamed_interpretation_yields_prose_then_parses(make_pipeline, artwork):
+    pipeline = make_pipeline()
+    features = pipeline.submit(pipeline.analyze(cv2.cvtColor(artwork, cv2.COLOR_RGB2BGR))).result()
+    stream = pipeline.stream_interpretation(features)
+    assert ''.join(stream) == SAMPLE_INTERPRETATION
+    assert stream.result()['interpretation'] == SAMPLE_INTERPRETATION
+
+
+def test_stream_errors_reach_the_consumer(make_pipeline):
+    pipeline = make_pipeline(FlakyClient(failures=5), max_retries=0)
+    with pytest.raises(RateLimitError):
+        list(pipeline.stream_report(SAMPLE_INTERPRETATION))
+
+
+def test_concurrent_first_requests_share_one_client(monkeypatch):
+    created = []
+
+    def create(backend):
+        created.append(backend)
+        # Widen the window in which a second thread could also find no client
+        time.sleep(0.05)
+        return AsyncStubClient(latency=0, tokens_per_second=1e6)
+
+    monkeypatch.setattr(orchestrator, 'create_async_client', create)
+    pipeline = AnalysisPipeline()
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        clients = list(pool.map(lambda _: pipeline._get_client(), range(4)))
+    assert len(created) == 1
+    assert all(client is clients[0] for client in clients)
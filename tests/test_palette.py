@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from src.palette import PaletteAnalyzer, sample_indices, tone_arrays, tone_stats
+
+RED, BLUE, GRAY = (0, 0, 255), (255, 0, 0), (128, 128, 128)
+
+
+def test_small_images_are_used_whole():
+    assert sample_indices(100, 100, samples=10000) is None
+
+
+def test_sample_takes_one_pixel_from_each_cell():
+    height, width = 300, 500
+    rows, cols = sample_indices(height, width, samples=1500, seed=3)
+    assert 0 < len(rows) <= 1500
+    assert rows.min() >= 0 and rows.max() < height
+    assert cols.min() >= 0 and cols.max() < width
+    # Every pixel is distinct and every stretch of the canvas is represented
+    assert len(set(zip(rows.tolist(), cols.tolist()))) == len(rows)
+    assert np.all(np.bincount(rows * 10 // height, minlength=10) > 0)
+    assert np.all(np.bincount(cols * 10 // width, minlength=10) > 0)
+    repeat = sample_indices(height, width, samples=1500, seed=3)
+    assert np.array_equal(rows, repeat[0]) and np.array_equal(cols, repeat[1])
+
+
+def test_tone_of_flat_colors():
+    pixels = np.array([[RED] * 4, [BLUE] * 4, [GRAY] * 4], np.uint8)
+    tones = tone_arrays(pixels)
+    assert tones['warmth'].tolist() == [1.0, -1.0, 0.0]
+    assert tones['neutral_ratio'].tolist() == [0.0, 0.0, 1.0]
+    assert tones['saturation_mean'] == pytest.approx([1.0, 1.0, 0.0])
+
+
+def test_tone_arrays_match_each_image():
+    pixels = np.random.default_rng(0).integers(0, 256, (4, 500, 3), dtype=np.uint8)
+    tones = tone_arrays(pixels)
+    for i, image in enumerate(pixels):
+        for name, value in tone_stats(image).items():
+            assert tones[name][i] == pytest.approx(value), name
+
+
+def test_analyze_finds_the_dominant_colors():
+    image = np.zeros((40, 40, 3), np.uint8)
+    image[:, :30] = RED
+    image[:, 30:] = BLUE
+    palette = PaletteAnalyzer(colors=2).analyze(image)
+    assert [color['hex'] for color in palette['colors']] == ['#ff0000', '#0000ff']
+    assert [color['proportion'] for color in palette['colors']] == [0.75, 0.25]
+    assert palette['warmth'] == pytest.approx(0.5)
+
+
+def test_dominant_colors_can_be_skipped():
+    image = np.random.default_rng(1).integers(0, 256, (200, 200, 3), dtype=np.uint8)
+    full = PaletteAnalyzer().analyze(image)
+    tone_only = PaletteAnalyzer(dominant=False).analyze(image)
+    assert len(full['colors']) == 5
+    assert tone_only['colors'] == []
+    assert {name: value for name, value in full.items() if name != 'colors'} == \
+        {name: value for name, value in tone_only.items() if name != 'colors'}
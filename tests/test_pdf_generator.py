@@ -0,0 +1,107 @@
+import cv2
+import numpy as np
+import pytest
+
+from src import pdf_generator, report_images
+from src.pdf_generator import PDFRenderer, TherapyReportPDF, generate_pdf_report
+from src.stub_completions import CANNED_COMPLETION, SAMPLE_INTERPRETATION
+
+pytestmark = pytest.mark.filterwarnings('ignore:Substituting font')
+
+
+def test_report_is_a_pdf_with_a_disclaimer_page():
+    pdf = generate_pdf_report(SAMPLE_INTERPRETATION, CANNED_COMPLETION)
+    assert bytes(pdf.output()).startswith(b'%PDF')
+    assert pdf.page_no() >= 2
+
+
+def test_page_template_is_laid_out_once():
+    first, second = TherapyReportPDF(), TherapyReportPDF()
+    assert first.template is second.template
+    assert first.template.disclaimer_bottom > first.template.body_top
+
+
+def test_render_is_memoized_by_content():
+    renderer = PDFRenderer()
+    pdf = renderer.render(SAMPLE_INTERPRETATION, CANNED_COMPLETION)
+    assert renderer.render(SAMPLE_INTERPRETATION, CANNED_COMPLETION) is pdf
+    assert renderer.render(SAMPLE_INTERPRETATION, CANNED_COMPLETION + '.') is not pdf
+
+
+def test_prefetched_pdf_is_returned_by_render():
+    renderer = PDFRenderer()
+    renderer.prefetch(SAMPLE_INTERPRETATION, CANNED_COMPLETION)
+    pdf = renderer.render(SAMPLE_INTERPRETATION, CANNED_COMPLETION)
+    assert pdf.startswith(b'%PDF')
+    assert renderer.render(SAMPLE_INTERPRETATION, CANNED_COMPLETION) is pdf
+
+
+def test_key_separates_interpretation_from_report():
+    assert PDFRenderer.key('ab', 'c') != PDFRenderer.key('a', 'bc')
+
+
+@pytest.fixture
+def upload(artwork):
+    ok, encoded = cv2.imencode('.jpg', artwork[..., ::-1])
+    return encoded.tobytes()
+
+
+@pytest.fixture
+def encodes(monkeypatch):
+    """Names of the images encoded, with charts exported as a small PNG"""
+    calls = []
+    png = cv2.imencode('.png', np.full((44, 64, 3), 200, np.uint8))[1].tobytes()
+
+    def thumbnail(data):
+        calls.append('thumbnail')
+        return report_images.thumbnail_jpeg(data)
+
+    def chart(fig):
+        calls.append(fig)
+        return None if fig == 'broken' else png
+
+    monkeypatch.setattr(pdf_generator, 'thumbnail_jpeg', thumbnail)
+    monkeypatch.setattr(pdf_generator, 'chart_png', chart)
+    monkeypatch.setattr(pdf_generator, 'can_render_charts', lambda: True)
+    return calls
+
+
+def test_images_are_keyed_without_rehashing_the_upload(upload, encodes, monkeypatch):
+    monkeypatch.setattr(pdf_generator, 'upload_digest', lambda data: pytest.fail('upload rehashed'))
+    renderer = PDFRenderer()
+    # Figures are never serialized for their key, so any object will do
+    charts = [('emotions', {'joy': 0.5}, 'radar'), ('colors', 'upload-key', 'bars')]
+    first = renderer.render(SAMPLE_INTERPRETATION, CANNED_COMPLETION, upload, charts, artwork_key='upload-key')
+    second = renderer.render(SAMPLE_INTERPRETATION + '!', CANNED_COMPLETION, upload, charts, artwork_key='upload-key')
+    assert encodes == ['thumbnail', 'radar', 'bars']
+    assert first != second
+
+    # New emotion scores mean a new radar chart
+    charts[0] = ('emotions', {'joy': 0.9}, 'radar')
+    renderer.render(SAMPLE_INTERPRETATION, CANNED_COMPLETION, upload, charts, artwork_key='upload-key')
+    assert encodes[3:] == ['radar']
+
+
+def test_charts_that_cannot_be_exported_are_left_out(upload, encodes):
+    renderer = PDFRenderer()
+    charts = [('colors', 'key', 'broken')]
+    with_chart = renderer.render(SAMPLE_INTERPRETATION, CANNED_COMPLETION, upload, charts, artwork_key='key')
+    renderer.render(SAMPLE_INTERPRETATION + '!', CANNED_COMPLETION, upload, charts, artwork_key='key')
+    # The failed export is remembered rather than retried
+    assert encodes.count('broken') == 1
+    assert len(with_chart) < len(renderer.render(
+        SAMPLE_INTERPRETATION, CANNED_COMPLETION, upload, [('colors', 'other', 'bars')], artwork_key='key'
+    ))
+
+
+def test_charts_are_skipped_without_kaleido(upload, encodes, monkeypatch):
+    monkeypatch.setattr(pdf_generator, 'can_render_charts', lambda: False)
+    renderer = PDFRenderer()
+    pdf = renderer.render(SAMPLE_INTERPRETATION, CANNED_COMPLETION, upload, [('colors', 'key', 'bars')], artwork_key='key')
+    assert encodes == ['thumbnail']
+    assert renderer.render(SAMPLE_INTERPRETATION, CANNED_COMPLETION, upload, artwork_key='key') is pdf
+
+
+def test_thumbnail_is_downscaled(upload):
+    thumbnail = report_images.thumbnail_jpeg(upload, max_side=100)
+    assert max(cv2.imdecode(np.frombuffer(thumbnail, np.uint8), cv2.IMREAD_COLOR).shape[:2]) == 100
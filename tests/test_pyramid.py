@@ -0,0 +1,41 @@
+import numpy as np
+
+from src.image_analysis import ImageAnalyzer, flatten_features
+from src.pyramid import ImagePyramid, fit_to_side, resize_to_side
+
+
+def test_fit_to_side_keeps_aspect_ratio():
+    assert fit_to_side(4000, 3000, 1000) == (1000, 750)
+    assert fit_to_side(300, 200, 1000) == (300, 200)
+    assert fit_to_side(300, 200, None) == (300, 200)
+    assert fit_to_side(10000, 1, 100) == (100, 1)
+
+
+def test_resize_to_side_returns_small_images_unchanged():
+    image = np.zeros((20, 30, 3), np.uint8)
+    assert resize_to_side(image, 64) is image
+    assert resize_to_side(image, 15).shape == (10, 15, 3)
+
+
+def test_levels_are_cached_and_capped(artwork):
+    pyramid = ImagePyramid(artwork)
+    assert pyramid.level() is artwork
+    assert pyramid.level(1000) is artwork
+    small = pyramid.level(160)
+    assert small.shape[:2] == (120, 160)
+    assert pyramid.level(160) is small
+    assert pyramid.gray(160).shape == (120, 160)
+    assert pyramid.gray(160) is pyramid.gray(160)
+
+
+def test_resolutions_pick_each_familys_working_size(artwork):
+    full = ImageAnalyzer(artwork, resolutions={'color': None, 'texture': None, 'composition': None})
+    reduced = ImageAnalyzer(artwork, resolutions={'color': None, 'texture': 160, 'composition': None})
+    full_features = flatten_features(full.analyze_all())
+    reduced_features = flatten_features(reduced.analyze_all())
+    assert full_features['color_stats.r.mean'] == reduced_features['color_stats.r.mean']
+    assert full_features['texture_stats.contrast'] != reduced_features['texture_stats.contrast']
+
+
+def test_flatten_features_joins_nested_keys():
+    assert flatten_features({'a': {'b': 1, 'c': {'d': 2}}, 'e': 3}) == {'a.b': 1, 'a.c.d': 2, 'e': 3}
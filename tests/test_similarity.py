@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from app import find_similar_result
+from config import SIMILARITY_THRESHOLD
+from src.cache import ResultCache, llm_settings
+from src.image_analysis import ImageAnalyzer
+from src.similarity import VECTOR_DIM, FeatureIndex, feature_vector
+
+
+def unit(i, scale=1.0):
+    vector = np.zeros(VECTOR_DIM, dtype=np.float32)
+    vector[i] = scale
+    return vector
+
+
+def test_search_returns_nearest_first():
+    index = FeatureIndex()
+    for i in range(5):
+        index.add(unit(0, i * 0.1), f"key{i}")
+    hits = index.search(unit(0, 0.22), k=3)
+    assert [key for key, _ in hits] == ['key2', 'key3', 'key1']
+    assert hits[0][1] == pytest.approx(0.02, abs=1e-6)
+
+
+def test_nearest_skips_every_copy_of_the_excluded_key():
+    index = FeatureIndex()
+    # The same upload analyzed three times, plus one near-duplicate further away
+    for _ in range(3):
+        index.add(unit(0), 'self')
+    index.add(unit(0, 1.05), 'other')
+    assert index.nearest(unit(0), threshold=0.1, exclude='self') == ('other', pytest.approx(0.05, abs=1e-6))
+
+
+def test_nearest_respects_the_threshold():
+    index = FeatureIndex()
+    index.add(unit(0), 'far')
+    assert index.nearest(unit(1), threshold=0.5) is None
+    assert index.nearest(unit(1), threshold=2.0)[0] == 'far'
+    assert FeatureIndex().nearest(unit(0)) is None
+
+
+def test_index_grows_and_reloads_from_disk(tmp_path):
+    index = FeatureIndex(str(tmp_path), capacity=2)
+    for i in range(5):
+        index.add(unit(i), f"key{i}")
+    reloaded = FeatureIndex(str(tmp_path), capacity=2)
+    assert len(reloaded) == 5
+    assert reloaded.nearest(unit(3), threshold=0.01) == ('key3', 0.0)
+
+
+def test_a_slight_crop_lands_within_the_threshold(artwork):
+    bgr = np.ascontiguousarray(artwork[..., ::-1])
+    variants = (bgr, bgr[4:-4, 4:-4], np.ascontiguousarray(bgr[::-1]))
+    original, cropped, flipped = [
+        feature_vector(ImageAnalyzer.from_bgr(image).analyze_all(), image) for image in variants
+    ]
+    assert np.linalg.norm(original - cropped) < SIMILARITY_THRESHOLD
+    # Same stats, different layout: only the hash tells them apart
+    assert np.linalg.norm(original - flipped) > np.linalg.norm(original - cropped)
+
+
+def test_results_from_other_llm_settings_are_not_reused():
+    index, cache = FeatureIndex(), ResultCache(max_entries=4)
+    index.add(unit(0), 'current')
+    index.add(unit(0, 1.01), 'stale')
+    cache.set('current', {'report': 'r', 'llm_settings': llm_settings()})
+    cache.set('stale', {'report': 'r', 'llm_settings': llm_settings(model_name='retired')})
+    assert find_similar_result(index, cache, unit(0), 'new')[0]['report'] == 'r'
+    assert find_similar_result(index, cache, unit(0, 1.01), 'current') == (None, None)
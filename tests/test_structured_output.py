@@ -0,0 +1,144 @@
+import json
+
+import pytest
+
+from src.structured_output import (
+    EMOTIONS, CombinedStream, FieldExtractor, InterpretationStream, parse_combined,
+    parse_interpretation, repair_json, split_combined
+)
+
+REPLY = {
+    'interpretation': 'Warm reds suggest "energy" and\nopenness.',
+    'emotions': {'joy': 0.8, 'calm': 0.4, 'energy': 0.9, 'tension': 0.2, 'expression': 0.7},
+    'key_points': {
+        'emotional_state': ['Upbeat'],
+        'cognitive_patterns': ['Bold choices'],
+        'behavioral_insights': [],
+    },
+}
+
+
+def chunked(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+@pytest.mark.parametrize('text', [
+    '```json\n{"a": 1}\n```',
+    'Here is the JSON: {"a": 1} Hope that helps!',
+    '{"a": 1,}',
+])
+def test_repair_json_strips_fences_prose_and_trailing_commas(text):
+    assert json.loads(repair_json(text)) == {'a': 1}
+
+
+def test_repair_json_closes_a_truncated_reply():
+    repaired = json.loads(repair_json('{"interpretation": "Cut off mid-sen'))
+    assert repaired == {'interpretation': 'Cut off mid-sen'}
+    # A dangling key or value separator is dropped
+    assert json.loads(repair_json('{"a": [1, 2], "b":')) == {'a': [1, 2]}
+    assert repair_json('no json here') is None
+
+
+def test_parse_interpretation_reads_the_requested_object():
+    parsed = parse_interpretation(json.dumps(REPLY))
+    assert parsed['structured'] is True
+    assert parsed['interpretation'] == REPLY['interpretation']
+    assert parsed['emotions'] == REPLY['emotions']
+    assert parsed['key_points'] == REPLY['key_points']
+
+
+def test_scores_on_other_scales_are_normalized():
+    reply = dict(REPLY, emotions={'Joy': 8, 'calm': '40', 'energy': 0.5, 'tension': -1, 'expression': 10})
+    emotions = parse_interpretation(json.dumps(reply))['emotions']
+    assert emotions == {'joy': 0.8, 'calm': 0.4, 'energy': 0.5, 'tension': 0.0, 'expression': 1.0}
+
+
+def test_missing_scores_drop_the_chart_but_keep_the_prose():
+    reply = dict(REPLY, emotions={name: 0.5 for name in EMOTIONS[:-1]})
+    parsed = parse_interpretation(json.dumps(reply))
+    assert parsed['structured'] is True
+    assert parsed['emotions'] is None
+
+
+def test_plain_text_replies_fall_back_to_prose():
+    parsed = parse_interpretation('  Just a paragraph about the artwork.  ')
+    assert parsed == {
+        'interpretation': 'Just a paragraph about the artwork.',
+        'emotions': None,
+        'key_points': {'emotional_state': [], 'cognitive_patterns': [], 'behavioral_insights': []},
+        'structured': False,
+    }
+
+
+def test_truncated_replies_keep_their_prose():
+    text = json.dumps(REPLY)
+    parsed = parse_interpretation(text[:text.index('"emotions"') + 20])
+    assert parsed['interpretation'] == REPLY['interpretation']
+
+
+@pytest.mark.parametrize('size', [1, 3, 7, 64])
+def test_field_extractor_streams_the_decoded_prose(size):
+    reply = dict(REPLY, interpretation='Café colours \U0001F3A8 with a "quote"\\slash')
+    extractor = FieldExtractor()
+    prose = ''.join(extractor.feed(chunk) for chunk in chunked(json.dumps(reply), size))
+    assert prose == reply['interpretation']
+
+
+def test_field_extractor_passes_plain_text_through():
+    extractor = FieldExtractor()
+    assert ''.join(extractor.feed(chunk) for chunk in ['Plain ', 'prose']) == 'Plain prose'
+
+
+def test_interpretation_stream_yields_prose_then_the_parsed_reply():
+    stream = InterpretationStream(iter(chunked(json.dumps(REPLY), 5)))
+    assert ''.join(stream) == REPLY['interpretation']
+    assert stream.result()['emotions'] == REPLY['emotions']
+
+
+COMBINED = (
+    "The painting feels open and warm.\n"
+    "===INSIGHTS===\n"
+    f"{json.dumps({'emotions': REPLY['emotions'], 'key_points': REPLY['key_points']})}\n"
+    "=== REPORT ===\n"
+    "## Summary\nA hopeful piece.\n"
+)
+
+
+def test_split_combined_cuts_at_marker_lines():
+    parts = split_combined(COMBINED)
+    assert parts['interpretation'] == 'The painting feels open and warm.'
+    assert parts['report'] == '## Summary\nA hopeful piece.'
+    # A marker inside a line is prose, not a section break
+    assert split_combined('Use ===REPORT=== here')['report'] == ''
+
+
+def test_parse_combined_reads_scores_and_report():
+    parsed = parse_combined(COMBINED)
+    assert parsed['structured'] is True
+    assert parsed['emotions'] == REPLY['emotions']
+    assert parsed['key_points'] == REPLY['key_points']
+    assert parsed['report'].startswith('## Summary')
+
+
+def test_parse_combined_without_insights_keeps_the_prose():
+    parsed = parse_combined('Only prose, cut off before the markers')
+    assert parsed['structured'] is False
+    assert parsed['interpretation'] == 'Only prose, cut off before the markers'
+    assert parsed['report'] == ''
+
+
+@pytest.mark.parametrize('size', [1, 4, 11, 500])
+def test_combined_stream_splits_sections_as_they_arrive(size):
+    stream = CombinedStream(iter(chunked(COMBINED, size)))
+    interpretation = ''.join(stream.section('interpretation'))
+    assert interpretation.strip() == 'The painting feels open and warm.'
+    assert '===' not in interpretation
+    assert stream.interpretation_result()['emotions'] == REPLY['emotions']
+    assert stream.text('report') == '## Summary\nA hopeful piece.'
+    assert stream.result() == parse_combined(COMBINED)
+
+
+def test_combined_stream_buffers_skipped_sections():
+    stream = CombinedStream(iter(chunked(COMBINED, 6)))
+    assert stream.text('report') == '## Summary\nA hopeful piece.'
+    assert stream.text('interpretation') == 'The painting feels open and warm.'
@@ -0,0 +1,40 @@
+import cv2
+import numpy as np
+import pytest
+
+from src.texture import PROPERTIES, GLCMTexture
+
+
+@pytest.fixture(scope='module')
+def gray(artwork):
+    return cv2.cvtColor(artwork, cv2.COLOR_RGB2GRAY)
+
+
+@pytest.mark.parametrize('distance, angle', [(1, 0.0), (2, np.pi / 2), (1, np.pi / 4), (3, 3 * np.pi / 4)])
+def test_matches_skimage_at_256_levels(gray, distance, angle):
+    feature = pytest.importorskip('skimage.feature')
+    glcm = feature.graycomatrix(gray, [distance], [angle], symmetric=True, normed=True)
+    values = GLCMTexture(distances=(distance,), angles=(angle,)).properties(gray)
+    for name in PROPERTIES:
+        assert np.isclose(values[name], feature.graycoprops(glcm, name)[0, 0]), name
+
+
+def test_stacked_counts_match_single_images(gray):
+    engine = GLCMTexture()
+    stack = np.stack([gray, gray[::-1], gray[:, ::-1]])
+    counts = engine.counts(stack)
+    for image, image_counts in zip(stack, counts):
+        assert np.array_equal(image_counts, engine.counts(image))
+
+
+def test_contrast_stays_in_256_level_units(gray):
+    full = GLCMTexture(levels=256).properties(gray)['contrast']
+    quantized = GLCMTexture(levels=64).properties(gray)['contrast']
+    assert quantized == pytest.approx(full, rel=0.2)
+
+
+def test_levels_are_validated():
+    with pytest.raises(ValueError):
+        GLCMTexture(levels=1)
+    with pytest.raises(ValueError):
+        GLCMTexture(levels=512)
@@ -0,0 +1,77 @@
+import cv2
+import numpy as np
+import pytest
+
+from src.image_analysis import ImageAnalyzer, channel_stats
+from src.texture import GLCMTexture
+from src.tiled_analysis import TiledAnalyzer, heatmap, tile_grid, tile_regions
+
+FULL_SIZE = {'color': None, 'texture': None, 'composition': None}
+
+
+class SmallTiles(TiledAnalyzer):
+    tile_size = 70
+    overlap = 16
+    workers = 2
+
+
+@pytest.fixture(scope='module')
+def features(artwork):
+    tiled = SmallTiles(artwork, resolutions=FULL_SIZE)
+    return tiled, tiled.analyze_all(), ImageAnalyzer(artwork, resolutions=FULL_SIZE).analyze_all()
+
+
+def test_tiles_cover_the_image_once():
+    height, width = 241, 317
+    coverage = np.zeros((height, width), np.int64)
+    for top, bottom, left, right in tile_regions(height, width, 64):
+        assert bottom - top <= 64 and right - left <= 64
+        coverage[top:bottom, left:right] += 1
+    assert (coverage == 1).all()
+    assert tuple(map(len, tile_grid(height, width, 64))) == (5, 6)
+
+
+def test_region_counts_of_tiles_add_up(artwork):
+    gray = cv2.cvtColor(artwork, cv2.COLOR_RGB2GRAY) // 32
+    engine = GLCMTexture()
+    for distance, angle in engine.offsets:
+        tiles = sum(engine.region_counts(gray, region, distance, angle)
+                    for region in tile_regions(*gray.shape, 50))
+        assert np.array_equal(tiles, engine.counts(gray, distance, angle))
+
+
+def test_channel_stats_from_a_histogram():
+    values = np.random.default_rng(3).integers(0, 256, 5000, dtype=np.uint8)
+    stats = channel_stats(np.bincount(values, minlength=256).astype(np.float64))
+    assert stats['mean'] == pytest.approx(values.mean())
+    assert stats['std'] == pytest.approx(values.std())
+    assert stats['dominant_values'] == np.bincount(values).argmax()
+
+
+def test_colors_and_texture_match_the_whole_image(features):
+    _, tiled, whole = features
+    for col in ('r', 'g', 'b'):
+        for stat in ('mean', 'std', 'dominant_values'):
+            assert tiled['color_stats'][col][stat] == pytest.approx(whole['color_stats'][col][stat])
+    for name, value in whole['texture_stats'].items():
+        assert tiled['texture_stats'][name] == pytest.approx(value), name
+
+
+def test_composition_matches_the_whole_image(features):
+    _, tiled, whole = features
+    tiled, whole = tiled['composition_stats'], whole['composition_stats']
+    for name in ('symmetry_score', 'symmetry_top_bottom', 'symmetry_diagonal', 'symmetry_anti_diagonal'):
+        assert tiled[name] == pytest.approx(whole[name])
+    # Canny hysteresis can follow a weak edge past the halo, so edges agree closely but not exactly
+    assert tiled['edge_density'] == pytest.approx(whole['edge_density'], rel=0.02)
+    assert tiled['thirds_weight'] == pytest.approx(whole['thirds_weight'], rel=0.02)
+    assert np.allclose(tiled['edge_grid'], whole['edge_grid'], atol=0.01)
+
+
+def test_tile_maps_have_one_value_per_tile(features):
+    analyzer, _, _ = features
+    rows, cols = tile_grid(240, 320, SmallTiles.tile_size)
+    for name, values in analyzer.tile_maps.items():
+        assert values.shape == (len(rows) - 1, len(cols) - 1), name
+    image = heatmap(analyzer.tile_maps['edge_density'], (64, 48))
+    assert image.shape == (48, 64, 3)
@@ -0,0 +1,79 @@
+import pytest
+
+from src import token_budget
+from src.token_budget import (
+    CONTEXT_MARGIN, compress_interpretation, completion_budget, count_message_tokens, count_tokens
+)
+
+INTERPRETATION = """## Emotional State
+The warm reds suggest energy and openness. They also hint at some restlessness.
+- Bright yellows point to optimism. Their placement matters less.
+- Dark corners may hold unresolved feelings. Or simply contrast.
+
+## Cognitive Patterns
+Strong diagonals show decisive planning. The layout was clearly considered first.
+- Repeated shapes suggest a wish for order. This is common.
+- Open space leaves room for reflection. It balances the busy center.
+
+## Behavioral Insights
+Confident strokes point to self-assurance. Few corrections are visible.
+"""
+
+
+@pytest.fixture
+def heuristic(monkeypatch):
+    """Count with the word-piece heuristic whether or not tiktoken is installed"""
+    monkeypatch.setattr(token_budget, 'tiktoken', None)
+    monkeypatch.setattr(token_budget, '_encoding', None)
+
+
+def test_heuristic_counts_word_pieces_and_symbols(heuristic):
+    assert count_tokens('') == 0
+    assert count_tokens('Art therapy, today!') == 6
+    # "therapy" and other words over six letters count as several pieces
+    assert count_tokens('extraordinarily') == 3
+
+
+def test_message_tokens_include_the_chat_overhead(heuristic):
+    messages = [{'role': 'system', 'content': 'Be brief.'}, {'role': 'user', 'content': 'Hello'}]
+    assert count_message_tokens(messages) == 3 + 1 + 2 * token_budget.MESSAGE_OVERHEAD + 2
+
+
+def test_completion_budget_fits_the_context_window(heuristic):
+    messages = [{'role': 'user', 'content': 'word ' * 900}]
+    prompt = count_message_tokens(messages)
+    assert completion_budget(messages, cap=500, context=4096) == 500
+    assert completion_budget(messages, cap=5000, context=2048) == 2048 - prompt - CONTEXT_MARGIN
+    # Never below the floor, even when the prompt alone fills the window
+    assert completion_budget(messages, cap=500, context=512, floor=128) == 128
+
+
+def test_short_interpretations_are_left_alone(heuristic):
+    assert compress_interpretation(INTERPRETATION, budget=1000) == INTERPRETATION
+
+
+def test_compression_keeps_every_heading_and_first_sentences(heuristic):
+    compact = compress_interpretation(INTERPRETATION, budget=80)
+    assert count_tokens(compact) <= 80
+    for heading in ('Emotional State', 'Cognitive Patterns', 'Behavioral Insights'):
+        assert heading in compact
+    assert 'The warm reds suggest energy and openness.' in compact
+    assert 'restlessness' not in compact
+
+
+def test_compression_falls_back_to_a_word_cut(heuristic):
+    compact = compress_interpretation(INTERPRETATION, budget=12)
+    assert 0 < count_tokens(compact) <= 12
+    assert INTERPRETATION.replace('## ', '').startswith(compact.split('\n')[0])
+
+
+def test_an_unavailable_encoding_falls_back_to_the_heuristic(monkeypatch):
+    class OfflineTiktoken:
+        @staticmethod
+        def get_encoding(name):
+            raise OSError('no network')
+
+    monkeypatch.setattr(token_budget, 'tiktoken', OfflineTiktoken)
+    monkeypatch.setattr(token_budget, '_encoding', None)
+    assert token_budget.load_encoding() is None
+    assert count_tokens('Art therapy, today!') == 6
@@ -0,0 +1,77 @@
+import asyncio
+import contextvars
+import json
+import threading
+from types import SimpleNamespace
+
+import src.tracing as tracing
+from src.tracing import chunk_usage, metrics, record_usage, span, trace, traced
+
+
+def test_spans_nest_under_the_open_trace():
+    with trace('request') as current:
+        with span('outer') as outer:
+            with span('inner', cache='hit'):
+                pass
+    spans = {s['name']: s for s in current.to_dict()['spans']}
+    assert spans['outer']['parent'] == current.root.id
+    assert spans['inner']['parent'] == outer.id
+    assert spans['inner']['attributes'] == {'cache': 'hit'}
+    assert all(s['duration_ms'] >= 0 for s in spans.values())
+
+
+def test_traced_covers_plain_and_async_functions():
+    @traced('plain.stage')
+    def plain():
+        return 1
+
+    @traced('async.stage')
+    async def coroutine():
+        return 2
+
+    with trace('request') as current:
+        assert plain() == 1
+        assert asyncio.run(coroutine()) == 2
+    assert [s['name'] for s in current.to_dict()['spans']] == ['plain.stage', 'async.stage']
+
+
+def test_spans_from_other_threads_join_the_trace():
+    def work():
+        with span('worker'):
+            pass
+
+    with trace('request') as current:
+        thread = threading.Thread(target=contextvars.copy_context().run, args=(work,))
+        thread.start()
+        thread.join()
+    assert [s['name'] for s in current.to_dict()['spans']] == ['worker']
+
+
+def test_finished_traces_are_exported_as_json_lines(tmp_path, monkeypatch):
+    path = tmp_path / 'traces.jsonl'
+    monkeypatch.setattr(tracing, 'TRACE_LOG_PATH', str(path))
+    with trace('request', user='u'):
+        with span('stage'):
+            pass
+    record = json.loads(path.read_text())
+    assert record['name'] == 'request' and record['attributes'] == {'user': 'u'}
+    assert [s['name'] for s in record['spans']] == ['stage']
+
+
+def test_metrics_count_durations_tokens_and_cache_lookups():
+    with trace('request'):
+        with span('test.llm'):
+            record_usage(SimpleNamespace(prompt_tokens=10, completion_tokens=5))
+        with span('test.cache', cache='miss'):
+            pass
+    text = metrics.render()
+    assert 'art_stage_duration_seconds_count{stage="test.llm"}' in text
+    assert 'art_llm_tokens_total{stage="test.llm",kind="prompt"}' in text
+    assert 'art_cache_lookups_total{stage="test.cache",result="miss"}' in text
+
+
+def test_chunk_usage_reads_groqs_x_groq_field():
+    usage = SimpleNamespace(prompt_tokens=1)
+    assert chunk_usage(SimpleNamespace(usage=usage)) is usage
+    assert chunk_usage(SimpleNamespace(usage=None, x_groq=SimpleNamespace(usage=usage))) is usage
+    assert chunk_usage(SimpleNamespace()) is None